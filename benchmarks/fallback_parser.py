@@ -0,0 +1,96 @@
+"""
+    Benchmark of the fallback response parsing: the former two-pass regex against
+    the line-oriented FallbackOutputParser, on synthetic multi-megabyte responses.
+
+    Usage:
+        python -m benchmarks.fallback_parser --sizes-mb 1 4 16 --repeat 3
+
+    The responses repeat the modules of sample_output.json under numbered names in
+    the headered text format of the fallback prompt. Both parsers must find the same
+    components; the parser is also timed when the response arrives in 64 character
+    chunks, as it does when streamed.
+"""
+import argparse
+import json
+import re
+import time
+from src.infra_genie.LLMS.cassette_llm import render_fallback_text
+from src.infra_genie.utils.code_stream import FallbackOutputParser
+
+
+def regex_parse(content: str) -> dict:
+    """The parsing of FallbackNode before the streaming parser, kept as the baseline"""
+    components = {}
+    for kind, root in (("ENV", "environments"), ("MODULE", "modules")):
+        pattern = rf"# {kind}: (\w+) - (\w+\.tf)\n([\s\S]*?)(?=# ENV:|# MODULE:|$)"
+        for name, file_type, text in re.findall(pattern, content):
+            component = components.setdefault(root, {}).setdefault(
+                name, {"name": name, "main_tf": "", "variables_tf": "", "output_tf": ""}
+            )
+            if file_type in ("main.tf", "variables.tf", "output.tf"):
+                component[file_type.replace(".", "_")] = text.strip()
+    return {root: list(components.get(root, {}).values()) for root in ("environments", "modules")}
+
+
+def stream_parse(content: str, chunk_size: int = 0) -> dict:
+    parser = FallbackOutputParser()
+    if chunk_size:
+        for index in range(0, len(content), chunk_size):
+            parser.feed(content[index:index + chunk_size])
+    else:
+        parser.feed(content)
+    return parser.close()
+
+
+def make_response(sample: dict, size_mb: float) -> str:
+    modules = sample["modules"]["modules"]
+    blocks = [render_fallback_text({"environments": sample["environments"]["environments"], "modules": []})]
+    size, copy = len(blocks[0]), 0
+    while size < size_mb * 1024 * 1024:
+        copy += 1
+        renamed = [{**module, "name": f"{module['name']}_{copy}"} for module in modules]
+        block = render_fallback_text({"modules": renamed})
+        blocks.append(block)
+        size += len(block)
+    return "\n".join(blocks)
+
+
+def time_parse(parse, content: str, repeat: int):
+    """Returns (best seconds, result) of repeat runs"""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = parse(content)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fallback response parsers")
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--sample", default="sample_output.json")
+    args = parser.parse_args()
+
+    with open(args.sample) as f:
+        sample = json.load(f)
+
+    print(f"{'size':>8} {'components':>11} {'regex':>9} {'parser':>9} {'streamed':>9} {'speedup':>8}")
+    for size_mb in args.sizes_mb:
+        content = make_response(sample, size_mb)
+        regex_seconds, expected = time_parse(regex_parse, content, args.repeat)
+        parser_seconds, result = time_parse(stream_parse, content, args.repeat)
+        streamed_seconds, streamed = time_parse(lambda text: stream_parse(text, 64), content, args.repeat)
+
+        if result != expected or streamed != expected:
+            raise SystemExit(f"Parsers disagree on the {size_mb} MB response")
+
+        components = sum(len(components) for components in expected.values())
+        print(
+            f"{len(content) / 1024 / 1024:>6.1f}MB {components:>11} {regex_seconds:>8.3f}s "
+            f"{parser_seconds:>8.3f}s {streamed_seconds:>8.3f}s {regex_seconds / parser_seconds:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import statistics
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+from langchain_core.messages import AIMessage, HumanMessage, convert_to_messages
+from langchain_core.runnables import Runnable, RunnableConfig
+from loguru import logger
+from pydantic import BaseModel
+
+
+def get_prompt_text(input: Any) -> str:
+    """Returns the messages of a prompt value, string or message list as one text"""
+    if hasattr(input, "to_messages"):
+        messages = input.to_messages()
+    elif isinstance(input, str):
+        messages = [HumanMessage(content=input)]
+    else:
+        messages = convert_to_messages(input)
+    return "\n".join(f"{message.type}: {message.content}" for message in messages)
+
+
+def render_fallback_text(output: dict) -> str:
+    """Renders a TerraformOutput dict in the headered text format of the fallback prompt"""
+    blocks = []
+    for header, components in (("ENV", output.get("environments", [])), ("MODULE", output.get("modules", []))):
+        for component in components:
+            for filename, field in (("main.tf", "main_tf"), ("variables.tf", "variables_tf"), ("output.tf", "output_tf")):
+                blocks.append(f"# {header}: {component['name']} - {filename}\n{component.get(field, '')}\n")
+    return "\n".join(blocks)
+
+
+class LatencyModel:
+    """
+        Simulated latency of replayed responses:
+        - none        replays immediately
+        - recorded    waits the latency recorded with the response
+        - lognormal   samples a lognormal distribution fitted to all latencies of the cassette
+        Latencies are multiplied by scale, the seed makes the samples reproducible.
+    """
+
+    def __init__(self, mode: str = "recorded", scale: float = 1.0, seed: Optional[int] = None):
+        self.mode = mode
+        self.scale = scale
+        self.random = random.Random(seed)
+
+
+    def sample(self, recorded: float, latencies) -> float:
+        if self.mode == "none":
+            return 0.0
+        if self.mode == "lognormal":
+            logs = [math.log(latency) for latency in latencies if latency > 0] or [math.log(recorded or 1.0)]
+            sigma = statistics.pstdev(logs) if len(logs) > 1 else 0.5
+            return self.random.lognormvariate(statistics.median(logs), sigma) * self.scale
+        return recorded * self.scale
+
+
+class Cassette:
+    """
+        Recorded LLM responses in a JSON file:
+        - interactions   "<kind>:<prompt hash>" -> response, latency and a prompt preview.
+                         kind is the structured output schema name or "text".
+        - defaults       kind -> response replayed for prompts that were never recorded,
+                         seeded from a sample output when the file is created
+    """
+
+    def __init__(self, path: str, seed_file: Optional[str] = None):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.interactions: Dict[str, dict] = {}
+        self.defaults: Dict[str, Any] = {}
+        self.load(seed_file)
+
+
+    def load(self, seed_file: Optional[str]):
+        if self.path.exists():
+            with open(self.path) as f:
+                data = json.load(f)
+            self.interactions = data.get("interactions", {})
+            self.defaults = data.get("defaults", {})
+        elif seed_file and os.path.exists(seed_file):
+            self.seed(seed_file)
+            self.save()
+
+
+    def seed(self, seed_file: str):
+        """Takes the defaults from a saved state such as sample_output.json"""
+        with open(seed_file) as f:
+            sample = json.load(f)
+        output = {
+            "environments": sample["environments"]["environments"],
+            "modules": sample["modules"]["modules"],
+        }
+        self.defaults = {
+            "TerraformOutput": output,
+            "TerraformComponent": output["modules"] + output["environments"],
+            "text": render_fallback_text(output),
+        }
+        logger.info(f"Seeded cassette {self.path} from {seed_file}")
+
+
+    def save(self):
+        with self._lock:
+            data = {"interactions": self.interactions, "defaults": self.defaults}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Written aside and renamed so concurrent readers never see half a file
+        temp_path = self.path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp_path, self.path)
+
+
+    @staticmethod
+    def make_key(kind: str, prompt_text: str) -> str:
+        return f"{kind}:{hashlib.sha256(prompt_text.encode('utf-8')).hexdigest()}"
+
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            return self.interactions.get(key)
+
+
+    def record(self, key: str, response: Any, latency_seconds: float, prompt_text: str):
+        with self._lock:
+            self.interactions[key] = {
+                "response": response,
+                "latency_seconds": round(latency_seconds, 3),
+                "recorded_at": time.time(),
+                "prompt_preview": prompt_text[:200],
+            }
+        self.save()
+
+
+    def get_latencies(self):
+        with self._lock:
+            return [interaction["latency_seconds"] for interaction in self.interactions.values()]
+
+
+## Shared by every model of the process, keyed by path
+_cassettes = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_cassette(path: str, seed_file: Optional[str] = None) -> Cassette:
+    with _cassettes_lock:
+        if path not in _cassettes:
+            _cassettes[path] = Cassette(path, seed_file)
+        return _cassettes[path]
+
+
+def get_cassette_path(directory: str, name: str) -> str:
+    return str(Path(directory) / f"{re.sub(r'[^A-Za-z0-9_.-]', '_', name)}.json")
+
+
+class CassetteLLM(Runnable):
+    """
+        Records the responses of a model to a cassette and replays them.
+
+        Modes:
+        - record   always calls the model and records its response
+        - replay   only replays, prompts that were never recorded raise; no model is needed
+        - auto     replays what was recorded, calls and records the rest
+    """
+
+    def __init__(self, llm: Optional[Runnable], cassette: Cassette, name: str, mode: str = "auto",
+                 latency_model: Optional[LatencyModel] = None, schema: Optional[type] = None):
+        self.llm = llm
+        self.cassette = cassette
+        self.name = name
+        # Identifies the replayed model in the response cache keys
+        self.model = name
+        self.mode = mode
+        self.latency_model = latency_model or LatencyModel()
+        self.schema = schema
+        self.kind = schema.__name__ if schema else "text"
+
+
+    def with_structured_output(self, schema, **kwargs) -> "CassetteLLM":
+        llm = self.llm.with_structured_output(schema, **kwargs) if self.llm is not None else None
+        return CassetteLLM(llm, self.cassette, self.name, self.mode, self.latency_model, schema)
+
+
+    def to_recorded(self, result: Any) -> Any:
+        if isinstance(result, BaseModel):
+            return result.model_dump()
+        return getattr(result, "content", result)
+
+
+    def from_recorded(self, response: Any) -> Any:
+        if self.schema is not None:
+            return self.schema.model_validate(response)
+        return AIMessage(content=response)
+
+
+    def lookup(self, key: str):
+        """Returns (response, delay) of a recorded prompt, None when it has to be called"""
+        if self.mode == "record":
+            return None
+
+        interaction = self.cassette.get(key)
+        if interaction is None:
+            if self.mode == "replay":
+                raise LookupError(f"Cassette {self.cassette.path} has no {self.kind} response for this prompt of {self.name}")
+            return None
+
+        delay = self.latency_model.sample(interaction["latency_seconds"], self.cassette.get_latencies())
+        logger.debug(f"Replaying {self.kind} response of {self.name} after {delay:.2f}s")
+        return self.from_recorded(interaction["response"]), delay
+
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        prompt_text = get_prompt_text(input)
+        key = Cassette.make_key(self.kind, prompt_text)
+
+        replayed = self.lookup(key)
+        if replayed is not None:
+            response, delay = replayed
+            time.sleep(delay)
+            return response
+
+        started = time.monotonic()
+        result = self.llm.invoke(input, config, **kwargs)
+        self.cassette.record(key, self.to_recorded(result), time.monotonic() - started, prompt_text)
+        return result
+
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        prompt_text = get_prompt_text(input)
+        key = Cassette.make_key(self.kind, prompt_text)
+
+        replayed = self.lookup(key)
+        if replayed is not None:
+            response, delay = replayed
+            await asyncio.sleep(delay)
+            return response
+
+        started = time.monotonic()
+        result = await self.llm.ainvoke(input, config, **kwargs)
+        await asyncio.to_thread(self.cassette.record, key, self.to_recorded(result), time.monotonic() - started, prompt_text)
+        return result
@@ -1,24 +1,15 @@
-import os
-import streamlit as st
-from langchain_google_genai import ChatGoogleGenerativeAI
+from src.infra_genie.LLMS.llm_factory import get_llm
 
 
 class GeminiLLM:
+    """Kept for existing callers, the models come from the shared LLMFactory"""
     def __init__(self, user_controls_input=None, model=None, api_key=None):
         self.user_controls_input = user_controls_input
         self.model = model
         self.api_key = api_key
         
-    def get_llm_model(self):
-        try:
-            if  self.user_controls_input:
-                gemini_api_key = self.user_controls_input['GEMINI_API_KEY']
-                selected_gemini_model = self.user_controls_input['selected_gemini_model']
-                llm = ChatGoogleGenerativeAI(api_key=gemini_api_key, model= selected_gemini_model)
-            else:
-                llm = ChatGoogleGenerativeAI(api_key=self.api_key,model=self.model)
-        
-        except Exception as e:
-            raise ValueError(f"Error occured with Exception : {e}")
         
-        return llm
\ No newline at end of file
+    def get_llm_model(self):
+        if self.user_controls_input:
+            return get_llm("Gemini", self.user_controls_input['selected_gemini_model'], self.user_controls_input['GEMINI_API_KEY'])
+        return get_llm("Gemini", self.model, self.api_key)
@@ -1,9 +1,8 @@
-import os
-import streamlit as st
-from langchain_groq import ChatGroq
+from src.infra_genie.LLMS.llm_factory import get_llm
 
 
 class GroqLLM:
+    """Kept for existing callers, the models come from the shared LLMFactory"""
     def __init__(self, user_controls_input=None, model=None, api_key=None):
         self.user_controls_input = user_controls_input
         self.model = model
@@ -11,15 +10,6 @@ class GroqLLM:
         
         
     def get_llm_model(self):
-        try:
-            if  self.user_controls_input:
-                groq_api_key = self.user_controls_input['GROQ_API_KEY']
-                selected_groq_model = self.user_controls_input['selected_groq_model']
-                llm = ChatGroq(api_key=groq_api_key, model= selected_groq_model)
-            else:
-                llm = ChatGroq(api_key=self.api_key,model=self.model)
-        
-        except Exception as e:
-            raise ValueError(f"Error occured with Exception : {e}")
-        
-        return llm
\ No newline at end of file
+        if self.user_controls_input:
+            return get_llm("Groq", self.user_controls_input['selected_groq_model'], self.user_controls_input['GROQ_API_KEY'])
+        return get_llm("Groq", self.model, self.api_key)
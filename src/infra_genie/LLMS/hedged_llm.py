@@ -0,0 +1,272 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Iterator, List, Optional, Tuple
+from langchain_core.runnables import Runnable, RunnableConfig
+from loguru import logger
+from src.infra_genie.utils.event_loop import run_sync
+
+
+class CircuitBreaker:
+    """
+        Opens after consecutive failures (errors or timeouts) and lets a single
+        trial request through once reset_timeout has elapsed.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit breaker opened for {self.name} after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """
+        Keeps a sliding window of latencies, the hedge delay is a percentile of that window.
+    """
+
+    def __init__(self, percentile: float = 95, default_delay: float = 20.0, min_delay: float = 1.0, window: int = 50, min_samples: int = 5):
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def hedge_delay(self) -> float:
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return self.default_delay
+            ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(self.min_delay, ordered[index])
+
+
+## Shared by every graph in the process, keyed by "Provider:model"
+_breakers = {}
+_trackers = {}
+_registry_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str, **kwargs) -> CircuitBreaker:
+    with _registry_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, **kwargs)
+        return _breakers[name]
+
+
+def get_latency_tracker(name: str, **kwargs) -> LatencyTracker:
+    with _registry_lock:
+        if name not in _trackers:
+            _trackers[name] = LatencyTracker(**kwargs)
+        return _trackers[name]
+
+
+class HedgedLLM(Runnable):
+    """
+        Composite LLM over several providers/models.
+
+        The first available candidate is called; if it has not answered within the
+        configured percentile of its observed latency, a hedged request is sent to the
+        next candidate and whichever finishes first wins. Errors fail over to the next
+        candidate. Candidates whose circuit breaker is open are skipped.
+
+        Streams are not hedged: they fail over to the next candidate until their
+        first chunk, the chunks already show that the candidate is answering.
+    """
+
+    def __init__(
+        self,
+        candidates: List[Tuple[str, Runnable]],
+        hedge_percentile: float = 95,
+        default_hedge_delay: float = 20.0,
+        min_hedge_delay: float = 1.0,
+        failure_threshold: int = 3,
+        reset_timeout: float = 60.0,
+    ):
+        if not candidates:
+            raise ValueError("HedgedLLM needs at least one candidate")
+
+        self.candidates = candidates
+        self.settings = dict(
+            hedge_percentile=hedge_percentile,
+            default_hedge_delay=default_hedge_delay,
+            min_hedge_delay=min_hedge_delay,
+            failure_threshold=failure_threshold,
+            reset_timeout=reset_timeout,
+        )
+        self.breakers = {
+            name: get_circuit_breaker(name, failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+            for name, _ in candidates
+        }
+        self.trackers = {
+            name: get_latency_tracker(name, percentile=hedge_percentile, default_delay=default_hedge_delay, min_delay=min_hedge_delay)
+            for name, _ in candidates
+        }
+
+
+    def with_structured_output(self, schema, **kwargs) -> "HedgedLLM":
+        return HedgedLLM(
+            [(name, llm.with_structured_output(schema, **kwargs)) for name, llm in self.candidates],
+            **self.settings
+        )
+
+
+    def _available_candidates(self):
+        available = [(name, llm) for name, llm in self.candidates if self.breakers[name].allow_request()]
+        # Every breaker open: fail open rather than refusing the request
+        return available or list(self.candidates)
+
+
+    def _record(self, name: str, started: float, error: Optional[BaseException], abandoned: threading.Event):
+        # Fast failures would shrink the hedge delay, only answers count as latency
+        if error is None:
+            self.trackers[name].record(time.monotonic() - started)
+        if abandoned.is_set():
+            return
+        if error is None:
+            self.breakers[name].record_success()
+        else:
+            self.breakers[name].record_failure()
+
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        """
+            Runs the async hedge on the background event loop, so the losing
+            request is cancelled rather than left running in a thread
+        """
+        return run_sync(self.ainvoke(input, config, **kwargs))
+
+
+    async def _acall(self, name, llm, input, config, kwargs, abandoned):
+        started = time.monotonic()
+        try:
+            result = await llm.ainvoke(input, config, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._record(name, started, e, abandoned)
+            raise
+        self._record(name, started, None, abandoned)
+        return result
+
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        queue = self._available_candidates()
+        abandoned = {name: threading.Event() for name, _ in queue}
+        pending = {}
+        last_error = None
+
+        def launch():
+            name, llm = queue.pop(0)
+            pending[asyncio.create_task(self._acall(name, llm, input, config, kwargs, abandoned[name]))] = name
+
+        try:
+            launch()
+            while pending:
+                timeout = self.trackers[pending[next(iter(pending))]].hedge_delay() if queue and len(pending) == 1 else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    logger.info(f"No answer from {list(pending.values())} after {timeout:.1f}s, sending hedged request")
+                    launch()
+                    continue
+
+                for task in done:
+                    name = pending.pop(task)
+                    if task.exception() is None:
+                        for loser in pending.values():
+                            abandoned[loser].set()
+                            self.breakers[loser].record_failure()
+                        return task.result()
+
+                    last_error = task.exception()
+                    logger.warning(f"LLM call to {name} failed: {last_error}")
+
+                if not pending and queue:
+                    logger.info(f"Failing over to {queue[0][0]}")
+                    launch()
+
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+    def stream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Iterator[Any]:
+        last_error = None
+        for name, llm in self._available_candidates():
+            started = time.monotonic()
+            streamed = False
+            try:
+                for chunk in llm.stream(input, config, **kwargs):
+                    streamed = True
+                    yield chunk
+            except Exception as e:
+                self._record(name, started, e, threading.Event())
+                if streamed:
+                    raise
+                last_error = e
+                logger.warning(f"LLM stream from {name} failed: {e}")
+                continue
+            self._record(name, started, None, threading.Event())
+            return
+        raise last_error
+
+
+    async def astream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> AsyncIterator[Any]:
+        last_error = None
+        for name, llm in self._available_candidates():
+            started = time.monotonic()
+            streamed = False
+            try:
+                async for chunk in llm.astream(input, config, **kwargs):
+                    streamed = True
+                    yield chunk
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._record(name, started, e, threading.Event())
+                if streamed:
+                    raise
+                last_error = e
+                logger.warning(f"LLM stream from {name} failed: {e}")
+                continue
+            self._record(name, started, None, threading.Event())
+            return
+        raise last_error
@@ -0,0 +1,158 @@
+import importlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+from loguru import logger
+from src.infra_genie.cache.redis_cache import redis_client
+from src.infra_genie.graph.graph_cache import GraphCache
+from src.infra_genie.LLMS.cassette_llm import CassetteLLM, LatencyModel, get_cassette, get_cassette_path
+from src.infra_genie.LLMS.rate_limited_llm import RateLimitedLLM
+from src.infra_genie.ui.uiconfigfile import Config
+
+
+## Shared by every session served by this process
+_models = OrderedDict()
+_http_clients = {}
+_lock = threading.Lock()
+
+
+class LLMFactory:
+    """
+        Builds the chat models of the providers configured in the [LLM:<name>] sections.
+        Models are cached per (provider, model, API key fingerprint), OpenAI-compatible
+        providers share one keep-alive HTTP connection pool per provider. Unless disabled,
+        the models are returned behind the provider's rate limits.
+    """
+
+    def __init__(self, config: Optional[Config] = None):
+        config = config or Config()
+        self.providers = config.get_llm_providers()
+        self.client_settings = config.get_llm_client_settings()
+        self.rate_limit_enabled = config.is_rate_limit_enabled()
+        self.rate_limit_settings = config.get_rate_limit_settings()
+        self.cassette_settings = config.get_cassette_settings()
+
+
+    def has_provider(self, provider: str) -> bool:
+        return provider in self.providers
+
+
+    def get_api_key(self, provider: str, api_key: Optional[str] = None) -> Optional[str]:
+        """The API key falls back to the provider's environment variable"""
+        return api_key or os.getenv(self.providers[provider]["api_key_env"])
+
+
+    def get_llm(self, provider: str, model: str, api_key: Optional[str] = None):
+        """
+            Returns the chat model of the provider behind its rate limits
+        """
+        if not self.has_provider(provider):
+            raise ValueError(f"Unsupported LLM provider: {provider}")
+
+        mode = self.cassette_settings["mode"] if self.providers[provider]["record_replay"] else "off"
+        # Replays never call the provider, no client (nor API key) is needed
+        if mode == "replay":
+            return self.record_replay(provider, model, None, mode)
+
+        llm = self.get_chat_model(provider, model, api_key)
+        if self.rate_limit_enabled:
+            llm = self.rate_limit(provider, model, llm)
+        if mode in ("record", "auto"):
+            llm = self.record_replay(provider, model, llm, mode)
+        return llm
+
+
+    def record_replay(self, provider: str, model: str, llm, mode: str):
+        settings = self.cassette_settings
+        cassette = get_cassette(get_cassette_path(settings["directory"], f"{provider}_{model}"))
+        return CassetteLLM(llm, cassette, f"{provider}:{model}", mode, LatencyModel(settings["latency"], settings["latency_scale"]))
+
+
+    def rate_limit(self, provider: str, model: str, llm):
+        settings = self.providers[provider]
+        return RateLimitedLLM(
+            llm,
+            f"{provider}:{model}",
+            client=redis_client,
+            requests_per_minute=settings["requests_per_minute"],
+            tokens_per_minute=settings["tokens_per_minute"],
+            max_concurrency=settings["max_concurrency"],
+            **self.rate_limit_settings
+        )
+
+
+    def get_chat_model(self, provider: str, model: str, api_key: Optional[str] = None):
+        """
+            Returns the cached chat model of the provider without rate limits
+        """
+        if not self.has_provider(provider):
+            raise ValueError(f"Unsupported LLM provider: {provider}")
+
+        api_key = self.get_api_key(provider, api_key)
+        key = (provider, model, GraphCache.fingerprint(api_key))
+
+        with _lock:
+            llm = _models.get(key)
+            if llm is not None:
+                _models.move_to_end(key)
+                return llm
+
+        llm = self.build_llm(provider, model, api_key)
+
+        with _lock:
+            # Another session may have built it meanwhile, keep the first one
+            llm = _models.setdefault(key, llm)
+            _models.move_to_end(key)
+            while len(_models) > self.client_settings["cache_size"]:
+                evicted_key, _ = _models.popitem(last=False)
+                logger.info(f"Evicted LLM client {evicted_key[:2]}")
+        return llm
+
+
+    def build_llm(self, provider: str, model: str, api_key: Optional[str]):
+        settings = self.providers[provider]
+        try:
+            module_name, class_name = settings["chat_model_class"].split(":", 1)
+            chat_model_class = getattr(importlib.import_module(module_name), class_name)
+
+            kwargs = {"model": model, "api_key": api_key, **settings["model_kwargs"]}
+            if settings["base_url"]:
+                kwargs["base_url"] = settings["base_url"]
+            if settings["shared_http_client"]:
+                kwargs["http_client"] = self.get_http_client(provider)
+            if settings["prompt_cache_key"]:
+                # Routes requests sharing the static prompt prefix to the same prompt cache
+                kwargs["extra_body"] = {"prompt_cache_key": settings["prompt_cache_key"]}
+
+            llm = chat_model_class(**kwargs)
+        except Exception as e:
+            raise ValueError(f"Error occured with Exception : {e}")
+
+        logger.info(f"Created LLM client {provider}:{model}")
+        return llm
+
+
+    def get_http_client(self, provider: str):
+        """
+            Returns the process-wide httpx client of a provider, its keep-alive connections
+            save the TCP and TLS handshakes on every call
+        """
+        import httpx
+
+        with _lock:
+            if provider not in _http_clients:
+                _http_clients[provider] = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=self.client_settings["max_connections"],
+                        max_keepalive_connections=self.client_settings["max_keepalive_connections"],
+                        keepalive_expiry=self.client_settings["keepalive_expiry"],
+                    ),
+                    timeout=httpx.Timeout(120.0, connect=10.0),
+                )
+            return _http_clients[provider]
+
+
+def get_llm(provider: str, model: str, api_key: Optional[str] = None, config: Optional[Config] = None):
+    """Shortcut for LLMFactory(config).get_llm"""
+    return LLMFactory(config).get_llm(provider, model, api_key)
@@ -1,9 +1,8 @@
-import os
-import streamlit as st
-from langchain_mistralai.chat_models import ChatMistralAI
+from src.infra_genie.LLMS.llm_factory import get_llm
 
 
 class MistralLLM:
+    """Kept for existing callers, the models come from the shared LLMFactory"""
     def __init__(self, user_controls_input=None, model=None, api_key=None):
         self.user_controls_input = user_controls_input
         self.model = model
@@ -11,15 +10,6 @@ class MistralLLM:
         
         
     def get_llm_model(self):
-        try:
-            if  self.user_controls_input:
-                mistral_api_key = self.user_controls_input['MISTRAL_API_KEY']
-                selected_model = self.user_controls_input['selected_mistral_model']
-                llm = ChatMistralAI(api_key=mistral_api_key, model= selected_model)
-            else:
-                llm = ChatMistralAI(api_key=mistral_api_key, model= self.model)
-
-        except Exception as e:
-            raise ValueError(f"Error occured with Exception : {e}")
-        
-        return llm
\ No newline at end of file
+        if self.user_controls_input:
+            return get_llm("Mistral", self.user_controls_input['selected_mistral_model'], self.user_controls_input['MISTRAL_API_KEY'])
+        return get_llm("Mistral", self.model, self.api_key)
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pydantic import PrivateAttr
+from src.infra_genie.LLMS.cassette_llm import Cassette, LatencyModel, get_cassette, get_cassette_path, get_prompt_text
+
+
+class MockChatModel(BaseChatModel):
+    """
+        Offline chat model for development, CI and load tests. The model name selects a
+        cassette in cassette_dir: recorded prompts replay their response, every other
+        prompt gets the cassette's default for its kind, so runs are deterministic.
+        The default cassette is seeded from sample_output.json.
+    """
+
+    model: str = "default"
+    cassette_dir: str = "cassettes"
+    seed_file: str = "sample_output.json"
+    # none | recorded | lognormal, see LatencyModel
+    latency: str = "none"
+    latency_scale: float = 1.0
+    # Characters per streamed chunk, the latency is spread over the chunks
+    stream_chunk_size: int = 64
+    seed: Optional[int] = None
+    # Accepted like the other providers, never used
+    api_key: Optional[Any] = None
+
+    _cassette: Cassette = PrivateAttr()
+    _latency_model: LatencyModel = PrivateAttr()
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._cassette = get_cassette(get_cassette_path(self.cassette_dir, self.model), self.seed_file)
+        self._latency_model = LatencyModel(self.latency, self.latency_scale, self.seed)
+
+
+    @property
+    def _llm_type(self) -> str:
+        return "mock"
+
+
+    @property
+    def _identifying_params(self):
+        return {"model_name": self.model}
+
+
+    def with_structured_output(self, schema, **kwargs):
+        """The structured response comes back as JSON content and is validated into the schema"""
+        parse = lambda message: schema.model_validate_json(message.content)
+        return self.bind(schema_name=schema.__name__) | RunnableLambda(parse)
+
+
+    ## ------- Responses ------- ##
+    def get_response(self, messages: List[BaseMessage], schema_name: Optional[str]):
+        """Returns (content, delay): the recorded response of the prompt or the cassette's default"""
+        kind = schema_name or "text"
+        prompt_text = get_prompt_text(messages)
+        interaction = self._cassette.get(Cassette.make_key(kind, prompt_text))
+
+        if interaction is not None:
+            response, recorded = interaction["response"], interaction["latency_seconds"]
+        else:
+            response, recorded = self.get_default(kind, prompt_text), 1.0
+
+        content = response if isinstance(response, str) else json.dumps(response)
+        return content, self._latency_model.sample(recorded, self._cassette.get_latencies())
+
+
+    def get_default(self, kind: str, prompt_text: str):
+        default = self._cassette.defaults.get(kind)
+        if default is None:
+            raise ValueError(f"Mock cassette {self._cassette.path} has no default {kind} response")
+        if kind != "TerraformComponent":
+            return default
+
+        # Per-module prompts name their module, the environment prompt does not
+        match = re.search(r'named "([\w-]+)"', prompt_text)
+        components = {component["name"]: component for component in default}
+        if match:
+            return components.get(match.group(1), default[0])
+        return components.get("dev", default[-1])
+
+
+    def get_usage(self, messages: List[BaseMessage], content: str) -> dict:
+        # Four characters per token, enough for the usage accounting of load tests
+        input_tokens = len(get_prompt_text(messages)) // 4
+        output_tokens = len(content) // 4
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+
+    def make_result(self, messages: List[BaseMessage], content: str) -> ChatResult:
+        message = AIMessage(content=content, usage_metadata=self.get_usage(messages, content), response_metadata={"model_name": self.model})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, schema_name: Optional[str] = None, **kwargs: Any) -> ChatResult:
+        content, delay = self.get_response(messages, schema_name)
+        time.sleep(delay)
+        return self.make_result(messages, content)
+
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, schema_name: Optional[str] = None, **kwargs: Any) -> ChatResult:
+        content, delay = self.get_response(messages, schema_name)
+        await asyncio.sleep(delay)
+        return self.make_result(messages, content)
+
+
+    def get_chunks(self, content: str):
+        return [content[index:index + self.stream_chunk_size] for index in range(0, len(content), self.stream_chunk_size)]
+
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, schema_name: Optional[str] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        content, delay = self.get_response(messages, schema_name)
+        chunks = self.get_chunks(content)
+        for text in chunks:
+            time.sleep(delay / len(chunks))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+        # The usage comes with a last empty chunk, as with the provider SDKs
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self.get_usage(messages, content), response_metadata={"model_name": self.model}))
+
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, schema_name: Optional[str] = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        content, delay = self.get_response(messages, schema_name)
+        chunks = self.get_chunks(content)
+        for text in chunks:
+            await asyncio.sleep(delay / len(chunks))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                await run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+        # The usage comes with a last empty chunk, as with the provider SDKs
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self.get_usage(messages, content), response_metadata={"model_name": self.model}))
@@ -0,0 +1,48 @@
+from typing import Any, Dict, Optional, Tuple
+from loguru import logger
+from src.infra_genie.state.infra_genie_state import TerraformComponent
+from src.infra_genie.utils import constants as const
+
+
+class ModelRouter:
+    """
+        Picks the model of each LLM call by task type:
+        - generation    first generation and full regeneration
+        - fallback      plain text generation after a failed structured generation
+        - large_fix     localized fix of a component with many errors or much code
+        - trivial_fix   localized fix of at most trivial_fix_max_errors errors in a
+                        component of at most trivial_fix_max_lines lines
+
+        Tasks without a route go to the default model, the one selected by the user.
+    """
+
+    def __init__(self, default_llm, default_model: Optional[str] = None, routes: Optional[Dict[str, Tuple[str, Any]]] = None,
+                 trivial_fix_max_errors: int = 2, trivial_fix_max_lines: int = 150):
+        self.default_llm = default_llm
+        self.default_model = default_model
+        # task -> (model name, llm)
+        self.routes = routes or {}
+        self.trivial_fix_max_errors = trivial_fix_max_errors
+        self.trivial_fix_max_lines = trivial_fix_max_lines
+
+
+    def get_llm(self, task: str):
+        return self.routes[task][1] if task in self.routes else self.default_llm
+
+
+    def get_model_name(self, task: str) -> Optional[str]:
+        return self.routes[task][0] if task in self.routes else self.default_model
+
+
+    def get_fix_task(self, error_count: int, component: TerraformComponent) -> str:
+        line_count = sum(code.count("\n") + 1 for code in (component.main_tf, component.variables_tf, component.output_tf) if code)
+
+        if error_count <= self.trivial_fix_max_errors and line_count <= self.trivial_fix_max_lines:
+            return const.ROUTE_TRIVIAL_FIX
+        return const.ROUTE_LARGE_FIX
+
+
+    def get_fix_llm(self, error_count: int, component: TerraformComponent):
+        task = self.get_fix_task(error_count, component)
+        logger.info(f"Routing the {task} of {component.name} to {self.get_model_name(task) or 'the selected model'}")
+        return self.get_llm(task)
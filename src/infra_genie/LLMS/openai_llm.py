@@ -1,9 +1,8 @@
-import os
-import streamlit as st
-from langchain_openai import ChatOpenAI
+from src.infra_genie.LLMS.llm_factory import get_llm
 
 
 class OpenAILLM:
+    """Kept for existing callers, the models come from the shared LLMFactory"""
     def __init__(self, user_controls_input=None, model=None, api_key=None):
         self.user_controls_input = user_controls_input
         self.model = model
@@ -11,15 +10,6 @@ class OpenAILLM:
         
         
     def get_llm_model(self):
-        try:
-            if  self.user_controls_input:
-                openai_api_key = self.user_controls_input['OPENAI_API_KEY']
-                selected_openai_model = self.user_controls_input['selected_openai_model']
-                llm = ChatOpenAI(api_key=openai_api_key, model= selected_openai_model)
-            else:
-                llm = ChatOpenAI(api_key=openai_api_key, model= self.model)
-
-        except Exception as e:
-            raise ValueError(f"Error occured with Exception : {e}")
-        
-        return llm
\ No newline at end of file
+        if self.user_controls_input:
+            return get_llm("OpenAI", self.user_controls_input['selected_openai_model'], self.user_controls_input['OPENAI_API_KEY'])
+        return get_llm("OpenAI", self.model, self.api_key)
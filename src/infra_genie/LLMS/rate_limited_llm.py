@@ -0,0 +1,344 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator, Optional
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.runnables.config import merge_configs
+from loguru import logger
+
+
+class RedisTokenBucket:
+    """
+        Token bucket shared by every process through Redis, refilled continuously up to
+        `per_minute`. The refill uses the Redis clock so hosts with skewed clocks agree.
+    """
+
+    # Returns the seconds to wait before `amount` is available, 0 when it was taken.
+    # force=1 takes the amount regardless, used to settle estimates with the real usage.
+    SCRIPT = """
+        local capacity = tonumber(ARGV[1])
+        local rate = capacity / 60
+        local amount = tonumber(ARGV[2])
+        local force = tonumber(ARGV[3])
+        local clock = redis.call('TIME')
+        local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+        local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+        local tokens = tonumber(bucket[1]) or capacity
+        local ts = tonumber(bucket[2]) or now
+        tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+        local wait = 0
+        if force == 1 or tokens >= amount then
+            tokens = tokens - amount
+        else
+            wait = (amount - tokens) / rate
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+        redis.call('EXPIRE', KEYS[1], 120)
+        return tostring(wait)
+    """
+
+    def __init__(self, client, key: str, per_minute: int):
+        self.client = client
+        self.key = key
+        self.per_minute = per_minute
+        self._script = client.register_script(self.SCRIPT)
+
+    def try_acquire(self, amount: float, force: bool = False) -> float:
+        """
+            Takes amount from the bucket, returns the seconds to wait when it is not available.
+            Fails open when Redis is unreachable: the provider's own limit still applies.
+        """
+        # Larger than the bucket: wait for a full bucket instead of forever
+        amount = min(amount, self.per_minute)
+        try:
+            return float(self._script(keys=[self.key], args=[self.per_minute, amount, int(force)]))
+        except Exception as e:
+            logger.warning(f"Rate limiter {self.key} unavailable: {e}")
+            return 0.0
+
+
+class AdaptiveConcurrency:
+    """
+        AIMD concurrency limit of one provider/model in this process: grows by one
+        after `limit` successful calls, halves on every rate-limit response.
+    """
+
+    def __init__(self, initial: int = 4, maximum: int = 16):
+        self.limit = float(initial)
+        self.maximum = maximum
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def release(self, rate_limited: bool = False):
+        with self._lock:
+            self.in_flight -= 1
+            if rate_limited:
+                self.limit = max(1.0, self.limit / 2)
+            else:
+                self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+
+
+## Shared by every graph in the process, keyed by "Provider:model"
+_concurrency = {}
+_registry_lock = threading.Lock()
+
+
+def get_adaptive_concurrency(name: str, **kwargs) -> AdaptiveConcurrency:
+    with _registry_lock:
+        if name not in _concurrency:
+            _concurrency[name] = AdaptiveConcurrency(**kwargs)
+        return _concurrency[name]
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """429 responses of the provider SDKs, recognized by status code, class name or message"""
+    status_code = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status_code == 429:
+        return True
+    text = f"{type(error).__name__} {error}".lower()
+    return "ratelimit" in text or "rate limit" in text or "429" in text or "resource_exhausted" in text
+
+
+def get_retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the provider asked to wait in its Retry-After header, if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class UsageHandler(BaseCallbackHandler):
+    """
+        Sums the tokens the chat models of one call report when they finish. Also sees the
+        message behind structured output, and the aggregated chunks of a streamed call.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.total_tokens = 0
+        self._lock = threading.Lock()
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        for generations in response.generations:
+            message = getattr(generations[0], "message", None) if generations else None
+            usage = getattr(message, "usage_metadata", None) or {}
+            with self._lock:
+                self.total_tokens += usage.get("total_tokens") or 0
+
+
+class RateLimitedLLM(Runnable):
+    """
+        Keeps calls to one provider/model under its requests and tokens per minute
+        (buckets shared through Redis) and an adaptive in-process concurrency limit.
+        Rate-limit errors are retried with jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        llm: Runnable,
+        name: str,
+        client=None,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        max_concurrency: int = 16,
+        max_retries: int = 4,
+        base_delay: float = 2.0,
+        max_delay: float = 60.0,
+        estimated_output_tokens: int = 4000,
+    ):
+        self.llm = llm
+        self.name = name
+        self.settings = dict(
+            client=client,
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            max_concurrency=max_concurrency,
+            max_retries=max_retries,
+            base_delay=base_delay,
+            max_delay=max_delay,
+            estimated_output_tokens=estimated_output_tokens,
+        )
+        # 0 means no limit
+        self.request_bucket = RedisTokenBucket(client, f"ratelimit:{name}:rpm", requests_per_minute) if client is not None and requests_per_minute else None
+        self.token_bucket = RedisTokenBucket(client, f"ratelimit:{name}:tpm", tokens_per_minute) if client is not None and tokens_per_minute else None
+        self.concurrency = get_adaptive_concurrency(name, initial=min(4, max_concurrency), maximum=max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.estimated_output_tokens = estimated_output_tokens
+
+
+    def with_structured_output(self, schema, **kwargs) -> "RateLimitedLLM":
+        return RateLimitedLLM(self.llm.with_structured_output(schema, **kwargs), self.name, **self.settings)
+
+
+    ## ------- Admission ------- ##
+    def estimate_tokens(self, input: Any) -> int:
+        """Rough token count of a call: about four characters per prompt token plus the expected output"""
+        return len(str(input)) // 4 + self.estimated_output_tokens
+
+
+    def get_admission_delay(self, estimated_tokens: int) -> float:
+        """Seconds to wait before the call may start, 0 once its request and tokens are taken"""
+        if self.request_bucket:
+            delay = self.request_bucket.try_acquire(1)
+            if delay:
+                return delay
+        if self.token_bucket:
+            delay = self.token_bucket.try_acquire(estimated_tokens)
+            if delay:
+                # Give the request back, it is retried after the delay
+                if self.request_bucket:
+                    self.request_bucket.try_acquire(-1, force=True)
+                return delay
+        return 0.0
+
+
+    def settle_tokens(self, usage: UsageHandler, estimated_tokens: int):
+        """Corrects the tokens taken from the bucket with the usage the provider reported"""
+        if self.token_bucket and usage.total_tokens:
+            self.token_bucket.try_acquire(usage.total_tokens - estimated_tokens, force=True)
+
+
+    def get_backoff(self, attempt: int, error: BaseException) -> float:
+        """Full jitter exponential backoff, never shorter than the provider's Retry-After"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, get_retry_after(error) or 0)
+
+
+    ## ------- Calls ------- ##
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        estimated_tokens = self.estimate_tokens(input)
+
+        for attempt in range(self.max_retries + 1):
+            while not self.concurrency.try_acquire():
+                time.sleep(0.05)
+
+            rate_limited = False
+            try:
+                while (delay := self.get_admission_delay(estimated_tokens)) > 0:
+                    time.sleep(delay)
+
+                usage = UsageHandler()
+                result = self.llm.invoke(input, merge_configs(config, {"callbacks": [usage]}), **kwargs)
+                self.settle_tokens(usage, estimated_tokens)
+                return result
+
+            except Exception as e:
+                rate_limited = is_rate_limit_error(e)
+                if not rate_limited or attempt == self.max_retries:
+                    raise
+                backoff = self.get_backoff(attempt, e)
+                logger.warning(f"{self.name} rate limited, retry {attempt + 1}/{self.max_retries} in {backoff:.1f}s")
+            finally:
+                self.concurrency.release(rate_limited)
+
+            time.sleep(backoff)
+
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        estimated_tokens = self.estimate_tokens(input)
+
+        for attempt in range(self.max_retries + 1):
+            while not self.concurrency.try_acquire():
+                await asyncio.sleep(0.05)
+
+            rate_limited = False
+            try:
+                while (delay := await asyncio.to_thread(self.get_admission_delay, estimated_tokens)) > 0:
+                    await asyncio.sleep(delay)
+
+                usage = UsageHandler()
+                result = await self.llm.ainvoke(input, merge_configs(config, {"callbacks": [usage]}), **kwargs)
+                await asyncio.to_thread(self.settle_tokens, usage, estimated_tokens)
+                return result
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                rate_limited = is_rate_limit_error(e)
+                if not rate_limited or attempt == self.max_retries:
+                    raise
+                backoff = self.get_backoff(attempt, e)
+                logger.warning(f"{self.name} rate limited, retry {attempt + 1}/{self.max_retries} in {backoff:.1f}s")
+            finally:
+                self.concurrency.release(rate_limited)
+
+            await asyncio.sleep(backoff)
+
+
+    def stream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Iterator[Any]:
+        """Same limits as invoke, held until the stream ends. Only retried before the first chunk"""
+        estimated_tokens = self.estimate_tokens(input)
+
+        for attempt in range(self.max_retries + 1):
+            while not self.concurrency.try_acquire():
+                time.sleep(0.05)
+
+            rate_limited = False
+            streamed = False
+            try:
+                while (delay := self.get_admission_delay(estimated_tokens)) > 0:
+                    time.sleep(delay)
+
+                usage = UsageHandler()
+                for chunk in self.llm.stream(input, merge_configs(config, {"callbacks": [usage]}), **kwargs):
+                    streamed = True
+                    yield chunk
+                self.settle_tokens(usage, estimated_tokens)
+                return
+
+            except Exception as e:
+                rate_limited = is_rate_limit_error(e)
+                if not rate_limited or streamed or attempt == self.max_retries:
+                    raise
+                backoff = self.get_backoff(attempt, e)
+                logger.warning(f"{self.name} rate limited, retry {attempt + 1}/{self.max_retries} in {backoff:.1f}s")
+            finally:
+                self.concurrency.release(rate_limited)
+
+            time.sleep(backoff)
+
+
+    async def astream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> AsyncIterator[Any]:
+        estimated_tokens = self.estimate_tokens(input)
+
+        for attempt in range(self.max_retries + 1):
+            while not self.concurrency.try_acquire():
+                await asyncio.sleep(0.05)
+
+            rate_limited = False
+            streamed = False
+            try:
+                while (delay := await asyncio.to_thread(self.get_admission_delay, estimated_tokens)) > 0:
+                    await asyncio.sleep(delay)
+
+                usage = UsageHandler()
+                async for chunk in self.llm.astream(input, merge_configs(config, {"callbacks": [usage]}), **kwargs):
+                    streamed = True
+                    yield chunk
+                await asyncio.to_thread(self.settle_tokens, usage, estimated_tokens)
+                return
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                rate_limited = is_rate_limit_error(e)
+                if not rate_limited or streamed or attempt == self.max_retries:
+                    raise
+                backoff = self.get_backoff(attempt, e)
+                logger.warning(f"{self.name} rate limited, retry {attempt + 1}/{self.max_retries} in {backoff:.1f}s")
+            finally:
+                self.concurrency.release(rate_limited)
+
+            await asyncio.sleep(backoff)
@@ -0,0 +1,263 @@
+"""
+    HTTP service around GraphExecutor.
+
+    Usage:
+        python -m src.infra_genie.api.app --workers 4
+
+    Endpoints run the graph with the native async API. Every workflow keeps its
+    state in the Redis checkpointer, so any server worker can serve any task_id.
+    Requests with ?stream=true answer with Server-Sent Events, one "node" event
+    per finished node followed by a "done" (or "error") event.
+"""
+import argparse
+import asyncio
+import json
+import os
+import uuid
+from typing import Optional
+from dotenv import load_dotenv
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from loguru import logger
+from src.infra_genie.api.schemas import AutomaticRunRequest, ReviewRequest, StartWorkflowRequest, WorkflowResponse
+from src.infra_genie.cache.redis_cache import redis_client
+from src.infra_genie.cache.response_cache import get_response_cache
+from src.infra_genie.cache.usage_metrics import get_usage_metrics_store
+from src.infra_genie.graph.graph_executor import GraphExecutor
+from src.infra_genie.graph.graph_factory import get_graph
+from src.infra_genie.LLMS.llm_factory import LLMFactory
+from src.infra_genie.state.infra_genie_state import UserInput
+from src.infra_genie.ui.uiconfigfile import Config
+from src.infra_genie.utils.artifact_utils import create_zip_from_output_folder
+from src.infra_genie.utils.workspace import get_workspace
+
+load_dotenv()
+
+app = FastAPI(title="InfraGenie", description="Generate and validate Terraform code for AWS")
+config = Config()
+
+WORKFLOW_TTL_SECONDS = 86400
+
+
+## ------- Workflow registry (LLM selection per task, API keys are never stored) ------- ##
+def save_workflow(task_id: str, request: StartWorkflowRequest, automatic: bool = False):
+    key = f"workflow:{task_id}"
+    redis_client.hset(key, mapping={
+        "project_name": request.project_name,
+        "provider": request.provider,
+        "model": request.model,
+        "generation_mode": request.generation_mode or config.get_generation_mode(),
+        "automatic": str(automatic),
+    })
+    redis_client.expire(key, WORKFLOW_TTL_SECONDS)
+
+
+def load_workflow(task_id: str):
+    saved = redis_client.hgetall(f"workflow:{task_id}")
+    if not saved:
+        raise HTTPException(status_code=404, detail=f"Unknown workflow: {task_id}")
+    return {key.decode(): value.decode() for key, value in saved.items()}
+
+
+def get_executor(task_id: str, workflow: dict, api_key: Optional[str]) -> GraphExecutor:
+    try:
+        graph = get_graph(
+            config, workflow["provider"], workflow["model"], api_key, workflow["generation_mode"],
+            automatic=workflow.get("automatic") == "True"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Graph setup failed: {e}")
+    return GraphExecutor(graph, task_id, config=config)
+
+
+async def get_response(graph_executor: GraphExecutor, task_id: str) -> WorkflowResponse:
+    snapshot = await graph_executor.graph.aget_state(graph_executor.get_thread(task_id))
+    return WorkflowResponse(task_id=task_id, next=list(snapshot.next), state=jsonable_encoder(snapshot.values))
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+def stream_progress(graph_executor: GraphExecutor, task_id: str, run):
+    """
+        Runs run(on_update) in the background and streams every node update as an SSE event
+    """
+    async def events():
+        updates = asyncio.Queue()
+        task = asyncio.create_task(run(lambda node_name, update: updates.put_nowait((node_name, update))))
+        task.add_done_callback(lambda _: updates.put_nowait(None))
+
+        try:
+            while (item := await updates.get()) is not None:
+                node_name, update = item
+                yield sse_event("node", {"node": node_name, "update": update})
+
+            # The task is cancelled when the server shuts down, exception() would raise
+            if task.cancelled():
+                yield sse_event("error", {"task_id": task_id, "detail": "Workflow run was cancelled"})
+            elif task.exception():
+                yield sse_event("error", {"task_id": task_id, "detail": str(task.exception())})
+            else:
+                yield sse_event("done", await get_response(graph_executor, task_id))
+        finally:
+            # Client went away: stop generating for it
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+## ------- Endpoints ------- ##
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit ratio of the LLM response cache"""
+    response_cache = get_response_cache(config)
+    if not response_cache:
+        return {"enabled": False}
+    return {"enabled": True, **await asyncio.to_thread(response_cache.get_stats)}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Tokens, latency and estimated cost per node over all tasks, in the Prometheus text format"""
+    usage_metrics = get_usage_metrics_store(config)
+    if not usage_metrics:
+        raise HTTPException(status_code=404, detail="Usage metrics are disabled")
+    return await asyncio.to_thread(usage_metrics.to_prometheus)
+
+
+@app.post("/workflows", response_model=WorkflowResponse)
+async def start_workflow(request: StartWorkflowRequest, x_llm_api_key: Optional[str] = Header(default=None)):
+    """Starts a workflow, it then waits for the requirements"""
+    if not LLMFactory(config).has_provider(request.provider):
+        raise HTTPException(status_code=400, detail=f"Unsupported LLM provider: {request.provider}")
+
+    task_id = f"ig-api-{uuid.uuid4().hex[:8]}"
+    save_workflow(task_id, request)
+
+    graph_executor = get_executor(task_id, load_workflow(task_id), x_llm_api_key)
+    await graph_executor.astart_workflow(request.project_name)
+    logger.info(f"Started workflow {task_id}")
+    return await get_response(graph_executor, task_id)
+
+
+@app.post("/workflows/automatic", response_model=WorkflowResponse)
+async def run_automatic(request: AutomaticRunRequest, stream: bool = False, x_llm_api_key: Optional[str] = Header(default=None)):
+    """Generates, validates and fixes the code in one call, without review interrupts"""
+    if not LLMFactory(config).has_provider(request.provider):
+        raise HTTPException(status_code=400, detail=f"Unsupported LLM provider: {request.provider}")
+
+    task_id = f"ig-api-{uuid.uuid4().hex[:8]}"
+    save_workflow(task_id, request, automatic=True)
+    graph_executor = get_executor(task_id, load_workflow(task_id), x_llm_api_key)
+
+    if stream:
+        return stream_progress(
+            graph_executor, task_id,
+            lambda on_update: graph_executor.arun_automatic(request.project_name, request.user_input, on_update=on_update)
+        )
+
+    await graph_executor.arun_automatic(request.project_name, request.user_input)
+    return await get_response(graph_executor, task_id)
+
+
+@app.post("/workflows/{task_id}/requirements", response_model=WorkflowResponse)
+async def submit_requirements(task_id: str, user_input: UserInput, stream: bool = False, x_llm_api_key: Optional[str] = Header(default=None)):
+    """Generates the Terraform code for the requirements"""
+    graph_executor = get_executor(task_id, load_workflow(task_id), x_llm_api_key)
+
+    if stream:
+        return stream_progress(
+            graph_executor, task_id,
+            lambda on_update: graph_executor.agenerate_code(task_id, user_input, on_update=on_update)
+        )
+
+    await graph_executor.agenerate_code(task_id, user_input)
+    return await get_response(graph_executor, task_id)
+
+
+@app.post("/workflows/{task_id}/review", response_model=WorkflowResponse)
+async def submit_review(task_id: str, review: ReviewRequest, stream: bool = False, x_llm_api_key: Optional[str] = Header(default=None)):
+    """Resumes the workflow with a review: validate the code, approve it or send feedback"""
+    graph_executor = get_executor(task_id, load_workflow(task_id), x_llm_api_key)
+
+    # Applied before the run starts, so an invalid review is a 400 for streamed requests too
+    saved_state = await graph_executor.aget_saved_state(task_id)
+    try:
+        node_name = graph_executor.apply_review(saved_state, review.status, review.feedback, review.review_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if stream:
+        return stream_progress(
+            graph_executor, task_id,
+            lambda on_update: graph_executor.aupdate_and_resume_graph(saved_state, task_id, node_name, on_update=on_update)
+        )
+
+    await graph_executor.aupdate_and_resume_graph(saved_state, task_id, node_name)
+    return await get_response(graph_executor, task_id)
+
+
+@app.get("/workflows/{task_id}/state", response_model=WorkflowResponse)
+async def get_state(task_id: str, x_llm_api_key: Optional[str] = Header(default=None)):
+    graph_executor = get_executor(task_id, load_workflow(task_id), x_llm_api_key)
+    return await get_response(graph_executor, task_id)
+
+
+@app.get("/workflows/{task_id}/metrics")
+async def get_metrics(task_id: str):
+    """Tokens, latency and estimated cost of the task per node"""
+    load_workflow(task_id)
+    usage_metrics = get_usage_metrics_store(config)
+    if not usage_metrics:
+        raise HTTPException(status_code=404, detail="Usage metrics are disabled")
+    return {"task_id": task_id, **await asyncio.to_thread(usage_metrics.get_task_metrics, task_id)}
+
+
+@app.get("/workflows/{task_id}/artifacts")
+async def download_artifacts(task_id: str):
+    """Downloads the generated Terraform code as a zip"""
+    load_workflow(task_id)
+    zip_path = await asyncio.to_thread(create_zip_from_output_folder, get_workspace(task_id))
+    if not zip_path:
+        raise HTTPException(status_code=404, detail="No artifacts generated yet")
+    return FileResponse(zip_path, media_type="application/zip", filename=os.path.basename(zip_path))
+
+
+## ------- Server ------- ##
+def serve(host: str = None, port: int = None, workers: int = None):
+    """
+        Runs the API under uvicorn with several worker processes
+    """
+    try:
+        import uvicorn
+    except ImportError:
+        raise ImportError("uvicorn is required to serve the API: uv add uvicorn")
+
+    uvicorn.run(
+        "src.infra_genie.api.app:app",
+        host=host or config.get_api_host(),
+        port=port or config.get_api_port(),
+        workers=workers or config.get_api_workers(),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="InfraGenie API server")
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None, help="Number of server worker processes")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field, field_validator
+from src.infra_genie.state.infra_genie_state import UserInput
+from src.infra_genie.utils import constants as const
+
+
+class StartWorkflowRequest(BaseModel):
+    project_name: str = Field(..., description="Name of the project")
+    provider: str = Field(..., description="LLM provider, one of the configured LLM_OPTIONS")
+    model: str = Field(..., description="Model name of the provider")
+    generation_mode: Optional[str] = Field(default=None, description="standard | parallel | speculative | streaming, defaults to the configured mode")
+
+    @field_validator("generation_mode")
+    @classmethod
+    def check_generation_mode(cls, value: Optional[str]) -> Optional[str]:
+        # Rejected with a 422 instead of failing while the graph is built
+        if value is not None and value not in const.GENERATION_MODES:
+            raise ValueError(f"generation_mode must be one of {', '.join(const.GENERATION_MODES)}")
+        return value
+
+
+class AutomaticRunRequest(StartWorkflowRequest):
+    user_input: UserInput = Field(..., description="Infrastructure requirements")
+
+
+class ReviewRequest(BaseModel):
+    review_type: str = Field(..., description="save_code to validate the generated code, code_validation to review it")
+    status: Optional[str] = Field(default=None, description="approved | feedback for code_validation reviews")
+    feedback: Optional[str] = Field(default=None, description="Feedback used to revise the code")
+
+
+class WorkflowResponse(BaseModel):
+    task_id: str
+    next: List[str] = Field(default_factory=list, description="Nodes the workflow is waiting to run")
+    state: Dict[str, Any] = Field(default_factory=dict)
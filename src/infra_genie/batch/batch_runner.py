@@ -0,0 +1,197 @@
+"""
+    Headless batch generation over a JSONL file of infrastructure specs.
+
+    Usage:
+        python -m src.infra_genie.batch.batch_runner specs.jsonl --provider Groq --model llama3-70b-8192 --concurrency 8
+
+    Every line is a UserInput, optionally with a "name". Each spec runs through the
+    automatic graph: the code is validated and fixed until it is valid or the
+    iteration budget is spent. The output directory gets one artifact directory
+    per spec and a summary.json with the results.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from pathlib import Path
+from dotenv import load_dotenv
+from langchain_core.callbacks import UsageMetadataCallbackHandler
+from loguru import logger
+from src.infra_genie.cache.response_cache import get_response_cache
+from src.infra_genie.graph.graph_executor import GraphExecutor
+from src.infra_genie.graph.graph_factory import get_graph
+from src.infra_genie.state.infra_genie_state import UserInput
+from src.infra_genie.ui.uiconfigfile import Config
+from src.infra_genie.utils.artifact_utils import EXCLUDED_ARTIFACTS
+from src.infra_genie.utils.logging_config import setup_logging
+from src.infra_genie.utils.workspace import get_workspace
+
+
+class BatchRunner:
+
+    def __init__(self, graph, output_dir: str, concurrency: int = 4, response_cache=None):
+        """graph must be compiled with automatic=True, response_cache is reported in the summary"""
+        self.graph = graph
+        self.response_cache = response_cache
+        self.output_dir = Path(output_dir)
+        self.concurrency = concurrency
+        self.batch_id = uuid.uuid4().hex[:8]
+
+
+    def load_specs(self, specs_path: str):
+        """
+            Reads the specs, returns (name, UserInput) pairs with unique file-system safe names
+        """
+        specs = []
+        names = set()
+
+        with open(specs_path) as f:
+            for index, line in enumerate(f):
+                if not line.strip():
+                    continue
+
+                spec = json.loads(line)
+                name = re.sub(r"[^A-Za-z0-9_.-]", "_", str(spec.pop("name", f"spec-{index}")))
+                if name in names:
+                    name = f"{name}-{index}"
+                names.add(name)
+
+                specs.append((name, UserInput.model_validate(spec)))
+
+        return specs
+
+
+    async def run(self, specs):
+        """
+            Runs every spec with at most `concurrency` in flight, returns the summary
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_bounded(name, user_input):
+            async with semaphore:
+                return await self.run_spec(name, user_input)
+
+        started = time.monotonic()
+        results = await asyncio.gather(*(run_bounded(name, user_input) for name, user_input in specs))
+
+        summary = {
+            "batch_id": self.batch_id,
+            "specs": len(results),
+            "valid": sum(1 for result in results if result["status"] == "valid"),
+            "concurrency": self.concurrency,
+            "wall_time_seconds": round(time.monotonic() - started, 2),
+            "total_tokens": sum(result["total_tokens"] for result in results),
+            "cache_read_tokens": sum(result["cache_read_tokens"] for result in results),
+            "cost_usd": round(sum(result["cost_usd"] for result in results), 6),
+            "response_cache": self.response_cache.get_stats()["process"] if self.response_cache else None,
+            "results": results,
+        }
+
+        with open(self.output_dir / "summary.json", "w") as f:
+            json.dump(summary, f, indent=2)
+
+        logger.success(f"Batch {self.batch_id}: {summary['valid']}/{summary['specs']} specs valid in {summary['wall_time_seconds']}s")
+        return summary
+
+
+    async def run_spec(self, name: str, user_input: UserInput):
+        """
+            Runs one spec end to end, never raises so one failing spec does not stop the batch
+        """
+        task_id = f"batch-{self.batch_id}-{name}"
+        usage_handler = UsageMetadataCallbackHandler()
+        graph_executor = GraphExecutor(self.graph, task_id, callbacks=[usage_handler])
+
+        result = {"name": name, "task_id": task_id, "status": "error", "error": None}
+        started = time.monotonic()
+        state = None
+
+        try:
+            logger.info(f"Batch spec {name} started")
+            await graph_executor.arun_automatic(name, user_input)
+            state = await graph_executor.aget_saved_state(task_id)
+
+            if not state.code_generated:
+                result["status"] = "generation_failed"
+            else:
+                result["status"] = "valid" if state.is_code_valid else "invalid"
+
+        except Exception as e:
+            logger.error(f"Batch spec {name} failed: {e}")
+            result["error"] = str(e)
+
+        result.update(self.get_usage(usage_handler))
+        usage_metrics = graph_executor.token_usage.get_metrics()
+        result["cost_usd"] = round(usage_metrics["total"]["cost_usd"], 6)
+        result["node_metrics"] = usage_metrics["nodes"]
+        result["wall_time_seconds"] = round(time.monotonic() - started, 2)
+        result["validation_iterations"] = state.validation_iterations if state else 0
+        result["validation_feedback"] = state.code_validation_feedback if state else None
+        result["fix_loop_stop_reason"] = state.fix_loop_stop_reason if state else None
+        result["artifact_dir"] = self.save_artifacts(name, task_id, result)
+
+        logger.info(f"Batch spec {name} finished: {result['status']} in {result['wall_time_seconds']}s")
+        return result
+
+
+    def get_usage(self, usage_handler: UsageMetadataCallbackHandler):
+        usage = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0, "cache_read_tokens": 0}
+        for model_usage in usage_handler.usage_metadata.values():
+            usage["input_tokens"] += model_usage.get("input_tokens", 0)
+            usage["output_tokens"] += model_usage.get("output_tokens", 0)
+            usage["total_tokens"] += model_usage.get("total_tokens", 0)
+            # Prompt tokens the provider served from its prefix cache
+            usage["cache_read_tokens"] += model_usage.get("input_token_details", {}).get("cache_read", 0)
+        return usage
+
+
+    def save_artifacts(self, name: str, task_id: str, result: dict) -> str:
+        """
+            Copies the generated code of a spec next to its result.json
+        """
+        artifact_dir = self.output_dir / name
+        if artifact_dir.exists():
+            shutil.rmtree(artifact_dir)
+        artifact_dir.mkdir(parents=True)
+
+        workspace = get_workspace(task_id)
+        if workspace.exists():
+            # Provider plugins and plans are not part of the artifacts
+            shutil.copytree(workspace, artifact_dir / "src", ignore=shutil.ignore_patterns(*EXCLUDED_ARTIFACTS))
+
+        with open(artifact_dir / "result.json", "w") as f:
+            json.dump({**result, "artifact_dir": str(artifact_dir)}, f, indent=2)
+
+        return str(artifact_dir)
+
+
+def main():
+    load_dotenv()
+    config = Config()
+
+    parser = argparse.ArgumentParser(description="Generate Terraform for many specs without the UI")
+    parser.add_argument("specs", help="JSONL file, one UserInput per line")
+    parser.add_argument("--provider", required=True, help="LLM provider, e.g. Groq")
+    parser.add_argument("--model", required=True, help="Model of the provider")
+    parser.add_argument("--generation-mode", default=None, help="standard | parallel | speculative | streaming")
+    parser.add_argument("--concurrency", type=int, default=config.get_batch_concurrency())
+    parser.add_argument("--output-dir", default=os.path.join("output", "batch"))
+    args = parser.parse_args()
+
+    setup_logging(log_level=os.getenv("LOG_LEVEL", "INFO"))
+
+    # API key read from <PROVIDER>_API_KEY
+    graph = get_graph(config, args.provider, args.model, None, args.generation_mode, automatic=True)
+    runner = BatchRunner(graph, args.output_dir, args.concurrency, get_response_cache(config))
+
+    summary = asyncio.run(runner.run(runner.load_specs(args.specs)))
+    print(json.dumps({key: value for key, value in summary.items() if key != "results"}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,6 @@
 import redis
-import json
-from typing import Optional
-from src.infra_genie.state.infra_genie_state import InfraGenieState, CustomEncoder
 import os
 from dotenv import load_dotenv
-from loguru import logger
 
 load_dotenv()
 
@@ -16,38 +12,13 @@ load_dotenv()
 # REDIS_TOKEN = os.getenv("REDIS_TOKEN")
 # redis_client = redis = Redis(url=REDIS_URL, token=REDIS_TOKEN)
 
-## For testing locally with docker
+## For testing locally with docker, workers on other hosts point REDIS_HOST at the shared instance
 redis_client = redis.Redis(
-    host='localhost',  # Replace with your Redis host
-    port=6379,         # Replace with your Redis port
-    db=0               # Replace with your Redis database number
+    host=os.getenv("REDIS_HOST", "localhost"),
+    port=int(os.getenv("REDIS_PORT", "6379")),
+    db=int(os.getenv("REDIS_DB", "0"))
 )
 
-def save_state_to_redis(task_id: str, state: InfraGenieState):
-    """Save the state to Redis."""
-    state = json.dumps(state, cls=CustomEncoder)
-    redis_client.set(task_id, state)
-
-    # Set expiration for 24 hours
-    redis_client.expire(task_id, 86400)
-
-def get_state_from_redis(task_id: str) -> Optional[InfraGenieState]:
-    """ Retrieves the state from redis """
-    state_json = redis_client.get(task_id)
-    if not state_json:
-        return None
-    
-    state_dict = json.loads(state_json)[0]
-    return InfraGenieState(**state_dict)
-
 def delete_from_redis(task_id: str):
     """ Delete from redis """
     redis_client.delete(task_id)
-
-def flush_redis_cache():
-    """ Flushes the whole cache"""
-
-    # Clear all keys in all databases
-    redis_client.flushall()
-
-    logger.info("--- Redis cache cleared ---")
\ No newline at end of file
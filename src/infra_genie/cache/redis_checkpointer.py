@@ -0,0 +1,285 @@
+import asyncio
+import base64
+import json
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+from loguru import logger
+
+
+class RedisSaver(BaseCheckpointSaver):
+    """
+        LangGraph checkpointer storing checkpoints and pending writes in Redis,
+        so any process can resume any thread_id.
+
+        Keys (expiring after ttl_seconds, refreshed on every write):
+        - checkpoint:{thread_id}:{checkpoint_ns}:{checkpoint_id}        hash with the serialized checkpoint
+        - checkpoint_writes:{thread_id}:{checkpoint_ns}:{checkpoint_id} hash with the pending writes
+        - checkpoint_index:{thread_id}:{checkpoint_ns}                  sorted set of checkpoint ids
+    """
+
+    def __init__(self, client, ttl_seconds: int = 86400, *, serde=None):
+        super().__init__(serde=serde)
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+
+
+    ## ------- Keys ------- ##
+    def _checkpoint_key(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> str:
+        return f"checkpoint:{thread_id}:{checkpoint_ns}:{checkpoint_id}"
+
+    def _writes_key(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> str:
+        return f"checkpoint_writes:{thread_id}:{checkpoint_ns}:{checkpoint_id}"
+
+    def _index_key(self, thread_id: str, checkpoint_ns: str) -> str:
+        return f"checkpoint_index:{thread_id}:{checkpoint_ns}"
+
+
+    ## ------- Sync API ------- ##
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+
+        if not checkpoint_id:
+            latest = self.client.zrevrangebylex(self._index_key(thread_id, checkpoint_ns), "+", "-", start=0, num=1)
+            if not latest:
+                return None
+            checkpoint_id = latest[0].decode()
+
+        return self._load_tuple(thread_id, checkpoint_ns, checkpoint_id)
+
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        for thread_id, checkpoint_ns in self._list_namespaces(config):
+            max_id = f"({get_checkpoint_id(before)}" if before and get_checkpoint_id(before) else "+"
+
+            config_checkpoint_id = get_checkpoint_id(config) if config else None
+            if config_checkpoint_id:
+                checkpoint_ids = [config_checkpoint_id.encode()]
+            else:
+                checkpoint_ids = self.client.zrevrangebylex(self._index_key(thread_id, checkpoint_ns), max_id, "-")
+
+            for checkpoint_id in checkpoint_ids:
+                checkpoint_tuple = self._load_tuple(thread_id, checkpoint_ns, checkpoint_id.decode())
+                if checkpoint_tuple is None:
+                    continue
+
+                if filter and not all(checkpoint_tuple.metadata.get(k) == v for k, v in filter.items()):
+                    continue
+
+                if limit is not None:
+                    if limit <= 0:
+                        return
+                    limit -= 1
+
+                yield checkpoint_tuple
+
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        parent_checkpoint_id = configurable.get("checkpoint_id")
+
+        checkpoint_type, serialized_checkpoint = self.serde.dumps_typed(checkpoint)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(metadata)
+
+        key = self._checkpoint_key(thread_id, checkpoint_ns, checkpoint["id"])
+        index_key = self._index_key(thread_id, checkpoint_ns)
+
+        pipe = self.client.pipeline()
+        pipe.hset(key, mapping={
+            "type": checkpoint_type,
+            "checkpoint": serialized_checkpoint,
+            "metadata_type": metadata_type,
+            "metadata": serialized_metadata,
+            "parent_checkpoint_id": parent_checkpoint_id or "",
+        })
+        pipe.expire(key, self.ttl_seconds)
+        pipe.zadd(index_key, {checkpoint["id"]: 0})
+        pipe.expire(index_key, self.ttl_seconds)
+        pipe.execute()
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        checkpoint_id = configurable["checkpoint_id"]
+
+        key = self._writes_key(thread_id, checkpoint_ns, checkpoint_id)
+
+        pipe = self.client.pipeline()
+        for idx, (channel, value) in enumerate(writes):
+            write_idx = WRITES_IDX_MAP.get(channel, idx)
+            value_type, serialized_value = self.serde.dumps_typed(value)
+            field = f"{task_id}:{write_idx}"
+            payload = json.dumps({
+                "task_id": task_id,
+                "task_path": task_path,
+                "idx": write_idx,
+                "channel": channel,
+                "type": value_type,
+                "value": base64.b64encode(serialized_value).decode(),
+            })
+
+            # Special channels (errors, interrupts) overwrite, regular writes are only stored once
+            if write_idx < 0:
+                pipe.hset(key, field, payload)
+            else:
+                pipe.hsetnx(key, field, payload)
+
+        pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+
+
+    def delete_thread(self, thread_id: str) -> None:
+        keys = list(self.client.scan_iter(match=f"checkpoint*:{thread_id}:*"))
+        if keys:
+            self.client.delete(*keys)
+        logger.info(f"Deleted checkpoints of thread {thread_id}")
+
+
+    ## ------- Async API (the redis client is sync, calls run in a worker thread) ------- ##
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        checkpoint_tuples = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint_tuple in checkpoint_tuples:
+            yield checkpoint_tuple
+
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+    ## ------- Helpers ------- ##
+    def _list_namespaces(self, config: Optional[RunnableConfig]):
+        """
+            Yields the (thread_id, checkpoint_ns) pairs matching the config
+        """
+        configurable = (config or {}).get("configurable", {})
+        thread_id = configurable.get("thread_id")
+
+        if thread_id is not None and "checkpoint_ns" in configurable:
+            yield thread_id, configurable["checkpoint_ns"]
+            return
+
+        pattern = f"checkpoint_index:{thread_id}:*" if thread_id is not None else "checkpoint_index:*"
+        for key in self.client.scan_iter(match=pattern):
+            key_thread_id, _, checkpoint_ns = key.decode()[len("checkpoint_index:"):].partition(":")
+            yield key_thread_id, checkpoint_ns
+
+
+    def _load_tuple(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> Optional[CheckpointTuple]:
+        saved = self.client.hgetall(self._checkpoint_key(thread_id, checkpoint_ns, checkpoint_id))
+        if not saved:
+            return None
+
+        checkpoint = self.serde.loads_typed((saved[b"type"].decode(), saved[b"checkpoint"]))
+        metadata = self.serde.loads_typed((saved[b"metadata_type"].decode(), saved[b"metadata"]))
+        parent_checkpoint_id = saved[b"parent_checkpoint_id"].decode()
+
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=checkpoint,
+            metadata=metadata,
+            parent_config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": parent_checkpoint_id,
+                }
+            } if parent_checkpoint_id else None,
+            pending_writes=self._load_writes(thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str):
+        saved = self.client.hgetall(self._writes_key(thread_id, checkpoint_ns, checkpoint_id))
+        writes = sorted(
+            (json.loads(payload) for payload in saved.values()),
+            key=lambda write: (write["task_path"], write["task_id"], write["idx"])
+        )
+        return [
+            (
+                write["task_id"],
+                write["channel"],
+                self.serde.loads_typed((write["type"], base64.b64decode(write["value"]))),
+            )
+            for write in writes
+        ]
@@ -0,0 +1,244 @@
+import asyncio
+import hashlib
+import ipaddress
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Type
+from loguru import logger
+from langchain_core.runnables import Runnable
+from pydantic import BaseModel
+from src.infra_genie.cache.redis_cache import redis_client
+from src.infra_genie.state.infra_genie_state import UserInput
+
+
+def normalize_cidr(cidr: str) -> str:
+    """10.0.1.7/24 and 10.0.1.0/24 are the same network"""
+    try:
+        return str(ipaddress.ip_network(cidr.strip(), strict=False))
+    except ValueError:
+        return cidr.strip()
+
+
+def canonicalize_user_input(user_input: UserInput) -> dict:
+    """
+        Returns the user input with everything whose order or spelling does not change
+        the infrastructure normalized: sorted services and AZs, normalized CIDRs,
+        collapsed whitespace in the requirements
+    """
+    canonical = user_input.model_dump()
+    canonical["services"] = sorted({service.strip().lower() for service in user_input.services})
+    canonical["availability_zones"] = sorted({zone.strip().lower() for zone in user_input.availability_zones})
+    canonical["vpc_cidr"] = normalize_cidr(user_input.vpc_cidr)
+    canonical["subnet_configuration"] = {
+        tier: sorted(normalize_cidr(cidr) for cidr in cidrs)
+        for tier, cidrs in user_input.subnet_configuration.items()
+    }
+    canonical["requirements"] = re.sub(r"\s+", " ", user_input.requirements).strip()
+    return canonical
+
+
+def has_components(output) -> bool:
+    """Empty generations are never cached"""
+    return bool(output and (output.environments or output.modules))
+
+
+def get_llm_identity(llm) -> str:
+    """Returns "<class>:<model>" of a chat model, the candidate names of a hedged model"""
+    if hasattr(llm, "candidates"):
+        return "|".join(name for name, _ in llm.candidates)
+    # Wrappers such as RateLimitedLLM
+    if isinstance(getattr(llm, "llm", None), Runnable):
+        return get_llm_identity(llm.llm)
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", None)
+    return f"{type(llm).__name__}:{model}"
+
+
+class ResponseCache:
+    """
+        Exact-match cache of LLM generations: an in-process LRU (L1) in front of Redis (L2).
+        L1 entries expire with their Redis key, and after at most l1_ttl_seconds so that
+        responses evicted from Redis by another process stop being served.
+
+        Keys (expiring after ttl_seconds):
+        - llm_cache:{key}     the cached response as JSON
+        - llm_cache_index     sorted set of keys by last use, bounds Redis to max_entries
+        - llm_cache_stats     hash of hit and miss counters over all processes
+    """
+
+    INDEX_KEY = "llm_cache_index"
+    STATS_KEY = "llm_cache_stats"
+    OUTCOMES = {"l1_hits": "hit (memory)", "l2_hits": "hit (redis)", "misses": "miss"}
+
+    def __init__(self, client, ttl_seconds: int = 86400, max_entries: int = 1000, l1_size: int = 128, l1_ttl_seconds: int = 300):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.l1_size = l1_size
+        self.l1_ttl_seconds = l1_ttl_seconds
+        # key -> (expires_at, response JSON)
+        self._l1 = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0}
+
+
+    def make_key(self, kind: str, llm, prompt_template: str, user_input: UserInput) -> str:
+        """
+            Hashes what decides the response: the call kind, provider and model,
+            the prompt version (a hash of its template) and the canonical user input
+        """
+        payload = {
+            "kind": kind,
+            "llm": get_llm_identity(llm),
+            "prompt": hashlib.sha256(prompt_template.encode("utf-8")).hexdigest(),
+            "user_input": canonicalize_user_input(user_input),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+    ## ------- Lookups ------- ##
+    def get(self, key: str, schema: Type[BaseModel]) -> Optional[BaseModel]:
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is not None and entry[0] <= time.time():
+                del self._l1[key]
+                entry = None
+            if entry is not None:
+                self._l1.move_to_end(key)
+
+        if entry is not None:
+            self.record("l1_hits")
+            return schema.model_validate_json(entry[1])
+
+        try:
+            pipeline = self.client.pipeline()
+            pipeline.get(f"llm_cache:{key}")
+            pipeline.ttl(f"llm_cache:{key}")
+            cached, remaining = pipeline.execute()
+            if cached is not None:
+                self.client.zadd(self.INDEX_KEY, {key: time.time()})
+        except Exception as e:
+            logger.warning(f"LLM response cache unavailable: {e}")
+            cached = None
+
+        if cached is None:
+            self.record("misses")
+            return None
+
+        self.record("l2_hits")
+        # remaining is negative for a key without expiry
+        self.set_l1(key, cached.decode() if isinstance(cached, bytes) else cached, remaining if remaining > 0 else self.ttl_seconds)
+        return schema.model_validate_json(cached)
+
+
+    def set(self, key: str, response: BaseModel):
+        value = response.model_dump_json()
+        self.set_l1(key, value, self.ttl_seconds)
+
+        try:
+            pipeline = self.client.pipeline()
+            pipeline.set(f"llm_cache:{key}", value, ex=self.ttl_seconds)
+            pipeline.zadd(self.INDEX_KEY, {key: time.time()})
+            pipeline.expire(self.INDEX_KEY, self.ttl_seconds)
+            pipeline.execute()
+            self.evict()
+        except Exception as e:
+            logger.warning(f"LLM response not cached in Redis: {e}")
+
+
+    def evict(self):
+        """Drops the least recently used responses beyond max_entries"""
+        overflow = self.client.zcard(self.INDEX_KEY) - self.max_entries
+        if overflow > 0:
+            evicted = [key.decode() if isinstance(key, bytes) else key for key, _ in self.client.zpopmin(self.INDEX_KEY, overflow)]
+            self.client.delete(*[f"llm_cache:{key}" for key in evicted])
+            with self._lock:
+                for key in evicted:
+                    self._l1.pop(key, None)
+            logger.debug(f"Evicted {len(evicted)} cached LLM responses")
+
+
+    def set_l1(self, key: str, value: str, ttl_seconds: float):
+        expires_at = time.time() + min(ttl_seconds, self.l1_ttl_seconds)
+        with self._lock:
+            self._l1[key] = (expires_at, value)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.l1_size:
+                self._l1.popitem(last=False)
+
+
+    def get_or_invoke(self, key: str, invoke: Callable[[], BaseModel], schema: Type[BaseModel], cacheable: Callable[[BaseModel], bool] = bool) -> BaseModel:
+        """
+            Returns the cached response, or calls invoke() and caches its result when cacheable
+        """
+        cached = self.get(key, schema)
+        if cached is not None:
+            return cached
+
+        response = invoke()
+        if cacheable(response):
+            self.set(key, response)
+        return response
+
+
+    async def aget_or_invoke(self, key: str, ainvoke: Callable[[], Any], schema: Type[BaseModel], cacheable: Callable[[BaseModel], bool] = bool) -> BaseModel:
+        """Async version of get_or_invoke, Redis is called off the event loop"""
+        cached = await asyncio.to_thread(self.get, key, schema)
+        if cached is not None:
+            return cached
+
+        response = await ainvoke()
+        if cacheable(response):
+            await asyncio.to_thread(self.set, key, response)
+        return response
+
+
+    ## ------- Hit ratio ------- ##
+    def record(self, outcome: str):
+        with self._lock:
+            self.stats[outcome] += 1
+            hits = self.stats["l1_hits"] + self.stats["l2_hits"]
+            ratio = hits / (hits + self.stats["misses"])
+        logger.info(f"LLM response cache {self.OUTCOMES[outcome]}, hit ratio {ratio:.0%}")
+
+        try:
+            self.client.hincrby(self.STATS_KEY, outcome, 1)
+        except Exception:
+            pass
+
+
+    def get_stats(self) -> dict:
+        """
+            Returns the hit and miss counters and the hit ratio of this process
+            and of every process sharing the Redis
+        """
+        try:
+            shared = {key.decode(): int(value) for key, value in self.client.hgetall(self.STATS_KEY).items()}
+        except Exception:
+            shared = {}
+
+        stats = {}
+        for scope, counters in (("process", self.stats), ("shared", shared)):
+            hits = counters.get("l1_hits", 0) + counters.get("l2_hits", 0)
+            lookups = hits + counters.get("misses", 0)
+            stats[scope] = {**counters, "hit_ratio": round(hits / lookups, 4) if lookups else 0.0}
+        return stats
+
+
+## Shared by every graph of the process, created on first use
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache(config) -> Optional[ResponseCache]:
+    """Returns the process-wide response cache, None when it is disabled in the config"""
+    global _response_cache
+    if not config.is_response_cache_enabled():
+        return None
+
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(redis_client, **config.get_response_cache_settings())
+        return _response_cache
@@ -0,0 +1,94 @@
+import threading
+from collections import defaultdict
+from typing import Dict, Optional
+from loguru import logger
+from src.infra_genie.cache.redis_cache import redis_client
+from src.infra_genie.utils.token_usage import NODE_METRICS
+
+
+class UsageMetricsStore:
+    """
+        Per-node usage metrics in Redis, next to the checkpoints of the tasks.
+
+        Keys:
+        - usage_metrics:{task_id}   hash "<node>:<metric>" -> value of one task (expiring after ttl_seconds)
+        - usage_metrics             hash "<node>:<metric>" -> value over all tasks of all processes
+    """
+
+    TOTALS_KEY = "usage_metrics"
+
+    def __init__(self, client, ttl_seconds: int = 86400):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+
+
+    def increment(self, task_id: str, node: str, values: Dict[str, float]):
+        task_key = f"{self.TOTALS_KEY}:{task_id}"
+        try:
+            pipeline = self.client.pipeline()
+            for metric, value in values.items():
+                pipeline.hincrbyfloat(task_key, f"{node}:{metric}", value)
+                pipeline.hincrbyfloat(self.TOTALS_KEY, f"{node}:{metric}", value)
+            pipeline.expire(task_key, self.ttl_seconds)
+            pipeline.execute()
+        except Exception as e:
+            logger.warning(f"Usage metrics of {task_id} not exported: {e}")
+
+
+    def get_task_metrics(self, task_id: str) -> Dict:
+        """Returns the metrics per node and their total for one task"""
+        return self.read(f"{self.TOTALS_KEY}:{task_id}")
+
+
+    def get_totals(self) -> Dict:
+        """Returns the metrics per node and their total over all tasks"""
+        return self.read(self.TOTALS_KEY)
+
+
+    def read(self, key: str) -> Dict:
+        try:
+            fields = self.client.hgetall(key)
+        except Exception as e:
+            logger.warning(f"Usage metrics unavailable: {e}")
+            fields = {}
+
+        nodes = defaultdict(lambda: dict.fromkeys(NODE_METRICS, 0))
+        for field, value in fields.items():
+            field = field.decode() if isinstance(field, bytes) else field
+            node, metric = field.rsplit(":", 1)
+            nodes[node][metric] = round(float(value), 6)
+
+        total = dict.fromkeys(NODE_METRICS, 0)
+        for metrics in nodes.values():
+            for metric, value in metrics.items():
+                total[metric] = round(total.get(metric, 0) + value, 6)
+        return {"nodes": dict(nodes), "total": total}
+
+
+    def to_prometheus(self) -> str:
+        """Returns the totals in the Prometheus text exposition format, one counter per metric labelled by node"""
+        nodes = self.get_totals()["nodes"]
+        lines = []
+        for metric in NODE_METRICS:
+            name = f"infra_genie_{metric}_total"
+            lines.append(f"# TYPE {name} counter")
+            for node, metrics in sorted(nodes.items()):
+                lines.append(f'{name}{{node="{node}"}} {metrics.get(metric, 0)}')
+        return "\n".join(lines) + "\n"
+
+
+## Shared by every graph executor of the process, created on first use
+_usage_metrics_store = None
+_usage_metrics_lock = threading.Lock()
+
+
+def get_usage_metrics_store(config) -> Optional[UsageMetricsStore]:
+    """Returns the process-wide metrics store, None when the export is disabled in the config"""
+    global _usage_metrics_store
+    if not config.is_usage_metrics_enabled():
+        return None
+
+    with _usage_metrics_lock:
+        if _usage_metrics_store is None:
+            _usage_metrics_store = UsageMetricsStore(redis_client, **config.get_usage_metrics_settings())
+        return _usage_metrics_store
@@ -1,21 +1,42 @@
+import inspect
 from langgraph.graph import StateGraph,START, END
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_core.runnables.graph import MermaidDrawMethod
+from src.infra_genie.cache.redis_cache import redis_client
+from src.infra_genie.cache.redis_checkpointer import RedisSaver
+from langchain_core.runnables import RunnableLambda
 from src.infra_genie.state.infra_genie_state import InfraGenieState
+from src.infra_genie.LLMS.model_router import ModelRouter
 from src.infra_genie.nodes.code_generator_node import CodeGeneratorNode
 from src.infra_genie.nodes.fallback_node import FallbackNode
 from src.infra_genie.nodes.project_node import ProjectNode
 from src.infra_genie.nodes.code_process_node import ProcessCodeNode
 from src.infra_genie.nodes.code_validator_node import CodeValidatorNode
-from langchain_core.runnables.graph import CurveStyle
+from src.infra_genie.nodes.fix_loop_controller import FixLoopController
+from src.infra_genie.nodes.module_generator_node import ModuleGeneratorNode
+from src.infra_genie.nodes.speculative_generation_node import SpeculativeGenerationNode
+from src.infra_genie.nodes.streaming_generation_node import StreamingGenerationNode
+from src.infra_genie.utils import constants as const
+from src.infra_genie.utils.token_usage import with_usage_metrics
+from src.infra_genie.graph.graph_renderer import GraphRenderer
 
     
 class GraphBuilder:
     
-    def __init__(self, llm):
+    def __init__(self, llm, generation_mode=const.GENERATION_MODE_STANDARD, checkpointer=None, automatic=False, fix_loop_settings=None, response_cache=None, model_router=None, terraform_init=None):
         self.llm = llm
+        # Picks the model per task type, every task goes to llm without one
+        self.model_router = model_router or ModelRouter(llm)
+        # Optional TerraformInit with the plugin cache settings of the validations
+        self.terraform_init = terraform_init
+        self.generation_mode = generation_mode
+        # Automatic graphs run end to end without human review, the fix loop bounded by fix_loop_settings
+        self.automatic = automatic
+        self.fix_loop_settings = fix_loop_settings or {}
+        # Optional ResponseCache in front of the code generation calls
+        self.response_cache = response_cache
         self.graph_builder = StateGraph(InfraGenieState)
-        self.memory = MemorySaver()
+        # Redis-backed checkpoints let any process resume any session
+        self.memory = checkpointer or RedisSaver(redis_client)
+        self.renderer = GraphRenderer()
                 
     
     def set_groq_llm(self, groq_llm):
@@ -33,32 +54,64 @@ class GraphBuilder:
         self.mistral_llm = mistral_llm
     
     
+    def as_node(self, func, afunc=None):
+        """
+            Wraps a node so the graph runs func under stream/invoke and afunc under astream/ainvoke,
+            and the usage metrics of the run reach the state when the node exits
+        """
+        def call(node_func, state, config):
+            return node_func(state, config) if "config" in inspect.signature(node_func).parameters else node_func(state)
+        
+        def run(state, config):
+            return with_usage_metrics(call(func, state, config), config)
+        
+        async def arun(state, config):
+            return with_usage_metrics(await call(afunc, state, config), config)
+        
+        return RunnableLambda(run, afunc=arun if afunc else None, name=func.__name__)
+    
+    
     def build_infra_graph(self):
         """
             Configure the graph by adding nodes, edges
         """
         
         self.project_node = ProjectNode(self.llm)
-        self.code_generation_node = CodeGeneratorNode(self.llm)
-        self.fallback_node = FallbackNode(self.llm)
+        generation_llm = self.model_router.get_llm(const.ROUTE_GENERATION)
+        self.code_generation_node = CodeGeneratorNode(generation_llm, self.response_cache, self.model_router)
+        self.fallback_node = FallbackNode(self.model_router.get_llm(const.ROUTE_FALLBACK), self.response_cache)
         self.process_code_node = ProcessCodeNode(self.llm)
-        self.code_validator_node = CodeValidatorNode(self.llm)
+        self.code_validator_node = CodeValidatorNode(self.llm, terraform_init=self.terraform_init)
+        self.fix_loop_controller = FixLoopController(self.process_code_node, **self.fix_loop_settings)
+        self.module_generator_node = ModuleGeneratorNode(generation_llm)
+        self.speculative_generation_node = SpeculativeGenerationNode(self.code_generation_node, self.fallback_node)
+        self.streaming_generation_node = StreamingGenerationNode(self.code_generation_node, self.process_code_node, self.code_validator_node)
         
         # Add nodes
-        self.graph_builder.add_node("initialize_project", self.project_node.initialize_project)
-        self.graph_builder.add_node("get_user_requirements", self.project_node.get_user_requirements)
-        self.graph_builder.add_node("generate_terraform_code", self.code_generation_node.generate_terraform_code)
-        self.graph_builder.add_node("fallback_generate_terraform_code", self.fallback_node.fallback_generate_terraform_code)
-        self.graph_builder.add_node("save_code", self.process_code_node.save_terraform_files)
-        self.graph_builder.add_node("code_validator", self.code_validator_node.validate_terraform_code)
-        self.graph_builder.add_node("create_terraform_plan", self.code_validator_node.create_terraform_plan)
-        self.graph_builder.add_node("fix_code", self.code_generation_node.fix_code)
-        self.graph_builder.add_node("download_artifacts", self.process_code_node.download_artifacts)
+        self.graph_builder.add_node("initialize_project", self.as_node(self.project_node.initialize_project))
+        self.graph_builder.add_node("get_user_requirements", self.as_node(self.project_node.get_user_requirements))
+        self.graph_builder.add_node("generate_terraform_code", self.as_node(self.code_generation_node.generate_terraform_code, self.code_generation_node.agenerate_terraform_code))
+        self.graph_builder.add_node("fallback_generate_terraform_code", self.as_node(self.fallback_node.fallback_generate_terraform_code, self.fallback_node.afallback_generate_terraform_code))
+        self.graph_builder.add_node("save_code", self.as_node(self.process_code_node.save_terraform_files, self.process_code_node.asave_terraform_files))
+        self.graph_builder.add_node("code_validator", self.as_node(self.code_validator_node.validate_terraform_code, self.code_validator_node.avalidate_terraform_code))
+        self.graph_builder.add_node("create_terraform_plan", self.as_node(self.code_validator_node.create_terraform_plan))
+        self.graph_builder.add_node("fix_code", self.as_node(self.code_generation_node.fix_code, self.code_generation_node.afix_code))
+        self.graph_builder.add_node("download_artifacts", self.as_node(self.process_code_node.download_artifacts))
 
         ## Edges
         self.graph_builder.add_edge(START,"initialize_project")
         self.graph_builder.add_edge("initialize_project","get_user_requirements")
-        self.graph_builder.add_edge("get_user_requirements","generate_terraform_code")
+        
+        if self.generation_mode == const.GENERATION_MODE_PARALLEL:
+            generation_entry = self.add_parallel_generation()
+        elif self.generation_mode == const.GENERATION_MODE_SPECULATIVE:
+            generation_entry = self.add_speculative_generation()
+        elif self.generation_mode == const.GENERATION_MODE_STREAMING:
+            generation_entry = self.add_streaming_generation()
+        else:
+            generation_entry = "generate_terraform_code"
+            
+        self.graph_builder.add_edge("get_user_requirements", generation_entry)
         self.graph_builder.add_conditional_edges(
             "generate_terraform_code",
             self.code_generation_node.is_code_generated,
@@ -71,17 +124,34 @@ class GraphBuilder:
         )
         
         self.graph_builder.add_edge("save_code","code_validator")
+        if self.automatic:
+            self.graph_builder.add_node("check_fix_loop", self.as_node(self.fix_loop_controller.check_fix_loop, self.fix_loop_controller.acheck_fix_loop))
+            self.graph_builder.add_edge("code_validator", "check_fix_loop")
+            self.graph_builder.add_conditional_edges(
+                "check_fix_loop",
+                self.fix_loop_controller.fix_loop_router,
+                {
+                    "approved": 'download_artifacts',
+                    "feedback": "fix_code",
+                    "stop": END
+                }
+            )
+        else:
+            self.graph_builder.add_conditional_edges(
+                "code_validator",
+                self.code_validator_node.code_validation_router,
+                {
+                    "approved": 'download_artifacts',
+                    "feedback": "fix_code"
+                }
+            )
+        
         self.graph_builder.add_conditional_edges(
-            "code_validator",
-            self.code_validator_node.code_validation_router,
-            {
-                "approved": 'download_artifacts',
-                "feedback": "fix_code"
-            }
+            "fix_code",
+            self.code_generation_node.fix_code_router,
+            {"save_code": "save_code", "regenerate": generation_entry}
         )
         
-        self.graph_builder.add_edge("fix_code","generate_terraform_code")
-        
         # self.graph_builder.add_conditional_edges(
         #     "create_terraform_plan",
         #     self.code_validator_node.terraform_plan_router,
@@ -92,6 +162,69 @@ class GraphBuilder:
         # )
         
         self.graph_builder.add_edge("download_artifacts", END)
+        
+    
+    def add_parallel_generation(self):
+        """
+            Per-module generation: networking first, the other modules fanned out
+            in parallel with networking's outputs as context, the environment last.
+            Returns the entry node of the generation step.
+        """
+        self.graph_builder.add_node("plan_modules", self.as_node(self.module_generator_node.plan_modules))
+        self.graph_builder.add_node("generate_networking_module", self.as_node(self.module_generator_node.generate_networking_module, self.module_generator_node.agenerate_networking_module))
+        self.graph_builder.add_node("generate_module", self.as_node(self.module_generator_node.generate_module, self.module_generator_node.agenerate_module))
+        self.graph_builder.add_node("assemble_environment", self.as_node(self.module_generator_node.assemble_environment, self.module_generator_node.aassemble_environment))
+        
+        self.graph_builder.add_edge("plan_modules", "generate_networking_module")
+        self.graph_builder.add_conditional_edges(
+            "generate_networking_module",
+            self.module_generator_node.dispatch_modules,
+            ["generate_module", "assemble_environment"]
+        )
+        self.graph_builder.add_edge("generate_module", "assemble_environment")
+        self.graph_builder.add_conditional_edges(
+            "assemble_environment",
+            self.code_generation_node.is_code_generated,
+            {True: "save_code", False: "fallback_generate_terraform_code"}
+        )
+        
+        return "plan_modules"
+    
+    
+    def add_speculative_generation(self):
+        """
+            Structured and fallback generation raced concurrently, the first usable result wins.
+            Returns the entry node of the generation step.
+        """
+        self.graph_builder.add_node(
+            "speculative_generate_terraform_code",
+            self.as_node(self.speculative_generation_node.generate_terraform_code, self.speculative_generation_node.agenerate_terraform_code)
+        )
+        self.graph_builder.add_conditional_edges(
+            "speculative_generate_terraform_code",
+            self.code_generation_node.is_code_generated,
+            {True: "save_code", False: END}
+        )
+        
+        return "speculative_generate_terraform_code"
+    
+    
+    def add_streaming_generation(self):
+        """
+            Structured generation that saves and syntax-checks every component as soon as it
+            is streamed. Returns the entry node of the generation step.
+        """
+        self.graph_builder.add_node(
+            "stream_generate_terraform_code",
+            self.as_node(self.streaming_generation_node.generate_terraform_code, self.streaming_generation_node.agenerate_terraform_code)
+        )
+        self.graph_builder.add_conditional_edges(
+            "stream_generate_terraform_code",
+            self.code_generation_node.is_code_generated,
+            {True: "save_code", False: "fallback_generate_terraform_code"}
+        )
+        
+        return "stream_generate_terraform_code"
     
         
     # def setup_graph(self):
@@ -116,6 +249,10 @@ class GraphBuilder:
         Sets up the graph
         """
         self.build_infra_graph()
+        
+        if self.automatic:
+            return self.graph_builder.compile(checkpointer=self.memory)
+        
         graph =self.graph_builder.compile(
             interrupt_before=[
                 'get_user_requirements'
@@ -126,20 +263,12 @@ class GraphBuilder:
                 # 'create_terraform_plan'
             ],checkpointer=self.memory
         )
-        self.save_graph_image(graph)         
         return graph
     
     
     def save_graph_image(self,graph):
-        # Generate the PNG image
-        img_data = graph.get_graph().draw_mermaid_png(
-            draw_method=MermaidDrawMethod.API,
-            curve_style= CurveStyle.NATURAL
-            )
-
-        # Save the image to a file
-        graph_path = "workflow_graph.png"
-        with open(graph_path, "wb") as f:
-            f.write(img_data)        
-            
-        
\ No newline at end of file
+        """
+        Renders the workflow graph image locally, only when the topology changed.
+        Kept off the request path: call it once after compiling a new graph.
+        """
+        return self.renderer.render(graph)
@@ -0,0 +1,91 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Optional, Tuple
+from loguru import logger
+
+
+class GraphCache:
+    """
+        Process-wide LRU cache of compiled graphs (and the builder holding their nodes),
+        keyed by provider, model and a fingerprint of the credentials.
+
+        Graphs are compiled outside the lock: hits and builds of other keys go on while
+        a graph compiles, concurrent misses of the same key wait for its single build.
+    """
+
+    def __init__(self, max_size: int = 8):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        # key -> Future of the build in progress
+        self._building = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(secret: Optional[str]) -> str:
+        """Returns a short, non-reversible fingerprint of an API key."""
+        return hashlib.sha256((secret or "").encode("utf-8")).hexdigest()[:16]
+
+    def make_key(self, provider: str, model: str, api_key: Optional[str], *options) -> Tuple:
+        return (provider, model, self.fingerprint(api_key), *options)
+
+    def get_or_build(self, key: Tuple, build_fn: Callable):
+        """
+            Returns the cached entry for the key, building (and caching) it on a miss.
+            build_fn must return the (graph_builder, graph) tuple.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                logger.debug(f"Graph cache hit for {key[:2]}")
+                return entry
+
+            building = self._building.get(key)
+            if building is None:
+                building = self._building[key] = Future()
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            logger.debug(f"Waiting for the graph {key[:2]} compiled by another session")
+            return building.result()
+
+        logger.info(f"Graph cache miss for {key[:2]}, compiling graph")
+        try:
+            entry = build_fn()
+        except BaseException as e:
+            # Failed builds are not cached, the next lookup tries again
+            with self._lock:
+                self._building.pop(key, None)
+            building.set_exception(e)
+            raise
+
+        with self._lock:
+            self._building.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_size:
+                evicted_key, _ = self._entries.popitem(last=False)
+                logger.info(f"Evicted graph {evicted_key[:2]} from graph cache")
+
+        building.set_result(entry)
+        return entry
+
+    def invalidate(self, key: Tuple):
+        """Drops a single compiled graph from the cache."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drops every compiled graph from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+## Shared by every session served by this process
+graph_cache = GraphCache()
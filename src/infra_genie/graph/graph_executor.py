@@ -1,27 +1,36 @@
 from src.infra_genie.state.infra_genie_state import InfraGenieState, UserInput
-from src.infra_genie.cache.redis_cache import flush_redis_cache, save_state_to_redis, get_state_from_redis
 import uuid
 import src.infra_genie.utils.constants as const
 from loguru import logger
 from langfuse.callback import CallbackHandler
+from src.infra_genie.utils.code_stream import get_chunk_text
+from src.infra_genie.utils.token_usage import TokenUsageHandler
+from src.infra_genie.cache.usage_metrics import get_usage_metrics_store
+from src.infra_genie.ui.uiconfigfile import Config
 
 class GraphExecutor:
-    def __init__(self, graph, task_id):
+    def __init__(self, graph, task_id, callbacks=None, config=None):
         self.graph = graph
         self.task_id = task_id
         self.user_id = "msaifee"
         self.langfuse_handler = CallbackHandler(session_id=self.task_id, user_id=self.user_id)
+        # Extra callback handlers, e.g. token usage accounting
+        self.callbacks = callbacks or []
+        # Tokens, latency and cost of the runs of this executor per node, read by the fix loop's token budget
+        config = config or Config()
+        self.token_usage = TokenUsageHandler(task_id, pricing=config.get_model_pricing(), store=get_usage_metrics_store(config))
 
     def get_thread(self, task_id):
         return {"configurable": {"thread_id": task_id}}
     
     def get_langfuse_callback(self):
-        return {"callbacks": [self.langfuse_handler]}
+        return {"callbacks": [self.langfuse_handler, self.token_usage, *self.callbacks]}
     
     def get_config(self, task_id):
         config = {}
         config.update(self.get_thread(task_id))
         config.update(self.get_langfuse_callback())
+        config["configurable"]["token_usage"] = self.token_usage
         logger.debug(f"Config: {config}")
         return config
     
@@ -29,10 +38,7 @@ class GraphExecutor:
     def start_workflow(self, project_name: str):
         graph = self.graph
 
-        flush_redis_cache()
-
         task_id = self.task_id
-        thread = self.get_thread(task_id)
 
         state = None
         for event in graph.stream(
@@ -42,27 +48,51 @@ class GraphExecutor:
         ):
             state = event
 
-        current_state = graph.get_state(thread)
-        save_state_to_redis(task_id, current_state)
-
         return {"task_id": task_id, "state": state}
     
     
+    ## ------- Automatic Run (graphs compiled with automatic=True) ------- ##
+    def run_automatic(self, project_name: str, user_input: UserInput, on_token=None, on_update=None):
+        """
+            Runs generate, save, validate and fix end to end without interrupts
+        """
+        state = None
+        for event in self.graph.stream(
+            {"project_name": project_name, "user_input": user_input},
+            config=self.get_config(self.task_id),
+            stream_mode=self.get_stream_mode(on_token, on_update)
+        ):
+            values = self.handle_stream_event(event, on_token, on_update)
+            if values is not None:
+                state = values
+        
+        return {"task_id": self.task_id, "state": state}
+    
+    
     ## ------- Code Generation ------- ##
-    def generate_code(self, task_id:str, user_input : UserInput):
+    def generate_code(self, task_id:str, user_input : UserInput, on_token=None, on_update=None):
         
-        saved_state = get_state_from_redis(task_id)
+        saved_state = self.get_saved_state(task_id)
         if saved_state:
             saved_state.user_input = user_input
             saved_state.next_node = const.GENERATE_CODE
         
-        return self.update_and_resume_graph(saved_state,task_id,"get_user_requirements")
+        return self.update_and_resume_graph(saved_state,task_id,"get_user_requirements", on_token, on_update)
     
    
    
    ## ------- Generic Review Flow for all the feedback stages  ------- ##
-    def graph_review_flow(self, task_id, status, feedback, review_type):
-        saved_state = get_state_from_redis(task_id)
+    def graph_review_flow(self, task_id, status, feedback, review_type, on_token=None, on_update=None):
+        saved_state = self.get_saved_state(task_id)
+        node_name = self.apply_review(saved_state, status, feedback, review_type)
+        return self.update_and_resume_graph(saved_state,task_id,node_name, on_token, on_update)
+    
+    
+    def apply_review(self, saved_state, status, feedback, review_type):
+        """
+            Applies the review decision to the saved state, returns the node to resume as
+        """
+        node_name = None
         
         if saved_state:
             if review_type == const.SAVE_CODE:
@@ -77,6 +107,9 @@ class GraphExecutor:
                 if status == "approved":
                     logger.success("User Approved the code")
                     saved_state.is_code_valid = True
+                elif status == "feedback":
+                    # User requested changes, route back through the fix loop
+                    saved_state.is_code_valid = False
                 
                 saved_state.next_node = const.GENERATE_CODE if status == "feedback" else const.DOWNLOAD_ARTIFACTS
                 
@@ -93,11 +126,16 @@ class GraphExecutor:
             else:
                 raise ValueError(f"Unsupported review type: {review_type}")
             
-        return self.update_and_resume_graph(saved_state,task_id,node_name)
+        return node_name
     
     
     ## -------- Helper Method to handle the graph resume state ------- ##
-    def update_and_resume_graph(self, saved_state,task_id, as_node):
+    def update_and_resume_graph(self, saved_state,task_id, as_node, on_token=None, on_update=None):
+        """
+            Resumes the graph after updating the state as the given node.
+            on_token(run_id, node_name, text) receives the LLM tokens as they are generated,
+            on_update(node_name, update) receives the output of every node as it finishes.
+        """
         graph = self.graph
         thread = self.get_thread(task_id)
         
@@ -108,18 +146,157 @@ class GraphExecutor:
         for event in graph.stream(
             None, 
             config=self.get_config(task_id),
-            stream_mode="values"
+            stream_mode=self.get_stream_mode(on_token, on_update)
         ):
-            logger.debug(f"Event Received: {event}")
-            state = event
-        
-        current_state = graph.get_state(thread)
-        save_state_to_redis(task_id, current_state)
+            values = self.handle_stream_event(event, on_token, on_update)
+            if values is not None:
+                logger.debug(f"Event Received: {values}")
+                state = values
         
         return {"task_id" : task_id, "state": state}
 
 
+    def get_stream_mode(self, on_token, on_update=None):
+        """LLM tokens and node updates are only streamed when someone listens to them"""
+        if not on_token and not on_update:
+            return "values"
+        
+        stream_mode = ["values"]
+        if on_token:
+            stream_mode.append("messages")
+        if on_update:
+            stream_mode.append("updates")
+        return stream_mode
+    
+    
+    def handle_stream_event(self, event, on_token, on_update=None):
+        """
+            Forwards message chunks to on_token and node updates to on_update,
+            returns the state values of value events
+        """
+        if not on_token and not on_update:
+            return event
+        
+        mode, payload = event
+        if mode == "updates":
+            for node_name, update in payload.items():
+                # Interrupts are reported as a pseudo node
+                if not node_name.startswith("__"):
+                    on_update(node_name, update)
+            return None
+        
+        if mode == "messages":
+            chunk, metadata = payload
+            text = get_chunk_text(chunk)
+            if text:
+                on_token(chunk.id or metadata.get("langgraph_checkpoint_ns"), metadata.get("langgraph_node"), text)
+            return None
+        
+        return payload
+    
+    
+    def get_saved_state(self, task_id):
+        """
+            Reads the latest checkpoint of the thread, the checkpointer is the single source of truth
+        """
+        snapshot = self.graph.get_state(self.get_thread(task_id))
+        if not snapshot.values:
+            return None
+        return InfraGenieState.model_validate(snapshot.values)
+    
+    
+    async def aget_saved_state(self, task_id):
+        snapshot = await self.graph.aget_state(self.get_thread(task_id))
+        if not snapshot.values:
+            return None
+        return InfraGenieState.model_validate(snapshot.values)
+
+
     def get_updated_state(self, task_id):
-        saved_state = get_state_from_redis(task_id)
+        saved_state = self.get_saved_state(task_id)
+        return {"task_id" : task_id, "state": saved_state}
+
+
+    def get_state_values(self, task_id):
+        """
+            Returns the latest state values of the thread, as streamed by the graph
+        """
+        return self.graph.get_state(self.get_thread(task_id)).values
+
+
+    ## ------- Async API: lets one process drive many sessions concurrently ------- ##
+    async def astart_workflow(self, project_name: str):
+        graph = self.graph
+
+        task_id = self.task_id
+
+        state = None
+        async for event in graph.astream(
+            {"project_name": project_name},
+            config=self.get_config(task_id),
+            stream_mode="values"
+        ):
+            state = event
+
+        return {"task_id": task_id, "state": state}
+    
+    
+    async def arun_automatic(self, project_name: str, user_input: UserInput, on_token=None, on_update=None):
+        state = None
+        async for event in self.graph.astream(
+            {"project_name": project_name, "user_input": user_input},
+            config=self.get_config(self.task_id),
+            stream_mode=self.get_stream_mode(on_token, on_update)
+        ):
+            values = self.handle_stream_event(event, on_token, on_update)
+            if values is not None:
+                state = values
+        
+        return {"task_id": self.task_id, "state": state}
+    
+    
+    async def agenerate_code(self, task_id: str, user_input: UserInput, on_token=None, on_update=None):
+        
+        saved_state = await self.aget_saved_state(task_id)
+        if saved_state:
+            saved_state.user_input = user_input
+            saved_state.next_node = const.GENERATE_CODE
+        
+        return await self.aupdate_and_resume_graph(saved_state, task_id, "get_user_requirements", on_token, on_update)
+    
+    
+    async def agraph_review_flow(self, task_id, status, feedback, review_type, on_token=None, on_update=None):
+        saved_state = await self.aget_saved_state(task_id)
+        node_name = self.apply_review(saved_state, status, feedback, review_type)
+        return await self.aupdate_and_resume_graph(saved_state, task_id, node_name, on_token, on_update)
+    
+    
+    async def aupdate_and_resume_graph(self, saved_state, task_id, as_node, on_token=None, on_update=None):
+        graph = self.graph
+        thread = self.get_thread(task_id)
+        
+        await graph.aupdate_state(thread, saved_state, as_node=as_node)
+        
+        # Resume the graph
+        state = None
+        async for event in graph.astream(
+            None,
+            config=self.get_config(task_id),
+            stream_mode=self.get_stream_mode(on_token, on_update)
+        ):
+            values = self.handle_stream_event(event, on_token, on_update)
+            if values is not None:
+                logger.debug(f"Event Received: {values}")
+                state = values
+        
+        return {"task_id" : task_id, "state": state}
+    
+    
+    async def aget_updated_state(self, task_id):
+        saved_state = await self.aget_saved_state(task_id)
         return {"task_id" : task_id, "state": saved_state}
     
+    
+    async def aget_state_values(self, task_id):
+        snapshot = await self.graph.aget_state(self.get_thread(task_id))
+        return snapshot.values
@@ -0,0 +1,111 @@
+from loguru import logger
+from src.infra_genie.LLMS.hedged_llm import HedgedLLM
+from src.infra_genie.LLMS.llm_factory import LLMFactory
+from src.infra_genie.LLMS.model_router import ModelRouter
+from src.infra_genie.cache.response_cache import get_response_cache
+from src.infra_genie.graph.graph_builder import GraphBuilder
+from src.infra_genie.graph.graph_cache import graph_cache
+from src.infra_genie.ui.uiconfigfile import Config
+from src.infra_genie.utils import constants as const
+from src.infra_genie.utils.terraform_init import TerraformInit
+
+
+def build_llm(config: Config, provider, model_name, api_key):
+    """
+        Returns the chat model of a provider, the API key falls back to the environment
+    """
+    model = LLMFactory(config).get_llm(provider, model_name, api_key)
+
+    if not model:
+        raise ValueError("LLM model could not be initialized.")
+    return model
+
+
+def build_hedged_llm(config: Config, provider, model_name, model):
+    """
+        Wraps the selected model with the configured alternates for hedged requests and failover
+    """
+    candidates = [(f"{provider}:{model_name}", model)]
+    llm_factory = LLMFactory(config)
+
+    for alt_provider, alt_model in config.get_hedge_alternates():
+        if (alt_provider, alt_model) == (provider, model_name) or not llm_factory.has_provider(alt_provider):
+            continue
+        if not llm_factory.get_api_key(alt_provider):
+            continue
+        try:
+            alt_llm = llm_factory.get_llm(alt_provider, alt_model)
+            candidates.append((f"{alt_provider}:{alt_model}", alt_llm))
+        except Exception as e:
+            logger.warning(f"Skipping hedge alternate {alt_provider}:{alt_model}: {e}")
+
+    if len(candidates) == 1:
+        return model
+
+    logger.info(f"Hedging requests across {[name for name, _ in candidates]}")
+    return HedgedLLM(candidates, **config.get_hedge_settings())
+
+
+def build_model_router(config: Config, provider, model_name, api_key, model):
+    """
+        Routes the task types listed in the provider's MODEL_ROUTES to their model,
+        everything else goes to the selected model
+    """
+    routes = {}
+    if config.is_model_routing_enabled():
+        llm_factory = LLMFactory(config)
+        for task, routed_model in llm_factory.providers[provider]["model_routes"].items():
+            if task not in const.ROUTE_TASKS:
+                logger.warning(f"Unknown task {task} in the MODEL_ROUTES of {provider}")
+                continue
+            if routed_model == model_name:
+                continue
+            try:
+                routes[task] = (routed_model, llm_factory.get_llm(provider, routed_model, api_key))
+            except Exception as e:
+                logger.warning(f"Skipping the {task} route to {provider}:{routed_model}: {e}")
+
+    if routes:
+        logger.info(f"Routing {', '.join(f'{task} to {routed_model}' for task, (routed_model, _) in routes.items())}, the rest to {model_name}")
+    return ModelRouter(model, model_name, routes, **config.get_model_routing_settings())
+
+
+def build_graph(config: Config, provider, model_name, api_key, generation_mode, automatic=False):
+    """
+        Builds the LLM and compiles the workflow graph, the automatic graph has no human review
+    """
+    model = build_llm(config, provider, model_name, api_key)
+
+    if config.is_hedge_enabled():
+        model = build_hedged_llm(config, provider, model_name, model)
+
+    graph_builder = GraphBuilder(
+        model,
+        generation_mode=generation_mode,
+        automatic=automatic,
+        fix_loop_settings=config.get_fix_loop_settings(),
+        response_cache=get_response_cache(config),
+        model_router=build_model_router(config, provider, model_name, api_key, model),
+        terraform_init=TerraformInit(**config.get_terraform_init_settings())
+    )
+    graph = graph_builder.setup_graph()
+    # The sidebar shows the interactive workflow
+    if not automatic:
+        graph_builder.save_graph_image(graph)
+    return graph_builder, graph
+
+
+def get_graph(config: Config, provider, model_name, api_key, generation_mode=None, automatic=False):
+    """
+        Returns the compiled graph for the selection, reusing the process-wide graph cache
+    """
+    generation_mode = generation_mode or config.get_generation_mode()
+    cache_key = graph_cache.make_key(provider, model_name, api_key, generation_mode, automatic)
+    try:
+        _, graph = graph_cache.get_or_build(
+            cache_key, lambda: build_graph(config, provider, model_name, api_key, generation_mode, automatic)
+        )
+    except Exception:
+        graph_cache.invalidate(cache_key)
+        raise
+    return graph
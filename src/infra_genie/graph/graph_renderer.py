@@ -0,0 +1,73 @@
+import hashlib
+import os
+from typing import Optional
+from loguru import logger
+from langchain_core.runnables.graph import CurveStyle
+
+
+class GraphRenderer:
+    """
+        Renders the workflow graph locally and only when its topology changes.
+
+        The Mermaid source is always written next to a hash stamp in the cache directory.
+        The PNG is produced with Graphviz when pygraphviz is installed (it is optional);
+        no network access is needed. Without it the Mermaid source is the only rendering.
+    """
+
+    def __init__(self, image_path="workflow_graph.png", cache_dir=".cache/graph"):
+        self.image_path = image_path
+        self.cache_dir = cache_dir
+        self.mermaid_path = os.path.join(cache_dir, "workflow_graph.mmd")
+        self.stamp_path = os.path.join(cache_dir, "workflow_graph.sha256")
+
+    def topology_hash(self, mermaid: str) -> str:
+        return hashlib.sha256(mermaid.encode("utf-8")).hexdigest()
+
+    def _read_stamp(self) -> Optional[str]:
+        if not os.path.exists(self.stamp_path):
+            return None
+        with open(self.stamp_path, "r") as f:
+            return f.read().strip()
+
+    def render(self, graph) -> bool:
+        """
+            Renders the compiled graph if its topology hash differs from the cached one.
+            Returns True when new artifacts were written.
+        """
+        drawable = graph.get_graph()
+        mermaid = drawable.draw_mermaid(curve_style=CurveStyle.NATURAL)
+        digest = self.topology_hash(mermaid)
+
+        if digest == self._read_stamp() and os.path.exists(self.mermaid_path):
+            logger.debug("Workflow graph unchanged, skipping render")
+            return False
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.mermaid_path, "w") as f:
+            f.write(mermaid)
+
+        try:
+            img_data = drawable.draw_png()
+        except Exception as e:
+            # Graphviz/pygraphviz missing: keep the Mermaid source only, is_image_current() then rejects an older PNG
+            logger.warning(f"Local PNG rendering unavailable ({e}), workflow graph kept as Mermaid source at {self.mermaid_path}")
+        else:
+            with open(self.image_path, "wb") as f:
+                f.write(img_data)
+            logger.info(f"Workflow graph rendered to {self.image_path}")
+
+        with open(self.stamp_path, "w") as f:
+            f.write(digest)
+        return True
+
+    def is_image_current(self) -> bool:
+        """True when the PNG was rendered from the current Mermaid source, e.g. not a stale committed image"""
+        if not os.path.exists(self.image_path) or not os.path.exists(self.mermaid_path):
+            return False
+        return os.path.getmtime(self.image_path) >= os.path.getmtime(self.mermaid_path)
+
+    def get_mermaid(self) -> Optional[str]:
+        if not os.path.exists(self.mermaid_path):
+            return None
+        with open(self.mermaid_path, "r") as f:
+            return f.read()
@@ -0,0 +1,264 @@
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+from loguru import logger
+import src.infra_genie.utils.constants as const
+
+
+def new_job_record(job_id: str, operation: str, task_id: str) -> Dict[str, str]:
+    return {
+        "id": job_id,
+        "operation": operation,
+        "task_id": task_id,
+        "status": const.JOB_QUEUED,
+        "error": "",
+        "created_at": str(time.time()),
+    }
+
+
+class JobProgress:
+    """
+        Accumulates the tokens streamed by a job per (node, run) and publishes
+        them to the queue at most every flush_seconds.
+    """
+
+    def __init__(self, queue, job_id: str, flush_seconds: float = 0.5):
+        self.queue = queue
+        self.job_id = job_id
+        self.flush_seconds = flush_seconds
+        self.runs = {}
+        self.dirty = set()
+        self.last_flush = 0.0
+
+    def on_token(self, run_id, node_name, text):
+        key = (node_name, run_id)
+        self.runs[key] = self.runs.get(key, "") + text
+        self.dirty.add(key)
+        if time.monotonic() - self.last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if self.dirty:
+            self.queue.set_stream(self.job_id, {key: self.runs[key] for key in self.dirty})
+            self.dirty.clear()
+
+
+class InProcessJobQueue:
+    """
+        Local fallback: jobs run on a thread pool inside the current process
+    """
+
+    def __init__(self, runner: Callable, max_workers: int = 2):
+        self.runner = runner
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self.jobs = {}
+        self.streams = {}
+        # API keys of the queued and running jobs, never in the payload
+        self.secrets = {}
+        self._lock = threading.Lock()
+
+    def submit(self, operation: str, payload: dict, api_key: Optional[str] = None) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self.jobs[job_id] = new_job_record(job_id, operation, payload.get("task_id", ""))
+            self.streams[job_id] = {}
+            if api_key:
+                self.secrets[job_id] = api_key
+        self.executor.submit(self.runner, self, job_id, operation, payload)
+        logger.info(f"Queued job {job_id} ({operation}) in process")
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def update_job(self, job_id: str, **fields):
+        with self._lock:
+            self.jobs[job_id].update({key: str(value) for key, value in fields.items()})
+
+    def get_secret(self, job_id: str) -> Optional[str]:
+        with self._lock:
+            return self.secrets.get(job_id)
+
+    def delete_secret(self, job_id: str):
+        with self._lock:
+            self.secrets.pop(job_id, None)
+
+    def get_stream(self, job_id: str) -> Dict[Tuple[str, str], str]:
+        with self._lock:
+            return dict(self.streams.get(job_id, {}))
+
+    def set_stream(self, job_id: str, runs: Dict[Tuple[str, str], str]):
+        with self._lock:
+            self.streams.setdefault(job_id, {}).update(runs)
+
+
+class RedisJobQueue:
+    """
+        Jobs are pushed on a Redis list and consumed by worker processes (see jobs/worker.py).
+
+        Keys:
+        - jobs:queue              list of queued jobs (id, operation, payload)
+        - jobs:processing         list of jobs taken by a worker and not acknowledged yet
+        - job:{job_id}            hash with the job status, expiring after ttl_seconds
+        - job_stream:{job_id}     hash with the streamed text per "node|run", expiring after ttl_seconds
+        - job_secret:{job_id}     API key entered for the job, kept out of the payload; deleted
+                                  once the job finishes, expiring after secret_ttl_seconds
+
+        The lists do not expire. Workers refresh the heartbeat_at of their job every
+        heartbeat_seconds; reap() moves jobs without a heartbeat for stale_seconds (their
+        worker died) from jobs:processing back to jobs:queue, or fails them after
+        max_attempts runs.
+    """
+
+    QUEUE_KEY = "jobs:queue"
+    PROCESSING_KEY = "jobs:processing"
+
+    def __init__(self, client, ttl_seconds: int = 86400, heartbeat_seconds: float = 10, stale_seconds: float = 60, max_attempts: int = 2,
+                 secret_ttl_seconds: int = 3600):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.secret_ttl_seconds = secret_ttl_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stale_seconds = stale_seconds
+        self.max_attempts = max_attempts
+
+    def _job_key(self, job_id: str) -> str:
+        return f"job:{job_id}"
+
+    def _stream_key(self, job_id: str) -> str:
+        return f"job_stream:{job_id}"
+
+    def _secret_key(self, job_id: str) -> str:
+        return f"job_secret:{job_id}"
+
+    def submit(self, operation: str, payload: dict, api_key: Optional[str] = None) -> str:
+        job_id = uuid.uuid4().hex
+        key = self._job_key(job_id)
+
+        pipe = self.client.pipeline()
+        pipe.hset(key, mapping=new_job_record(job_id, operation, payload.get("task_id", "")))
+        pipe.expire(key, self.ttl_seconds)
+        if api_key:
+            # Before the job is pushed, so the worker finds it
+            pipe.set(self._secret_key(job_id), api_key, ex=self.secret_ttl_seconds)
+        pipe.lpush(self.QUEUE_KEY, json.dumps({"id": job_id, "operation": operation, "payload": payload}))
+        pipe.execute()
+
+        logger.info(f"Queued job {job_id} ({operation}) in Redis")
+        return job_id
+
+    def pop(self, timeout: int = 5):
+        """
+            Blocks until a job is available, returns (raw_entry, job_id, operation, payload) or None
+        """
+        raw = self.client.blmove(self.QUEUE_KEY, self.PROCESSING_KEY, timeout, "RIGHT", "LEFT")
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        self.heartbeat(entry["id"])
+        self.client.hincrby(self._job_key(entry["id"]), "attempts", 1)
+        return raw, entry["id"], entry["operation"], entry["payload"]
+
+    def heartbeat(self, job_id: str):
+        self.update_job(job_id, heartbeat_at=time.time())
+
+    @contextmanager
+    def keep_alive(self, job_id: str):
+        """Refreshes the heartbeat of a job on a background thread while it runs"""
+        stopped = threading.Event()
+
+        def beat():
+            while not stopped.wait(self.heartbeat_seconds):
+                try:
+                    self.heartbeat(job_id)
+                except Exception as e:
+                    logger.warning(f"Heartbeat of job {job_id} failed: {e}")
+
+        thread = threading.Thread(target=beat, name=f"heartbeat-{job_id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stopped.set()
+            thread.join()
+
+    def reap(self) -> int:
+        """
+            Re-queues the processing jobs whose worker stopped sending heartbeats, fails those
+            already run max_attempts times. Returns the number of jobs reaped.
+        """
+        reaped = 0
+        now = time.time()
+        for raw in self.client.lrange(self.PROCESSING_KEY, 0, -1):
+            job_id = json.loads(raw)["id"]
+            job = self.get_job(job_id)
+
+            if job is not None:
+                last_seen = float(job.get("heartbeat_at") or job.get("created_at") or 0)
+                if now - last_seen < self.stale_seconds:
+                    continue
+
+            # Only the reaper removing the entry handles it, others may race on the same list
+            if not self.client.lrem(self.PROCESSING_KEY, 1, raw):
+                continue
+            reaped += 1
+
+            if job is None:
+                logger.warning(f"Dropped stale job {job_id}, its record expired")
+            elif job["status"] in (const.JOB_SUCCEEDED, const.JOB_FAILED):
+                # Finished, only its acknowledgement was lost
+                continue
+            elif int(job.get("attempts") or 1) >= self.max_attempts:
+                self.update_job(job_id, status=const.JOB_FAILED, error="worker stopped responding", finished_at=time.time())
+                logger.error(f"Job {job_id} failed, its worker stopped responding after {job.get('attempts')} attempts")
+            else:
+                self.update_job(job_id, status=const.JOB_QUEUED)
+                # The consuming end of the queue, the job runs next
+                self.client.rpush(self.QUEUE_KEY, raw)
+                logger.warning(f"Re-queued job {job_id}, its worker stopped responding")
+        return reaped
+
+    def ack(self, raw):
+        """Removes a finished job from the processing list"""
+        self.client.lrem(self.PROCESSING_KEY, 1, raw)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, str]]:
+        saved = self.client.hgetall(self._job_key(job_id))
+        if not saved:
+            return None
+        return {key.decode(): value.decode() for key, value in saved.items()}
+
+    def update_job(self, job_id: str, **fields):
+        key = self._job_key(job_id)
+        pipe = self.client.pipeline()
+        pipe.hset(key, mapping={name: str(value) for name, value in fields.items()})
+        pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+
+    def get_secret(self, job_id: str) -> Optional[str]:
+        secret = self.client.get(self._secret_key(job_id))
+        return secret.decode() if secret else None
+
+    def delete_secret(self, job_id: str):
+        self.client.delete(self._secret_key(job_id))
+
+    def get_stream(self, job_id: str) -> Dict[Tuple[str, str], str]:
+        saved = self.client.hgetall(self._stream_key(job_id))
+        return {
+            tuple(field.decode().split("|", 1)): text.decode()
+            for field, text in saved.items()
+        }
+
+    def set_stream(self, job_id: str, runs: Dict[Tuple[str, str], str]):
+        key = self._stream_key(job_id)
+        pipe = self.client.pipeline()
+        pipe.hset(key, mapping={f"{node_name}|{run_id}": text for (node_name, run_id), text in runs.items()})
+        pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
@@ -0,0 +1,81 @@
+import threading
+import time
+import traceback
+from typing import Optional
+from loguru import logger
+import src.infra_genie.utils.constants as const
+from src.infra_genie.cache.redis_cache import redis_client
+from src.infra_genie.graph.graph_executor import GraphExecutor
+from src.infra_genie.graph.graph_factory import get_graph
+from src.infra_genie.jobs.job_queue import InProcessJobQueue, JobProgress, RedisJobQueue
+from src.infra_genie.state.infra_genie_state import UserInput
+from src.infra_genie.ui.uiconfigfile import Config
+
+
+def execute_job(config: Config, operation: str, payload: dict, api_key: Optional[str] = None, on_token=None):
+    """
+        Runs a GraphExecutor operation, the resulting state is kept by the checkpointer.
+        Without an api_key the provider's key comes from the environment of the process.
+    """
+    graph = get_graph(config, payload["provider"], payload["model"], api_key, payload.get("generation_mode"))
+    task_id = payload["task_id"]
+    graph_executor = GraphExecutor(graph, task_id)
+
+    if operation == const.JOB_START_WORKFLOW:
+        graph_executor.start_workflow(payload["project_name"])
+
+    elif operation == const.JOB_GENERATE_CODE:
+        user_input = UserInput.model_validate(payload["user_input"])
+        graph_executor.generate_code(task_id, user_input, on_token=on_token)
+
+    elif operation == const.JOB_REVIEW:
+        graph_executor.graph_review_flow(
+            task_id, payload.get("status"), payload.get("feedback"), payload["review_type"], on_token=on_token
+        )
+
+    else:
+        raise ValueError(f"Unsupported job operation: {operation}")
+
+
+def run_job(queue, job_id: str, operation: str, payload: dict, worker_name: str = "inprocess"):
+    """
+        Executes one job and records its status on the queue, never raises
+    """
+    logger.info(f"Worker {worker_name} started job {job_id} ({operation})")
+    queue.update_job(job_id, status=const.JOB_RUNNING, worker=worker_name, started_at=time.time())
+    progress = JobProgress(queue, job_id)
+
+    try:
+        execute_job(Config(), operation, payload, queue.get_secret(job_id), on_token=progress.on_token)
+        progress.flush()
+        queue.update_job(job_id, status=const.JOB_SUCCEEDED, finished_at=time.time())
+        logger.success(f"Job {job_id} ({operation}) succeeded")
+
+    except Exception as e:
+        logger.error(f"Job {job_id} ({operation}) failed: {e}\n{traceback.format_exc()}")
+        queue.update_job(job_id, status=const.JOB_FAILED, error=str(e), finished_at=time.time())
+
+    finally:
+        # A job re-queued after its worker died still finds the key, a finished one never needs it again
+        try:
+            queue.delete_secret(job_id)
+        except Exception as e:
+            logger.warning(f"Could not delete the API key of job {job_id}: {e}")
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue(config: Config):
+    """
+        Returns the process-wide job queue for the configured backend
+    """
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            if config.get_job_queue_backend() == const.JOB_QUEUE_REDIS:
+                _job_queue = RedisJobQueue(redis_client, **config.get_job_queue_settings())
+            else:
+                _job_queue = InProcessJobQueue(run_job, max_workers=config.get_job_workers())
+        return _job_queue
@@ -0,0 +1,72 @@
+"""
+    Worker processes consuming the Redis job queue.
+
+    Usage:
+        python -m src.infra_genie.jobs.worker --workers 4
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import time
+from dotenv import load_dotenv
+from loguru import logger
+from src.infra_genie.cache.redis_cache import redis_client
+from src.infra_genie.jobs.job_queue import RedisJobQueue
+from src.infra_genie.jobs.job_runner import run_job
+from src.infra_genie.ui.uiconfigfile import Config
+from src.infra_genie.utils.logging_config import setup_logging
+
+
+def run_worker(index: int):
+    """
+        Consumes jobs until the process is stopped
+    """
+    load_dotenv()
+    setup_logging(log_level=os.getenv("LOG_LEVEL", "INFO"))
+
+    worker_name = f"{socket.gethostname()}-{os.getpid()}-{index}"
+    queue = RedisJobQueue(redis_client, **Config().get_job_queue_settings())
+    logger.info(f"Worker {worker_name} waiting for jobs")
+
+    last_reaped = 0.0
+    while True:
+        # Jobs of dead workers go back to the queue
+        if time.monotonic() - last_reaped >= queue.heartbeat_seconds:
+            last_reaped = time.monotonic()
+            queue.reap()
+
+        job = queue.pop(timeout=5)
+        if job is None:
+            continue
+
+        raw, job_id, operation, payload = job
+        try:
+            with queue.keep_alive(job_id):
+                run_job(queue, job_id, operation, payload, worker_name)
+        finally:
+            queue.ack(raw)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="InfraGenie job workers")
+    parser.add_argument("--workers", type=int, default=Config().get_job_workers(), help="Number of worker processes")
+    args = parser.parse_args()
+
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(index,), name=f"infragenie-worker-{index}")
+        for index in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
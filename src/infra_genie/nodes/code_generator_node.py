@@ -1,16 +1,21 @@
 from loguru import logger
 from src.infra_genie.state.infra_genie_state import InfraGenieState, TerraformOutput, TerraformComponent
-from langchain_core.prompts import PromptTemplate
+from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+from langchain_core.runnables import RunnableLambda
 from src.infra_genie.utils import constants as const
 from src.infra_genie.utils.Utility import Utility
+from src.infra_genie.cache.response_cache import has_components
 import json
     
 
 class CodeGeneratorNode:
     
-    def __init__(self, llm):
+    def __init__(self, llm, response_cache=None, model_router=None):
         self.llm = llm
         self.utility = Utility()
+        self.response_cache = response_cache
+        # Optional ModelRouter picking the model of each localized fix
+        self.model_router = model_router
        
     
     def generate_terraform_code(self, state: InfraGenieState):
@@ -23,48 +28,33 @@ class CodeGeneratorNode:
         
         try:
             print("Trying structured code approach...")
-                    
-            prompt_template = self.get_terraform_code_prompt(state)
-            logger.debug(f"Prompt Template: {prompt_template}")
             
-            structured_prompt = PromptTemplate.from_template(prompt_template)
+            result = self.invoke_structured(state)
             
-            logger.debug(f"Structured Prompt: {structured_prompt.to_json()}")
-
-            input_dict = state.user_input.model_dump()
-            logger.debug(f"User Input: {input_dict}")
-
-            structured_llm = self.llm.with_structured_output(TerraformOutput)
-            structured_chain = structured_prompt | structured_llm
-    
-            result = structured_chain.invoke(input_dict)
+            self.apply_result(state, result)
             
-            logger.debug(f"Result: {result}")
-            
-            # Clear existing environments and modules before adding new ones
-            state.environments.environments.clear()
-            state.modules.modules.clear()
-            
-            # Transfer the structured result to the state
-            for env in result.environments:
-                state.environments.environments.append(TerraformComponent(
-                    name=env.name,
-                    main_tf=env.main_tf,
-                    output_tf=env.output_tf,
-                    variables_tf=env.variables_tf
-                ))
+        except Exception as primary_error:
+            print(f"Structured output approach failed: {primary_error}")
+            state.code_generated = False
+            state.next_node = const.FALLBACK_GENERATION
+        
+        return state
+    
+    
+    async def agenerate_terraform_code(self, state: InfraGenieState):
+        """
+        Async version of generate_terraform_code.
+        """
+
+        if not state.user_input:
+            raise ValueError("User input is required to generate Terraform code")
+        
+        try:
+            print("Trying structured code approach...")
             
-            for module in result.modules:
-                state.modules.modules.append(TerraformComponent(
-                    name=module.name,
-                    main_tf=module.main_tf,
-                    output_tf=module.output_tf,
-                    variables_tf=module.variables_tf
-                ))
+            result = await self.ainvoke_structured(state)
             
-            print(f"Successfully generated {len(state.environments.environments)} environments and {len(state.modules.modules)} modules using structured output")
-            state.code_generated = True
-            state.next_node = const.CODE_VALIDATION
+            self.apply_result(state, result)
             
         except Exception as primary_error:
             print(f"Structured output approach failed: {primary_error}")
@@ -74,12 +64,104 @@ class CodeGeneratorNode:
         return state
     
     
-    def get_terraform_code_prompt(self, state: InfraGenieState) -> str:
+    def invoke_structured(self, state: InfraGenieState) -> TerraformOutput:
         """
-        Get the Terraform code generation prompt with validation feedback incorporated.
+        Runs the structured output generation without touching the state.
         """
+        structured_chain, input_dict = self.get_structured_chain(state)
         
-        base_prompt = """
+        cache_key = self.get_cache_key(state)
+        if not cache_key:
+            return structured_chain.invoke(input_dict)
+        return self.response_cache.get_or_invoke(cache_key, lambda: structured_chain.invoke(input_dict), TerraformOutput, has_components)
+    
+    
+    async def ainvoke_structured(self, state: InfraGenieState) -> TerraformOutput:
+        structured_chain, input_dict = self.get_structured_chain(state)
+        
+        cache_key = self.get_cache_key(state)
+        if not cache_key:
+            return await structured_chain.ainvoke(input_dict)
+        return await self.response_cache.aget_or_invoke(cache_key, lambda: structured_chain.ainvoke(input_dict), TerraformOutput, has_components)
+    
+    
+    def get_cache_key(self, state: InfraGenieState):
+        """
+        Returns the response cache key of a first generation, None when it must not be cached:
+        generations with feedback depend on the code being fixed.
+        """
+        if not self.response_cache or state.code_validation_feedback or state.code_validation_user_feedback:
+            return None
+        prompt_template = self.get_terraform_code_instructions() + self.get_terraform_code_request()
+        return self.response_cache.make_key("structured", self.llm, prompt_template, state.user_input)
+    
+    
+    def get_structured_chain(self, state: InfraGenieState):
+        """
+        Builds the structured output chain and its input for the current state.
+        """
+        structured_prompt = self.get_terraform_code_prompt(state)
+        
+        logger.debug(f"Structured Prompt: {structured_prompt.to_json()}")
+
+        input_dict = {**state.user_input.model_dump(), "feedback": self.get_feedback_section(state)}
+        logger.debug(f"User Input: {input_dict}")
+
+        structured_llm = self.llm.with_structured_output(TerraformOutput)
+        structured_chain = structured_prompt | structured_llm
+        
+        return structured_chain, input_dict
+    
+    
+    def apply_result(self, state: InfraGenieState, result: TerraformOutput):
+        """
+        Transfers a structured TerraformOutput into the state.
+        """
+        logger.debug(f"Result: {result}")
+        
+        # Clear existing environments and modules before adding new ones
+        state.environments.environments.clear()
+        state.modules.modules.clear()
+        
+        # Transfer the structured result to the state
+        for env in result.environments:
+            state.environments.environments.append(TerraformComponent(
+                name=env.name,
+                main_tf=env.main_tf,
+                output_tf=env.output_tf,
+                variables_tf=env.variables_tf
+            ))
+        
+        for module in result.modules:
+            state.modules.modules.append(TerraformComponent(
+                name=module.name,
+                main_tf=module.main_tf,
+                output_tf=module.output_tf,
+                variables_tf=module.variables_tf
+            ))
+        
+        print(f"Successfully generated {len(state.environments.environments)} environments and {len(state.modules.modules)} modules using structured output")
+        state.code_generated = True
+        state.next_node = const.CODE_VALIDATION
+    
+    
+    def get_terraform_code_prompt(self, state: InfraGenieState) -> ChatPromptTemplate:
+        """
+        Get the Terraform code generation prompt. The static instructions come first as the
+        system message so providers can cache that prefix across requests and fix iterations;
+        the specifications and the validation feedback ({feedback}) follow it.
+        """
+        return ChatPromptTemplate.from_messages([
+            ("system", self.get_terraform_code_instructions()),
+            ("human", self.get_terraform_code_request()),
+        ])
+    
+    
+    def get_terraform_code_instructions(self) -> str:
+        """
+        Static part of the prompt, identical for every request.
+        """
+        instructions = """
         **Objective:** Generate a production-grade, VALIDATION-COMPLIANT Terraform configuration (in HCL, not JSON) for an AWS infrastructure spanning dev environment.
 
         **CRITICAL VALIDATION REQUIREMENTS:**
@@ -88,126 +170,9 @@ class CodeGeneratorNode:
         - ALL data sources must be properly configured with required arguments
         - ALL resource dependencies must be explicitly defined
         - NO deprecated or unsupported arguments
-
-        USER REQUIREMENTS:
-        {requirements}
-
-        INFRASTRUCTURE SPECIFICATIONS:
-        Each parameter below MUST be explicitly implemented in the generated code:
-
-        Parameter: AWS Services
-        Value: {services}
-        Required Implementation: Each service requires a dedicated module with comprehensive implementation
-
-        Parameter: VPC CIDR
-        Value: {vpc_cidr}
-        Required Implementation: Must be implemented in networking module with proper subnet calculations
-
-        Parameter: Subnet Configuration
-        Value: {subnet_configuration}
-        Required Implementation: Must create appropriate subnet tiers with proper CIDR allocations
-
-        Parameter: Availability Zones
-        Value: {availability_zones}
-        Required Implementation: Must be used to determine resource distribution for high availability
-
-        Parameter: Compute Type
-        Value: {compute_type}
-        Required Implementation: Must inform the specific compute module implementation
-
-        Parameter: Multi-AZ Deployment
-        Value: {is_multi_az}
-        Required Implementation: Must be used to determine resource distribution across AZs
-
-        Parameter: Serverless Architecture
-        Value: {is_serverless}
-        Required Implementation: Must determine whether to use Lambda/API Gateway vs traditional compute
-
-        Parameter: Load Balancer Type
-        Value: {load_balancer_type}
-        Required Implementation: Must implement the specific load balancer with proper configuration
-
-        Parameter: Logging Enabled
-        Value: {enable_logging}
-        Required Implementation: Must implement comprehensive logging for all resources if true
-
-        Parameter: Monitoring Enabled
-        Value: {enable_monitoring}
-        Required Implementation: Must implement CloudWatch metrics, alarms, and dashboards if true
-
-        Parameter: WAF Enabled
-        Value: {enable_waf}
-        Required Implementation: Must implement WAF with proper rule sets if true
-
-        Parameter: Resource Tags
-        Value: {tags}
-        Required Implementation: Must be applied to all resources via provider and explicit tagging
-
-        Parameter: Database Type
-        Value: {database_type}
-        Required Implementation: Must implement the specific database service with proper configuration
-
-        Parameter: Advanced Parameters
-        Value: {custom_parameters}
-        Required Implementation: Must be incorporated into relevant modules based on parameter context
-
-        Parameter: Region
-        Value: {region}
-        Required Implementation: Must be used in provider configuration and region-specific resources
         """
-
-        # Check for validation feedback and incorporate it
-        validation_feedback = getattr(state, 'code_validation_feedback', None)
-        user_feedback = getattr(state, 'code_validation_user_feedback', None)
         
-        feedback_section = ""
-        if validation_feedback or user_feedback:
-            feedback_section = "\n**CRITICAL: INCORPORATE THE FOLLOWING FEEDBACK TO FIX VALIDATION ERRORS:**\n"
-            
-            if validation_feedback:
-                feedback_section += f"""
-                **Terraform Validation Errors to Fix:**
-                {validation_feedback}
-
-                **ACTION REQUIRED:** 
-                - Analyze each validation error above
-                - Fix ALL syntax errors, unsupported arguments, and missing variable declarations
-                - Ensure ALL variable references are properly declared in variables.tf files
-                - Use only supported resource arguments as per AWS provider documentation
-                - Fix any CIDR block issues or overlapping subnets
-                - Ensure proper module references and dependencies
-
-                """
-                
-                if user_feedback:
-                    feedback_section += f"""
-                    **User Feedback to Address:**
-                    {user_feedback}
-
-                    **ACTION REQUIRED:**
-                    - Address all user concerns and requirements
-                    - Implement suggested improvements
-                    - Ensure the solution meets user expectations
-
-                    """
-            
-            # Add context about existing code if available
-            if hasattr(state, 'environments') and state.environments.environments:
-                feedback_section += """
-                **EXISTING CODE CONTEXT:**
-                You are fixing/improving existing Terraform code. Make sure to:
-                - Maintain the same module structure and naming conventions
-                - Fix errors without breaking working parts
-                - Preserve user requirements and infrastructure specifications
-                - Only modify what needs to be fixed based on the feedback above
-
-                """
-
-        # Combine base prompt with feedback section
-        prompt_with_feedback = base_prompt + feedback_section
-
-        # Add the rest of the prompt
-        rest_of_prompt = """
+        standards = """
         TERRAFORM CODE STANDARDS:
 
         1. Provider Configuration (MANDATORY for each module):
@@ -360,8 +325,137 @@ class CodeGeneratorNode:
 
         Your task is to generate VALIDATION-COMPLIANT, production-ready Terraform code that PASSES terraform validate without errors. The code must be syntactically correct, use only supported arguments, and have all dependencies properly declared.
         """
+        
+        return instructions + standards
+    
+    
+    def get_terraform_code_request(self) -> str:
+        """
+        Per-request part of the prompt: the user input and the feedback section.
+        """
+        return """
+        USER REQUIREMENTS:
+        {requirements}
 
-        return prompt_with_feedback + rest_of_prompt
+        INFRASTRUCTURE SPECIFICATIONS:
+        Each parameter below MUST be explicitly implemented in the generated code:
+
+        Parameter: AWS Services
+        Value: {services}
+        Required Implementation: Each service requires a dedicated module with comprehensive implementation
+
+        Parameter: VPC CIDR
+        Value: {vpc_cidr}
+        Required Implementation: Must be implemented in networking module with proper subnet calculations
+
+        Parameter: Subnet Configuration
+        Value: {subnet_configuration}
+        Required Implementation: Must create appropriate subnet tiers with proper CIDR allocations
+
+        Parameter: Availability Zones
+        Value: {availability_zones}
+        Required Implementation: Must be used to determine resource distribution for high availability
+
+        Parameter: Compute Type
+        Value: {compute_type}
+        Required Implementation: Must inform the specific compute module implementation
+
+        Parameter: Multi-AZ Deployment
+        Value: {is_multi_az}
+        Required Implementation: Must be used to determine resource distribution across AZs
+
+        Parameter: Serverless Architecture
+        Value: {is_serverless}
+        Required Implementation: Must determine whether to use Lambda/API Gateway vs traditional compute
+
+        Parameter: Load Balancer Type
+        Value: {load_balancer_type}
+        Required Implementation: Must implement the specific load balancer with proper configuration
+
+        Parameter: Logging Enabled
+        Value: {enable_logging}
+        Required Implementation: Must implement comprehensive logging for all resources if true
+
+        Parameter: Monitoring Enabled
+        Value: {enable_monitoring}
+        Required Implementation: Must implement CloudWatch metrics, alarms, and dashboards if true
+
+        Parameter: WAF Enabled
+        Value: {enable_waf}
+        Required Implementation: Must implement WAF with proper rule sets if true
+
+        Parameter: Resource Tags
+        Value: {tags}
+        Required Implementation: Must be applied to all resources via provider and explicit tagging
+
+        Parameter: Database Type
+        Value: {database_type}
+        Required Implementation: Must implement the specific database service with proper configuration
+
+        Parameter: Advanced Parameters
+        Value: {custom_parameters}
+        Required Implementation: Must be incorporated into relevant modules based on parameter context
+
+        Parameter: Region
+        Value: {region}
+        Required Implementation: Must be used in provider configuration and region-specific resources
+
+        {feedback}
+        """
+    
+    
+    def get_feedback_section(self, state: InfraGenieState) -> str:
+        """
+        Get the validation and user feedback to fix, empty on the first generation.
+        """
+        # Check for validation feedback and incorporate it
+        validation_feedback = getattr(state, 'code_validation_feedback', None)
+        user_feedback = getattr(state, 'code_validation_user_feedback', None)
+        
+        feedback_section = ""
+        if validation_feedback or user_feedback:
+            feedback_section = "\n**CRITICAL: INCORPORATE THE FOLLOWING FEEDBACK TO FIX VALIDATION ERRORS:**\n"
+            
+            if validation_feedback:
+                feedback_section += f"""
+                **Terraform Validation Errors to Fix:**
+                {validation_feedback}
+
+                **ACTION REQUIRED:** 
+                - Analyze each validation error above
+                - Fix ALL syntax errors, unsupported arguments, and missing variable declarations
+                - Ensure ALL variable references are properly declared in variables.tf files
+                - Use only supported resource arguments as per AWS provider documentation
+                - Fix any CIDR block issues or overlapping subnets
+                - Ensure proper module references and dependencies
+
+                """
+                
+                if user_feedback:
+                    feedback_section += f"""
+                    **User Feedback to Address:**
+                    {user_feedback}
+
+                    **ACTION REQUIRED:**
+                    - Address all user concerns and requirements
+                    - Implement suggested improvements
+                    - Ensure the solution meets user expectations
+
+                    """
+            
+            # Add context about existing code if available
+            if hasattr(state, 'environments') and state.environments.environments:
+                feedback_section += """
+                **EXISTING CODE CONTEXT:**
+                You are fixing/improving existing Terraform code. Make sure to:
+                - Maintain the same module structure and naming conventions
+                - Fix errors without breaking working parts
+                - Preserve user requirements and infrastructure specifications
+                - Only modify what needs to be fixed based on the feedback above
+
+                """
+        
+        return feedback_section
     
     def is_code_generated(self, state: InfraGenieState):
         """Decide whether to use the fallback method based on the code generation status."""
@@ -370,12 +464,197 @@ class CodeGeneratorNode:
     def fix_code(self, state: InfraGenieState):
         """
         This method is called when code validation fails and we need to fix the code.
-        It's essentially a wrapper around generate_terraform_code but with feedback context.
+        When every validation error can be attributed to a component, only the failing
+        components are regenerated and the valid ones are kept untouched. Otherwise the
+        graph goes back to full generation with the feedback in the prompt.
         """
         logger.info("Fixing Terraform code based on validation feedback...")
         
         # Reset code generation status to trigger regeneration
         state.code_generated = False
         
-        # Call the main generation method which will now include validation feedback
-        return self.generate_terraform_code(state)
\ No newline at end of file
+        targets = self.get_fix_targets(state)
+        if not targets:
+            return state
+        
+        try:
+            fixes = [self.get_component_fix(state, key, component) for key, component in targets]
+            
+            # Failing components are regenerated concurrently, each by the model routed for its fix
+            results = RunnableLambda(self.invoke_component_fix).batch(fixes)
+            self.apply_component_fixes(state, targets, results)
+            
+        except Exception as e:
+            print(f"Localized fix failed, regenerating everything: {e}")
+            state.code_generated = False
+        
+        return state
+    
+    
+    async def afix_code(self, state: InfraGenieState):
+        """
+        Async version of fix_code.
+        """
+        logger.info("Fixing Terraform code based on validation feedback...")
+        
+        state.code_generated = False
+        
+        targets = self.get_fix_targets(state)
+        if not targets:
+            return state
+        
+        try:
+            fixes = [self.get_component_fix(state, key, component) for key, component in targets]
+            
+            results = await RunnableLambda(self.invoke_component_fix, afunc=self.ainvoke_component_fix).abatch(fixes)
+            self.apply_component_fixes(state, targets, results)
+            
+        except Exception as e:
+            print(f"Localized fix failed, regenerating everything: {e}")
+            state.code_generated = False
+        
+        return state
+    
+    
+    def fix_code_router(self, state: InfraGenieState):
+        """
+        Routes a localized fix straight to saving, anything else to full regeneration.
+        """
+        return "save_code" if state.code_generated else "regenerate"
+    
+    
+    def get_fix_targets(self, state: InfraGenieState):
+        """
+        Returns the (component key, component) pairs to regenerate, or an empty list
+        when the errors cannot be localized. User feedback goes into each component's fix.
+        """
+        if not state.failed_components:
+            return []
+        
+        components = {f"environments/{env.name}": env for env in state.environments.environments}
+        components.update({f"modules/{module.name}": module for module in state.modules.modules})
+        
+        if any(key not in components for key in state.failed_components):
+            return []
+        
+        logger.info(f"Regenerating only the failing components: {list(state.failed_components)}")
+        return [(key, components[key]) for key in state.failed_components]
+    
+    
+    def get_component_fix(self, state: InfraGenieState, key: str, component: TerraformComponent):
+        """
+        Returns the (chain, input) of the fix of one failing component. Without a router the
+        selected model fixes everything; a routed cheap model that fails escalates to the
+        large fix model.
+        """
+        prompt = PromptTemplate.from_template(self.get_component_fix_prompt())
+        llm = self.model_router.get_fix_llm(state.failed_component_error_counts.get(key, 1), component) if self.model_router else self.llm
+        chain = prompt | llm.with_structured_output(TerraformComponent)
+        
+        escalation_llm = self.model_router.get_llm(const.ROUTE_LARGE_FIX) if self.model_router else llm
+        if escalation_llm is not llm:
+            chain = chain.with_fallbacks([prompt | escalation_llm.with_structured_output(TerraformComponent)])
+        return chain, self.get_component_fix_input(state, key, component)
+    
+    
+    def invoke_component_fix(self, fix):
+        chain, input_dict = fix
+        return chain.invoke(input_dict)
+    
+    
+    async def ainvoke_component_fix(self, fix):
+        chain, input_dict = fix
+        return await chain.ainvoke(input_dict)
+    
+    
+    def get_component_fix_input(self, state: InfraGenieState, key: str, component: TerraformComponent):
+        """
+        Builds the prompt input for one failing component, with the interfaces of the other components as context.
+        """
+        other_components = [env for env in state.environments.environments if f"environments/{env.name}" != key]
+        other_components += [module for module in state.modules.modules if f"modules/{module.name}" != key]
+        
+        context = "\n\n".join(
+            f"# {other.name} - variables.tf\n{other.variables_tf}\n\n# {other.name} - output.tf\n{other.output_tf}"
+            for other in other_components
+        )
+        if not key.startswith("modules/"):
+            context += "".join(f"\n\n# module {module.name} is sourced from ../../modules/{module.name}" for module in state.modules.modules)
+        else:
+            context += "".join(f"\n\n# {env.name} - main.tf (calls this module)\n{env.main_tf}" for env in state.environments.environments)
+        
+        return {
+            "component_key": key,
+            "component_name": component.name,
+            "main_tf": component.main_tf,
+            "variables_tf": component.variables_tf,
+            "output_tf": component.output_tf,
+            "errors": state.failed_components[key],
+            "context": context,
+            "user_feedback": self.get_component_user_feedback(state),
+        }
+    
+    
+    def get_component_user_feedback(self, state: InfraGenieState) -> str:
+        """
+        The review feedback of the user, empty when the fix comes from the validation alone.
+        """
+        if not state.code_validation_user_feedback:
+            return ""
+        return f"""
+        **User Feedback to Address (where it concerns this component):**
+        {state.code_validation_user_feedback}
+        """
+    
+    
+    def apply_component_fixes(self, state: InfraGenieState, targets, results):
+        """
+        Swaps the regenerated components into the state, leaving all others byte-for-byte identical.
+        """
+        fixed = {}
+        for (key, component), result in zip(targets, results):
+            result.name = component.name
+            fixed[key] = result
+        
+        state.environments.environments = [
+            fixed.get(f"environments/{env.name}", env) for env in state.environments.environments
+        ]
+        state.modules.modules = [
+            fixed.get(f"modules/{module.name}", module) for module in state.modules.modules
+        ]
+        
+        print(f"Successfully regenerated {len(fixed)} failing components")
+        state.code_generated = True
+        state.next_node = const.CODE_VALIDATION
+    
+    
+    def get_component_fix_prompt(self) -> str:
+        return """
+        **Objective:** Fix the Terraform validation errors in ONE component ({component_key}) of an existing AWS Terraform configuration.
+
+        **Terraform Validation Errors to Fix:**
+        {errors}
+
+        CURRENT FILES OF {component_key}:
+
+        # main.tf
+        {main_tf}
+
+        # variables.tf
+        {variables_tf}
+
+        # output.tf
+        {output_tf}
+
+        INTERFACES OF THE OTHER COMPONENTS (these are valid and will NOT change):
+        {context}
+        {user_feedback}
+
+        **ACTION REQUIRED:**
+        - Return the component name as "{component_name}"
+        - Fix ALL the errors above, changing as little as possible
+        - Keep every variable and output the other components rely on
+        - Ensure ALL variable references are properly declared in variables.tf
+        - Use only supported resource arguments as per AWS provider documentation (~> 5.0)
+        - Return the complete content of all three files, without markdown code fences
+        """
@@ -3,6 +3,9 @@ from loguru import logger
 from src.infra_genie.state.infra_genie_state import InfraGenieState, TerraformComponent
 from langchain_core.prompts import PromptTemplate
 from src.infra_genie.utils import constants as const
+from src.infra_genie.utils.workspace import get_task_id, get_workspace
+from langchain_core.runnables import RunnableConfig
+import asyncio
 import os
 import shutil
     
@@ -12,48 +15,62 @@ class ProcessCodeNode:
     def __init__(self, llm):
         self.llm = llm
        
-    def save_terraform_files(self, state: InfraGenieState):
-        """Save the generated Terraform files to disk."""
-        
-        base_dir = "output/src"
-        
-        # Delete existing directories before saving
-        if os.path.exists(base_dir):
-            shutil.rmtree(base_dir)
+    def save_terraform_files(self, state: InfraGenieState, config: RunnableConfig):
+        """
+        Save the generated Terraform files to the workspace of the task.
+        Files already on disk with the same content (e.g. written while streaming) are left
+        alone, directories of components that are no longer generated are removed. Terraform's
+        .terraform and .terraform.lock.hcl in the environment directories are kept, so the
+        next validation can reuse their init.
+        """
         
+        base_dir = str(get_workspace(get_task_id(config)))
         os.makedirs(base_dir, exist_ok=True)
         
-        for env in state.environments.environments:
-            env_dir = os.path.join(base_dir, "environments", env.name)
-            os.makedirs(env_dir, exist_ok=True)
-            
-            with open(os.path.join(env_dir, "main.tf"), "w") as f:
-                f.write(env.main_tf)
-            
-            with open(os.path.join(env_dir, "output.tf"), "w") as f:
-                f.write(env.output_tf)
-            
-            with open(os.path.join(env_dir, "variables.tf"), "w") as f:
-                f.write(env.variables_tf)
-        
-        for module in state.modules.modules:
-            module_dir = os.path.join(base_dir, "modules", module.name)
-            os.makedirs(module_dir, exist_ok=True)
-            
-            with open(os.path.join(module_dir, "main.tf"), "w") as f:
-                f.write(module.main_tf)
+        components = {"environments": state.environments.environments, "modules": state.modules.modules}
+        for root, root_components in components.items():
+            root_dir = os.path.join(base_dir, root)
+            names = {component.name for component in root_components}
             
-            with open(os.path.join(module_dir, "output.tf"), "w") as f:
-                f.write(module.output_tf)
+            # Delete the directories of components left out of this generation
+            if os.path.isdir(root_dir):
+                for name in os.listdir(root_dir):
+                    if name not in names:
+                        shutil.rmtree(os.path.join(root_dir, name), ignore_errors=True)
             
-            with open(os.path.join(module_dir, "variables.tf"), "w") as f:
-                f.write(module.variables_tf)
+            for component in root_components:
+                self.write_component(base_dir, root, component)
         
         print(f"Terraform files have been saved to {base_dir}")
         
         return state
     
     
+    def write_component(self, base_dir: str, root: str, component: TerraformComponent) -> str:
+        """
+        Writes the files of one environment or module ("environments" or "modules" root),
+        skipping unchanged files. Returns the component directory.
+        """
+        component_dir = os.path.join(base_dir, root, component.name)
+        os.makedirs(component_dir, exist_ok=True)
+        
+        for filename, content in (("main.tf", component.main_tf), ("output.tf", component.output_tf), ("variables.tf", component.variables_tf)):
+            path = os.path.join(component_dir, filename)
+            if os.path.exists(path):
+                with open(path) as f:
+                    if f.read() == content:
+                        continue
+            with open(path, "w") as f:
+                f.write(content)
+        
+        return component_dir
+    
+    
+    async def asave_terraform_files(self, state: InfraGenieState, config: RunnableConfig):
+        """Async version of save_terraform_files, the disk writes run off the event loop."""
+        return await asyncio.to_thread(self.save_terraform_files, state, config)
+    
+    
     def download_artifacts(self, state: InfraGenieState):
         pass
         
\ No newline at end of file
@@ -1,120 +1,253 @@
 from src.infra_genie.state.infra_genie_state import InfraGenieState
 from src.infra_genie.utils import constants as const
+from src.infra_genie.utils.token_usage import track_subprocess
+from src.infra_genie.utils.terraform_init import TerraformInit
+from src.infra_genie.utils.workspace import get_environment_dir, get_task_id
+from langchain_core.runnables import RunnableConfig
+import asyncio
 import os
 import subprocess
 from loguru import logger
 import json
+import re
 
 class CodeValidatorNode:
     
-    def __init__(self, llm, base_directory="output/src/environments/dev"):
-        self.base_directory = base_directory
+    def __init__(self, llm, environment="dev", terraform_init=None):
+        self.environment = environment
         self.llm = llm
+        # Shared plugin cache and init reuse across validations
+        self.terraform_init = terraform_init or TerraformInit()
         
+    
+    def get_base_directory(self, config: RunnableConfig) -> str:
+        """Terraform runs in the environment directory of the task's workspace"""
+        return str(get_environment_dir(get_task_id(config), self.environment))
+    
             
-    def validate_terraform_code(self, state: InfraGenieState):
+    def validate_terraform_code(self, state: InfraGenieState, config: RunnableConfig):
         """
         Validates the generated Terraform code using Terraform's JSON output format
         """
+        base_directory = self.get_base_directory(config)
+        state.validation_iterations += 1
+        
+        if state.syntax_errors:
+            self.apply_syntax_errors(state)
+            return state
         
         try:
             # Change directory to where Terraform code is generated
-            if not os.path.isdir(self.base_directory):
-                raise Exception(f"Terraform code directory '{self.base_directory}' does not exist.")
-            
-            # First, run terraform init
-            init_result = subprocess.run(
-                ["terraform", "init", "-no-color"],
-                cwd=self.base_directory,
-                capture_output=True,
-                text=True
-            )
+            if not os.path.isdir(base_directory):
+                raise Exception(f"Terraform code directory '{base_directory}' does not exist.")
+            
+            # First, run terraform init unless the providers and modules are unchanged
+            init_returncode, init_stderr = self.terraform_init.run(base_directory, config)
             
             # Run terraform validate with JSON output 
-            validate_result = subprocess.run(
-                ["terraform", "validate", "-json"],
-                cwd=self.base_directory,
-                capture_output=True,
-                text=True
-            )
+            with track_subprocess(config, ["terraform", "validate", "-json"]):
+                validate_result = subprocess.run(
+                    ["terraform", "validate", "-json"],
+                    cwd=base_directory,
+                    capture_output=True,
+                    text=True
+                )
             
-            logger.debug(f"Terraform Init Response: {init_result}")
             logger.info("-----------------------------------------")
             logger.debug(f"Terraform Validate Response: {validate_result}")
-            state.code_validation_json = validate_result.stdout
-            
-            # If init succeeded, proceed to validation results
-            if init_result.returncode == 0:
-                try:
-                    validation_data = json.loads(validate_result.stdout)
-                    logger.info(f"Terraform Validation Json: {validation_data}")
-                    
-                    if validation_data.get("valid", False):
-                        state.is_code_valid = True
-                        state.code_validation_feedback = "Terraform code is valid"
-                    else:
-                        # Extract ALL errors from diagnostics
-                        diagnostics = validation_data.get("diagnostics", [])
-                        if diagnostics:
-                            error_messages = []
-                            
-                            for error in diagnostics:
-                                # Build error message
-                                message = error.get("summary", "Unknown error")
-                                detail = error.get("detail", "")
-                                if detail:
-                                    message += f": {detail}"
-                                
-                                # Add location info if available
-                                if "range" in error and "filename" in error["range"]:
-                                    filename = error["range"]["filename"]
-                                    start_line = error["range"].get("start", {}).get("line", "unknown")
-                                    message += f" (File: {filename}, Line: {start_line})"
-                                
-                                error_messages.append(message)
-                            
-                            # Join all errors with newlines
-                            all_errors = "\n".join(error_messages)
-                            error_count = len(error_messages)
-                            
-                            state.is_code_valid = False
-                            state.code_validation_feedback = f"Found {error_count} validation errors:\n\n{all_errors}"
-                            logger.error(f"Terraform validation failed with {error_count} errors")
-                            logger.error(f"Terraform validation feedback:\n{ state.code_validation_feedback}")
-                            
-                        else:
-                            state.is_code_valid = False
-                            state.code_validation_feedback = "Terraform validation failed with unspecified errors"
-                            logger.error("Terraform validation failed with unspecified errors")
-                            
-                except json.JSONDecodeError:
-                    # If JSON parsing fails
-                    state.is_code_valid = False
-                    state.code_validation_feedback = "Failed to parse Terraform validation output"
-                    logger.error("Failed to parse Terraform validation output")
-            else:
-                # Init failed
-                state.is_code_valid = False
-                
-                # Get clean error message from init failure
-                error_message = "Terraform initialization failed"
-                
-                if "Error:" in init_result.stderr:
-                    import re
-                    error_match = re.search(r'Error: ([^\n]+)', init_result.stderr)
-                    if error_match:
-                        error_message += f": {error_match.group(1).strip()}"
-                
-                state.code_validation_feedback = error_message
-                logger.error(error_message)
             
+            self.process_validation_result(state, init_returncode, init_stderr, validate_result.stdout)
+        
+        except Exception as e:
+            state.is_code_valid = False
+            state.code_validation_feedback = str(e)
+            logger.error(f"Terraform Validation Error: {str(e)}")
+        
+        return state
+        
+        
+    async def avalidate_terraform_code(self, state: InfraGenieState, config: RunnableConfig):
+        """
+        Async version of validate_terraform_code, terraform runs as an async subprocess
+        """
+        base_directory = self.get_base_directory(config)
+        state.validation_iterations += 1
+        
+        if state.syntax_errors:
+            self.apply_syntax_errors(state)
             return state
         
+        try:
+            if not os.path.isdir(base_directory):
+                raise Exception(f"Terraform code directory '{base_directory}' does not exist.")
+            
+            # init holds the plugin cache lock, it runs on a worker thread
+            init_returncode, init_stderr = await asyncio.to_thread(self.terraform_init.run, base_directory, config)
+            _, validate_stdout, _ = await self.arun_terraform(["terraform", "validate", "-json"], base_directory, config)
+            
+            logger.debug(f"Terraform Init Return Code: {init_returncode}")
+            logger.debug(f"Terraform Validate Response: {validate_stdout}")
+            
+            self.process_validation_result(state, init_returncode, init_stderr, validate_stdout)
+        
         except Exception as e:
             state.is_code_valid = False
             state.code_validation_feedback = str(e)
             logger.error(f"Terraform Validation Error: {str(e)}")
         
+        return state
+    
+    
+    async def arun_terraform(self, command, cwd, config: RunnableConfig = None):
+        """
+        Runs a terraform command without blocking the event loop.
+        Returns the (returncode, stdout, stderr) tuple.
+        """
+        with track_subprocess(config, command):
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                cwd=cwd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            stdout, stderr = await process.communicate()
+        return process.returncode, stdout.decode(), stderr.decode()
+    
+    
+    def check_syntax(self, component_dir: str, config: RunnableConfig = None):
+        """
+        Parses the files of one component with terraform fmt, without init or provider downloads.
+        Returns the syntax errors, None when the files parse.
+        """
+        command = ["terraform", "fmt", "-write=false", "-list=false", "-no-color", component_dir]
+        with track_subprocess(config, command):
+            result = subprocess.run(command, capture_output=True, text=True)
+        
+        if result.returncode == 0:
+            return None
+        return result.stderr.strip() or f"terraform fmt failed with exit code {result.returncode}"
+    
+    
+    def apply_syntax_errors(self, state: InfraGenieState):
+        """
+        Fails the validation with the syntax errors found while streaming, terraform init
+        and validate are skipped since they would stop at the same errors
+        """
+        errors = "\n\n".join(f"{component}:\n{error}" for component, error in state.syntax_errors.items())
+        
+        state.is_code_valid = False
+        state.code_validation_json = None
+        state.code_validation_feedback = f"Found syntax errors in {len(state.syntax_errors)} components:\n\n{errors}"
+        state.failed_components = dict(state.syntax_errors)
+        # terraform fmt stops at the first error of a component
+        state.failed_component_error_counts = {component: 1 for component in state.syntax_errors}
+        state.syntax_errors = {}
+        logger.error(state.code_validation_feedback)
+    
+    
+    def process_validation_result(self, state: InfraGenieState, init_returncode: int, init_stderr: str, validate_stdout: str):
+        """
+        Updates the state from the terraform init and validate outputs
+        """
+        state.code_validation_json = validate_stdout
+        state.failed_components = {}
+        state.failed_component_error_counts = {}
+        
+        # If init succeeded, proceed to validation results
+        if init_returncode == 0:
+            try:
+                validation_data = json.loads(validate_stdout)
+                logger.info(f"Terraform Validation Json: {validation_data}")
+                
+                if validation_data.get("valid", False):
+                    state.is_code_valid = True
+                    state.code_validation_feedback = "Terraform code is valid"
+                else:
+                    # Extract ALL errors from diagnostics
+                    diagnostics = validation_data.get("diagnostics", [])
+                    if diagnostics:
+                        error_messages = []
+                        
+                        for error in diagnostics:
+                            # Build error message
+                            message = error.get("summary", "Unknown error")
+                            detail = error.get("detail", "")
+                            if detail:
+                                message += f": {detail}"
+                            
+                            # Add location info if available
+                            if "range" in error and "filename" in error["range"]:
+                                filename = error["range"]["filename"]
+                                start_line = error["range"].get("start", {}).get("line", "unknown")
+                                message += f" (File: {filename}, Line: {start_line})"
+                            
+                            error_messages.append(message)
+                        
+                        # Join all errors with newlines
+                        all_errors = "\n".join(error_messages)
+                        error_count = len(error_messages)
+                        
+                        state.is_code_valid = False
+                        state.code_validation_feedback = f"Found {error_count} validation errors:\n\n{all_errors}"
+                        component_errors = self.map_diagnostics_to_components(diagnostics, error_messages)
+                        state.failed_components = {component: "\n".join(messages) for component, messages in component_errors.items()}
+                        state.failed_component_error_counts = {component: len(messages) for component, messages in component_errors.items()}
+                        logger.error(f"Terraform validation failed with {error_count} errors")
+                        logger.error(f"Terraform validation feedback:\n{ state.code_validation_feedback}")
+                        
+                    else:
+                        state.is_code_valid = False
+                        state.code_validation_feedback = "Terraform validation failed with unspecified errors"
+                        logger.error("Terraform validation failed with unspecified errors")
+                        
+            except json.JSONDecodeError:
+                # If JSON parsing fails
+                state.is_code_valid = False
+                state.code_validation_feedback = "Failed to parse Terraform validation output"
+                logger.error("Failed to parse Terraform validation output")
+        else:
+            # Init failed
+            state.is_code_valid = False
+            
+            # Get clean error message from init failure
+            error_message = "Terraform initialization failed"
+            
+            if "Error:" in init_stderr:
+                error_match = re.search(r'Error: ([^\n]+)', init_stderr)
+                if error_match:
+                    error_message += f": {error_match.group(1).strip()}"
+            
+            state.code_validation_feedback = error_message
+            logger.error(error_message)
+        
+        
+    def map_diagnostics_to_components(self, diagnostics, error_messages):
+        """
+        Groups the error messages by the component owning the diagnostic's file,
+        e.g. "../../modules/ec2/main.tf" -> "modules/ec2", "main.tf" -> "environments/dev".
+        Returns an empty dict when any diagnostic cannot be attributed to a component.
+        """
+        failed_components = {}
+        
+        for error, message in zip(diagnostics, error_messages):
+            filename = error.get("range", {}).get("filename")
+            if not filename:
+                return {}
+            
+            filename = filename.replace("\\", "/")
+            module_match = re.search(r"(?:^|/)modules/([^/]+)/[^/]+$", filename)
+            if module_match:
+                component = f"modules/{module_match.group(1)}"
+            elif "/" not in filename:
+                component = f"environments/{self.environment}"
+            else:
+                return {}
+            
+            failed_components.setdefault(component, [])
+            failed_components[component].append(message)
+        
+        return failed_components
+        
         
     def code_validation_router(self, state: InfraGenieState):
         """
@@ -126,27 +259,29 @@ class CodeValidatorNode:
             return "feedback"
     
     
-    def create_terraform_plan(self, state: InfraGenieState):
+    def create_terraform_plan(self, state: InfraGenieState, config: RunnableConfig):
         """
         Runs terraform plan and returns structured results in JSON format
         """
+        base_directory = self.get_base_directory(config)
         
         try:
             # Change directory to where Terraform code is generated
-            if not os.path.isdir(self.base_directory):
-                raise Exception(f"Terraform code directory '{self.base_directory}' does not exist.")
+            if not os.path.isdir(base_directory):
+                raise Exception(f"Terraform code directory '{base_directory}' does not exist.")
                 
             # First ensure terraform is initialized
             if not state.is_code_valid:
                 raise Exception("Terraform code is not valid")
                 
             # Run terraform plan with JSON output
-            plan_result = subprocess.run(
-                ["terraform", "plan", "-out=tfplan", "-no-color"],
-                cwd=self.base_directory,
-                capture_output=True,
-                text=True
-            )
+            with track_subprocess(config, ["terraform", "plan", "-out=tfplan", "-no-color"]):
+                plan_result = subprocess.run(
+                    ["terraform", "plan", "-out=tfplan", "-no-color"],
+                    cwd=base_directory,
+                    capture_output=True,
+                    text=True
+                )
             
             logger.debug(f"Terraform Plan: {plan_result}")
             logger.success(f"Terraform Plan Stdout: {plan_result.stdout}")
@@ -158,12 +293,13 @@ class CodeValidatorNode:
                 return state
                 
             # Convert the plan to JSON format for easy parsing
-            json_plan_result = subprocess.run(
-                ["terraform", "show", "-json", "tfplan"],
-                cwd=self.base_directory,
-                capture_output=True,
-                text=True
-            )
+            with track_subprocess(config, ["terraform", "show", "-json", "tfplan"]):
+                json_plan_result = subprocess.run(
+                    ["terraform", "show", "-json", "tfplan"],
+                    cwd=base_directory,
+                    capture_output=True,
+                    text=True
+                )
             logger.success(f"Terraform Plan Json: {json_plan_result}")
             
             ## Failed to conver plan to JSON
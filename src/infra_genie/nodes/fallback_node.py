@@ -1,15 +1,17 @@
 from pydantic import BaseModel, Field
 from loguru import logger
-from src.infra_genie.state.infra_genie_state import InfraGenieState, TerraformComponent
+from src.infra_genie.state.infra_genie_state import InfraGenieState, TerraformOutput
 from langchain_core.prompts import PromptTemplate
 from src.infra_genie.utils import constants as const
-import re
+from src.infra_genie.cache.response_cache import has_components
+from src.infra_genie.utils.code_stream import FallbackOutputParser, get_chunk_text
     
 
 class FallbackNode:
     
-    def __init__(self, llm):
+    def __init__(self, llm, response_cache=None):
         self.llm = llm
+        self.response_cache = response_cache
        
     
     def fallback_generate_terraform_code(self, state: InfraGenieState):
@@ -24,78 +26,39 @@ class FallbackNode:
         
         try:
             print("Trying fallback approach...")
-                    
-            prompt_template = self.get_fallback_code_prompt()
-            logger.debug(f"Prompt Template: {prompt_template}")
             
-            structured_prompt = PromptTemplate.from_template(prompt_template)
-            logger.debug(f"""Structured Prompt: {structured_prompt.to_json()}""")
+            output = self.invoke_fallback(state)
+            # Replaces what an earlier generation left, a retried fallback must not duplicate components
+            state.environments.environments = list(output.environments)
+            state.modules.modules = list(output.modules)
             
-            input_dict = state.user_input.model_dump()
-            logger.debug(f"User Input: {input_dict}")
-
-            structured_chain = structured_prompt | self.llm
+            print(f"Successfully generated {len(state.environments.environments)} environments and {len(state.modules.modules)} modules using fallback approach")
+            state.code_generated = True
+            state.next_node = const.CODE_VALIDATION
+        
+        except Exception as fallback_error:
+            print(f"Improved fallback attempt failed: {fallback_error}")
+            state.code_generated = False
+            state.next_node = const.ERROR
+        
+        return state
+    
+    
+    async def afallback_generate_terraform_code(self, state: InfraGenieState):
+        """
+        Async version of fallback_generate_terraform_code.
+        """
 
-            result = structured_chain.invoke(input_dict)
-            
-            content = result.content
-            logger.debug(f"Content: {content}")
-            
-            # Extract environment blocks
-            env_pattern = r"# ENV: (\w+) - (\w+\.tf)\n([\s\S]*?)(?=# ENV:|# MODULE:|$)"
-            env_matches = re.findall(env_pattern, content)
-            
-            # Extract module blocks
-            module_pattern = r"# MODULE: (\w+) - (\w+\.tf)\n([\s\S]*?)(?=# ENV:|# MODULE:|$)"
-            module_matches = re.findall(module_pattern, content)
+        if not state.user_input:
+            raise ValueError("User input is required to generate Terraform code")
         
-            # Dictionary to organize the extracted content
-            environments = {}
-            modules = {}
-            
-            # Process environment matches
-            for env_name, file_type, content in env_matches:
-                if env_name not in environments:
-                    environments[env_name] = {"name": env_name, "main_tf": "", "variables_tf": "", "output_tf": ""}
-                
-                if file_type == "main.tf":
-                    environments[env_name]["main_tf"] = content.strip()
-                elif file_type == "variables.tf":
-                    environments[env_name]["variables_tf"] = content.strip()
-                elif file_type == "output.tf":
-                    environments[env_name]["output_tf"] = content.strip()
-            
-            # Process module matches
-            for module_name, file_type, content in module_matches:
-                if module_name not in modules:
-                    modules[module_name] = {"name": module_name, "main_tf": "", "variables_tf": "", "output_tf": ""}
-                
-                if file_type == "main.tf":
-                    modules[module_name]["main_tf"] = content.strip()
-                elif file_type == "variables.tf":
-                    modules[module_name]["variables_tf"] = content.strip()
-                elif file_type == "output.tf":
-                    modules[module_name]["output_tf"] = content.strip()
-            
-            # Update state with extracted environments
-            for env_name, env_data in environments.items():
-                component = TerraformComponent(
-                    name=env_data["name"],
-                    main_tf=env_data["main_tf"],
-                    output_tf=env_data["output_tf"],
-                    variables_tf=env_data["variables_tf"]
-                )
-                state.environments.environments.append(component)
+        try:
+            print("Trying fallback approach...")
             
-            # Update state with extracted modules
-            for module_name, module_data in modules.items():
-                component = TerraformComponent(
-                    name=module_data["name"],
-                    main_tf=module_data["main_tf"],
-                    output_tf=module_data["output_tf"],
-                    variables_tf=module_data["variables_tf"]
-                )
-                state.modules.modules.append(component)
+            output = await self.ainvoke_fallback(state)
+            # Replaces what an earlier generation left, a retried fallback must not duplicate components
+            state.environments.environments = list(output.environments)
+            state.modules.modules = list(output.modules)
             
             print(f"Successfully generated {len(state.environments.environments)} environments and {len(state.modules.modules)} modules using fallback approach")
             state.code_generated = True
@@ -108,6 +71,70 @@ class FallbackNode:
         
         return state
     
+    
+    def invoke_fallback(self, state: InfraGenieState) -> TerraformOutput:
+        """
+        Runs the plain text generation and parses it without touching the state.
+        """
+        structured_chain, input_dict = self.get_fallback_chain(state)
+        
+        def generate():
+            # Parsed as the response streams in, no second pass over the full text
+            parser = FallbackOutputParser()
+            for chunk in structured_chain.stream(input_dict):
+                parser.feed(get_chunk_text(chunk))
+            return TerraformOutput(**parser.close())
+        
+        if not self.response_cache:
+            return generate()
+        return self.response_cache.get_or_invoke(self.get_cache_key(state), generate, TerraformOutput, has_components)
+    
+    
+    async def ainvoke_fallback(self, state: InfraGenieState) -> TerraformOutput:
+        structured_chain, input_dict = self.get_fallback_chain(state)
+        
+        async def agenerate():
+            parser = FallbackOutputParser()
+            async for chunk in structured_chain.astream(input_dict):
+                parser.feed(get_chunk_text(chunk))
+            return TerraformOutput(**parser.close())
+        
+        if not self.response_cache:
+            return await agenerate()
+        return await self.response_cache.aget_or_invoke(self.get_cache_key(state), agenerate, TerraformOutput, has_components)
+    
+    
+    def get_cache_key(self, state: InfraGenieState) -> str:
+        """The fallback prompt has no feedback, its responses only depend on the user input"""
+        return self.response_cache.make_key("fallback", self.llm, self.get_fallback_code_prompt(), state.user_input)
+    
+    
+    def get_fallback_chain(self, state: InfraGenieState):
+        """
+        Builds the plain text generation chain and its input for the current state.
+        """
+        prompt_template = self.get_fallback_code_prompt()
+        logger.debug(f"Prompt Template: {prompt_template}")
+        
+        structured_prompt = PromptTemplate.from_template(prompt_template)
+        logger.debug(f"""Structured Prompt: {structured_prompt.to_json()}""")
+        
+        input_dict = state.user_input.model_dump()
+        logger.debug(f"User Input: {input_dict}")
+
+        structured_chain = structured_prompt | self.llm
+        
+        return structured_chain, input_dict
+    
+    
+    def parse_fallback_output(self, content: str) -> TerraformOutput:
+        """
+        Extracts the environment and module files from the headered LLM response.
+        """
+        parser = FallbackOutputParser()
+        parser.feed(content)
+        return TerraformOutput(**parser.close())
+    
 
     def get_fallback_code_prompt(self) -> str:
         terraform_prompt = """
@@ -0,0 +1,165 @@
+from src.infra_genie.state.infra_genie_state import FixCandidate, InfraGenieState
+from src.infra_genie.nodes.code_process_node import ProcessCodeNode
+from src.infra_genie.utils.token_usage import get_token_usage
+from langchain_core.runnables import RunnableConfig
+from typing import List, Optional
+from loguru import logger
+import asyncio
+import json
+import time
+
+
+class FixLoopController:
+    """
+        Bounds the validate -> fix cycle of automatic runs. Every validation records its
+        error set; the loop stops when the code is valid, a budget (validations, seconds,
+        tokens) is spent or the errors stop shrinking. A stopped loop leaves the least
+        broken code so far in the state and the workspace.
+    """
+
+    def __init__(self, process_code_node: ProcessCodeNode, max_iterations=3, max_seconds=0, max_tokens=0, patience=2):
+        self.process_code_node = process_code_node
+        self.max_iterations = max_iterations
+        # 0 disables the time and token budgets
+        self.max_seconds = max_seconds
+        self.max_tokens = max_tokens
+        # Validations without a new best error count before the loop counts as stalled
+        self.patience = patience
+
+
+    def check_fix_loop(self, state: InfraGenieState, config: RunnableConfig):
+        """
+            Records the validation result and decides whether the loop goes on
+        """
+        if self.record_validation(state, config):
+            return state
+
+        if state.fix_loop_stop_reason and self.restore_best_candidate(state):
+            self.process_code_node.save_terraform_files(state, config)
+        return state
+
+
+    async def acheck_fix_loop(self, state: InfraGenieState, config: RunnableConfig):
+        """Async version of check_fix_loop, the restored code is written off the event loop"""
+        if self.record_validation(state, config):
+            return state
+
+        if state.fix_loop_stop_reason and self.restore_best_candidate(state):
+            await asyncio.to_thread(self.process_code_node.save_terraform_files, state, config)
+        return state
+
+
+    def record_validation(self, state: InfraGenieState, config: RunnableConfig) -> bool:
+        """
+            Appends the error set to the history, keeps the best candidate and sets the
+            stop reason when the loop should end. Returns True when the code is valid.
+        """
+        state.fix_loop_stop_reason = None
+        if state.is_code_valid:
+            return True
+
+        errors = self.get_error_signatures(state)
+        state.error_history.append(errors)
+
+        if state.best_candidate is None or len(errors) < state.best_candidate.error_count:
+            state.best_candidate = FixCandidate(
+                iteration=state.validation_iterations,
+                error_count=len(errors),
+                environments=state.environments.model_copy(deep=True),
+                modules=state.modules.model_copy(deep=True),
+                code_validation_feedback=state.code_validation_feedback,
+                failed_components=dict(state.failed_components),
+                failed_component_error_counts=dict(state.failed_component_error_counts),
+            )
+
+        state.fix_loop_stop_reason = self.get_stop_reason(state, config)
+        logger.info(
+            f"Fix loop: validation {state.validation_iterations} has {len(errors)} errors, "
+            f"best {state.best_candidate.error_count}, stop: {state.fix_loop_stop_reason}"
+        )
+        return False
+
+
+    def get_error_signatures(self, state: InfraGenieState) -> List[str]:
+        """
+            Returns the sorted error set of the last validation. Line numbers are left out,
+            they move with every fix while the error stays the same.
+        """
+        signatures = set()
+        try:
+            diagnostics = json.loads(state.code_validation_json or "{}").get("diagnostics", [])
+        except json.JSONDecodeError:
+            diagnostics = []
+
+        for diagnostic in diagnostics:
+            if diagnostic.get("severity", "error") != "error":
+                continue
+            filename = diagnostic.get("range", {}).get("filename", "")
+            detail = (diagnostic.get("detail") or "").split("\n")[0]
+            signatures.add(f"{filename}: {diagnostic.get('summary', 'Unknown error')}: {detail}".strip(": "))
+
+        # Init failures and unparsable output only come as feedback
+        if not signatures:
+            signatures.add(state.code_validation_feedback or "Terraform validation failed")
+
+        return sorted(signatures)
+
+
+    def get_stop_reason(self, state: InfraGenieState, config: RunnableConfig) -> Optional[str]:
+        """
+            Returns why the loop stops, None to keep fixing
+        """
+        if state.validation_iterations >= self.max_iterations:
+            return "max_iterations"
+
+        if self.max_seconds and state.fix_loop_started_at and time.time() - state.fix_loop_started_at >= self.max_seconds:
+            return "time_budget"
+
+        token_usage = get_token_usage(config)
+        if self.max_tokens and token_usage and token_usage.total_tokens >= self.max_tokens:
+            return "token_budget"
+
+        errors, previous = state.error_history[-1], state.error_history[:-1]
+        if previous and errors == previous[-1]:
+            return "no_progress"
+        if errors in previous:
+            return "oscillating"
+
+        if state.validation_iterations - state.best_candidate.iteration >= self.patience:
+            return "stalled"
+
+        return None
+
+
+    def restore_best_candidate(self, state: InfraGenieState) -> bool:
+        """
+            Puts the least broken code back when a later fix made things worse,
+            returns True when the code changed
+        """
+        best = state.best_candidate
+        if best is None or best.error_count >= len(state.error_history[-1]):
+            return False
+
+        logger.warning(
+            f"Fix loop stopped ({state.fix_loop_stop_reason}), restoring the code of validation "
+            f"{best.iteration} with {best.error_count} errors"
+        )
+        state.environments = best.environments.model_copy(deep=True)
+        state.modules = best.modules.model_copy(deep=True)
+        state.code_validation_feedback = best.code_validation_feedback
+        state.failed_components = dict(best.failed_components)
+        state.failed_component_error_counts = dict(best.failed_component_error_counts)
+        return True
+
+
+    def fix_loop_router(self, state: InfraGenieState):
+        """
+            Validation router of the automatic graph
+        """
+        if state.is_code_valid:
+            return "approved"
+
+        if state.fix_loop_stop_reason:
+            return "stop"
+
+        return "feedback"
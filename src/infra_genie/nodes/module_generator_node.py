@@ -0,0 +1,344 @@
+from loguru import logger
+from langgraph.types import Send
+from src.infra_genie.state.infra_genie_state import InfraGenieState, TerraformComponent
+from langchain_core.prompts import PromptTemplate
+from src.infra_genie.utils import constants as const
+
+
+class ModuleGeneratorNode:
+    """
+        Generates Terraform one module at a time.
+        The networking module is generated first, the remaining modules are fanned out
+        in parallel with the networking interface as context, and the environment is
+        assembled last from the module interfaces.
+    """
+
+    def __init__(self, llm):
+        self.llm = llm
+
+
+    def plan_modules(self, state: InfraGenieState):
+        """
+            Decides which modules need to be generated for the user input
+        """
+        if not state.user_input:
+            raise ValueError("User input is required to generate Terraform code")
+
+        user_input = state.user_input
+        plan = [const.NETWORKING_MODULE]
+
+        for service in user_input.services:
+            name = service.strip().lower().replace(" ", "_")
+            if name in ("vpc", "networking"):
+                continue
+            if name not in plan:
+                plan.append(name)
+
+        if user_input.database_type and "rds" not in plan and user_input.database_type != "dynamodb":
+            plan.append("rds")
+
+        if user_input.load_balancer_type == "ALB" and "alb" not in plan:
+            plan.append("alb")
+
+        logger.info(f"Planned modules: {plan}")
+
+        # Reset the components of any previous generation round
+        return {"module_plan": plan, "generated_modules": None, "code_generated": False}
+
+
+    def generate_networking_module(self, state: InfraGenieState):
+        """
+            Generates the networking module every other module depends on
+        """
+        component = self._generate_module(state, const.NETWORKING_MODULE, networking=None)
+        return {"generated_modules": [component] if component else []}
+
+
+    async def agenerate_networking_module(self, state: InfraGenieState):
+        """
+            Async version of generate_networking_module
+        """
+        component = await self._agenerate_module(state, const.NETWORKING_MODULE, networking=None)
+        return {"generated_modules": [component] if component else []}
+
+
+    def dispatch_modules(self, state: InfraGenieState):
+        """
+            Fans out the remaining modules so they are generated concurrently
+        """
+        remaining = [name for name in state.module_plan if name != const.NETWORKING_MODULE]
+
+        if not remaining or not self._get_networking(state):
+            return "assemble_environment"
+
+        return [
+            Send("generate_module", state.model_copy(update={"current_module": name}))
+            for name in remaining
+        ]
+
+
+    def generate_module(self, state: InfraGenieState):
+        """
+            Generates a single module, runs in parallel with the other modules
+        """
+        component = self._generate_module(state, state.current_module, networking=self._get_networking(state))
+        return {"generated_modules": [component] if component else []}
+
+
+    async def agenerate_module(self, state: InfraGenieState):
+        """
+            Async version of generate_module
+        """
+        component = await self._agenerate_module(state, state.current_module, networking=self._get_networking(state))
+        return {"generated_modules": [component] if component else []}
+
+
+    def assemble_environment(self, state: InfraGenieState):
+        """
+            Generates the dev environment wiring all the generated modules together
+        """
+        modules = self._get_planned_modules(state)
+        if modules is None:
+            return state
+
+        try:
+            chain, input_dict = self._get_environment_chain(state, modules)
+            environment = chain.invoke(input_dict)
+            self._apply_environment(state, modules, environment)
+
+        except Exception as e:
+            print(f"Environment assembly failed: {e}")
+            state.code_generated = False
+            state.next_node = const.FALLBACK_GENERATION
+
+        return state
+
+
+    async def aassemble_environment(self, state: InfraGenieState):
+        """
+            Async version of assemble_environment
+        """
+        modules = self._get_planned_modules(state)
+        if modules is None:
+            return state
+
+        try:
+            chain, input_dict = self._get_environment_chain(state, modules)
+            environment = await chain.ainvoke(input_dict)
+            self._apply_environment(state, modules, environment)
+
+        except Exception as e:
+            print(f"Environment assembly failed: {e}")
+            state.code_generated = False
+            state.next_node = const.FALLBACK_GENERATION
+
+        return state
+
+
+    def _get_planned_modules(self, state: InfraGenieState):
+        """
+            Returns the generated modules in plan order, None when networking is missing
+        """
+        generated = {component.name: component for component in state.generated_modules}
+        modules = [generated[name] for name in state.module_plan if name in generated]
+
+        missing = [name for name in state.module_plan if name not in generated]
+        if missing:
+            logger.warning(f"Modules failed to generate and are left out: {missing}")
+
+        if const.NETWORKING_MODULE not in generated:
+            print("Networking module generation failed, switching to fallback generation")
+            state.code_generated = False
+            state.next_node = const.FALLBACK_GENERATION
+            return None
+
+        return modules
+
+
+    def _get_environment_chain(self, state: InfraGenieState, modules):
+        prompt = PromptTemplate.from_template(self.get_environment_prompt())
+        chain = prompt | self.llm.with_structured_output(TerraformComponent)
+
+        input_dict = state.user_input.model_dump()
+        input_dict["module_interfaces"] = "\n\n".join(self._format_interface(module) for module in modules)
+        input_dict["feedback"] = self._get_feedback(state)
+
+        return chain, input_dict
+
+
+    def _apply_environment(self, state: InfraGenieState, modules, environment: TerraformComponent):
+        environment.name = "dev"
+
+        state.modules.modules = modules
+        state.environments.environments = [environment]
+
+        print(f"Successfully generated {len(state.environments.environments)} environments and {len(state.modules.modules)} modules using parallel generation")
+        state.code_generated = True
+        state.next_node = const.CODE_VALIDATION
+
+
+    def _get_module_chain(self, state: InfraGenieState, module_name: str, networking: TerraformComponent = None):
+        prompt = PromptTemplate.from_template(self.get_module_prompt())
+        chain = prompt | self.llm.with_structured_output(TerraformComponent)
+
+        input_dict = state.user_input.model_dump()
+        input_dict["module_name"] = module_name
+        input_dict["networking_interface"] = self._format_interface(networking) if networking else "None (this is the networking module)"
+        input_dict["existing_code"] = self._get_existing_code(state, module_name)
+        input_dict["feedback"] = self._get_feedback(state)
+
+        return chain, input_dict
+
+
+    def _generate_module(self, state: InfraGenieState, module_name: str, networking: TerraformComponent = None):
+        """
+            Generates one module, returns None on failure so other modules are unaffected
+        """
+        try:
+            logger.info(f"Generating module: {module_name}")
+
+            chain, input_dict = self._get_module_chain(state, module_name, networking)
+            component = chain.invoke(input_dict)
+            component.name = module_name
+
+            logger.success(f"Generated module: {module_name}")
+            return component
+
+        except Exception as e:
+            logger.error(f"Generation of module '{module_name}' failed: {e}")
+            return None
+
+
+    async def _agenerate_module(self, state: InfraGenieState, module_name: str, networking: TerraformComponent = None):
+        """
+            Async version of _generate_module
+        """
+        try:
+            logger.info(f"Generating module: {module_name}")
+
+            chain, input_dict = self._get_module_chain(state, module_name, networking)
+            component = await chain.ainvoke(input_dict)
+            component.name = module_name
+
+            logger.success(f"Generated module: {module_name}")
+            return component
+
+        except Exception as e:
+            logger.error(f"Generation of module '{module_name}' failed: {e}")
+            return None
+
+
+    def _get_networking(self, state: InfraGenieState):
+        for component in state.generated_modules:
+            if component.name == const.NETWORKING_MODULE:
+                return component
+        return None
+
+
+    def _format_interface(self, component: TerraformComponent) -> str:
+        return f"""
+        # MODULE: {component.name} - variables.tf
+        {component.variables_tf}
+
+        # MODULE: {component.name} - output.tf
+        {component.output_tf}
+        """
+
+
+    def _get_existing_code(self, state: InfraGenieState, module_name: str) -> str:
+        for module in state.modules.modules:
+            if module.name == module_name:
+                return f"""
+                # main.tf
+                {module.main_tf}
+
+                # variables.tf
+                {module.variables_tf}
+
+                # output.tf
+                {module.output_tf}
+                """
+        return "None"
+
+
+    def _get_feedback(self, state: InfraGenieState) -> str:
+        feedback = [
+            text for text in (state.code_validation_feedback, state.code_validation_user_feedback)
+            if text and not state.is_code_valid
+        ]
+        return "\n\n".join(feedback) if feedback else "None"
+
+
+    def get_module_prompt(self) -> str:
+        return """
+        **Objective:** Generate ONE production-grade, VALIDATION-COMPLIANT Terraform module (in HCL, not JSON) named "{module_name}" for an AWS dev environment.
+
+        USER REQUIREMENTS:
+        {requirements}
+
+        INFRASTRUCTURE SPECIFICATIONS:
+        - AWS Services: {services}
+        - AWS Region: {region}
+        - VPC CIDR: {vpc_cidr}
+        - Subnet Configuration: {subnet_configuration}
+        - Availability Zones: {availability_zones}
+        - Compute Type: {compute_type}
+        - Database Type: {database_type}
+        - Multi-AZ Deployment: {is_multi_az}
+        - Serverless Architecture: {is_serverless}
+        - Load Balancer Type: {load_balancer_type}
+        - Logging Enabled: {enable_logging}
+        - Monitoring Enabled: {enable_monitoring}
+        - WAF Enabled: {enable_waf}
+        - Resource Tags: {tags}
+        - Custom Parameters: {custom_parameters}
+
+        NETWORKING MODULE INTERFACE (consume these outputs through input variables, never re-create networking resources):
+        {networking_interface}
+
+        EXISTING CODE FOR THIS MODULE:
+        {existing_code}
+
+        VALIDATION FEEDBACK TO ADDRESS:
+        {feedback}
+
+        RULES:
+        - Return the module name as "{module_name}"
+        - main.tf holds the resources of this module only
+        - variables.tf declares EVERY variable used in main.tf with types and descriptions
+        - output.tf exposes every attribute other modules or the environment may need
+        - Use ONLY arguments supported by the AWS provider (~> 5.0)
+        - Ensure all subnet CIDRs are valid and within the VPC CIDR range
+        - Do not include markdown code fences in the file contents
+        """
+
+
+    def get_environment_prompt(self) -> str:
+        return """
+        **Objective:** Generate the Terraform dev environment (in HCL, not JSON) that wires together the modules below.
+
+        USER REQUIREMENTS:
+        {requirements}
+
+        INFRASTRUCTURE SPECIFICATIONS:
+        - AWS Region: {region}
+        - VPC CIDR: {vpc_cidr}
+        - Subnet Configuration: {subnet_configuration}
+        - Availability Zones: {availability_zones}
+        - Resource Tags: {tags}
+
+        MODULE INTERFACES:
+        {module_interfaces}
+
+        VALIDATION FEEDBACK TO ADDRESS:
+        {feedback}
+
+        RULES:
+        - Return the environment name as "dev"
+        - main.tf contains the terraform block (required_version >= 1.5.0, hashicorp/aws ~> 5.0), the aws provider with region and default_tags, and one module block per module above
+        - Module sources use the path "../../modules/<module name>"
+        - Pass ONLY arguments declared in each module's variables.tf, wiring module outputs with module.<name>.<output>
+        - variables.tf declares every variable used in main.tf
+        - output.tf exposes the key outputs of the modules
+        - Do not include markdown code fences in the file contents
+        """
@@ -1,5 +1,6 @@
 from src.infra_genie.state.infra_genie_state import InfraGenieState
 from src.infra_genie.utils import constants as const
+import time
 
 class ProjectNode:
     
@@ -19,4 +20,11 @@ class ProjectNode:
             Gets the requirements from the user
         """
         state.next_node = const.GENERATE_CODE
+        # New requirements start a new fix-loop budget
+        state.validation_iterations = 0
+        state.fix_loop_started_at = time.time()
+        state.error_history = []
+        state.best_candidate = None
+        state.syntax_errors = {}
+        state.fix_loop_stop_reason = None
         return state
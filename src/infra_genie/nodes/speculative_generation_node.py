@@ -0,0 +1,83 @@
+import asyncio
+from loguru import logger
+from src.infra_genie.state.infra_genie_state import InfraGenieState, TerraformOutput
+from src.infra_genie.utils import constants as const
+from src.infra_genie.utils.event_loop import run_sync
+
+
+class SpeculativeGenerationNode:
+    """
+        Races the structured output and the fallback generation concurrently,
+        keeps the first result that parses into a non-empty TerraformOutput
+        and cancels the other one.
+    """
+
+    def __init__(self, code_generation_node, fallback_node):
+        self.code_generation_node = code_generation_node
+        self.fallback_node = fallback_node
+
+
+    def generate_terraform_code(self, state: InfraGenieState):
+        """
+            Runs the async race on the background event loop, so the losing
+            request is cancelled rather than left running in a thread
+        """
+        return run_sync(self.agenerate_terraform_code(state))
+
+
+    async def agenerate_terraform_code(self, state: InfraGenieState):
+        """
+            Both strategies run as tasks, the losing request is cancelled
+        """
+        if not state.user_input:
+            raise ValueError("User input is required to generate Terraform code")
+
+        print("Racing structured and fallback approaches...")
+
+        pending = {
+            asyncio.create_task(self.code_generation_node.ainvoke_structured(state)): "structured",
+            asyncio.create_task(self.fallback_node.ainvoke_fallback(state)): "fallback",
+        }
+        winner = None
+
+        try:
+            while pending and not winner:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = pending.pop(task)
+                    winner = self._accept(name, task.exception() or task.result())
+                    if winner:
+                        break
+        finally:
+            for task in pending:
+                task.cancel()
+
+        return self._apply_winner(state, winner)
+
+
+    def _accept(self, name: str, result):
+        """
+            Returns (name, result) when the result is usable, None otherwise
+        """
+        if isinstance(result, BaseException):
+            logger.warning(f"Speculative {name} generation failed: {result}")
+            return None
+
+        if isinstance(result, TerraformOutput) and (result.environments or result.modules):
+            logger.info(f"Speculative {name} generation finished first")
+            return name, result
+
+        logger.warning(f"Speculative {name} generation returned an empty result")
+        return None
+
+
+    def _apply_winner(self, state: InfraGenieState, winner):
+        if not winner:
+            print("Both structured and fallback approaches failed")
+            state.code_generated = False
+            state.next_node = const.ERROR
+            return state
+
+        _, result = winner
+        self.code_generation_node.apply_result(state, result)
+        return state
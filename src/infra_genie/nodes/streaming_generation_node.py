@@ -0,0 +1,194 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import merge_configs
+from loguru import logger
+from src.infra_genie.cache.response_cache import has_components
+from src.infra_genie.state.infra_genie_state import InfraGenieState, TerraformComponent, TerraformOutput
+from src.infra_genie.utils import constants as const
+from src.infra_genie.utils.code_stream import ComponentStreamParser, get_chunk_text
+from src.infra_genie.utils.workspace import get_task_id, get_workspace
+
+
+class ComponentStreamHandler(BaseCallbackHandler):
+    """
+        Feeds the streamed tokens of the generation into a ComponentStreamParser and calls
+        on_component(root, component) for every environment and module as soon as it is
+        complete. Chat models only report tokens when the chain is streamed.
+    """
+
+    # Tokens must reach the parser in order, also under async runs
+    run_inline = True
+
+    def __init__(self, on_component):
+        super().__init__()
+        self.on_component = on_component
+        self._lock = threading.Lock()
+        # A stream that fails over starts a new call, the first complete component wins
+        self.parsers = {}
+        self.emitted = set()
+
+    def on_llm_new_token(self, token: str, *, chunk=None, run_id=None, **kwargs) -> None:
+        message = getattr(chunk, "message", None)
+        text = get_chunk_text(message) if message is not None else token
+
+        with self._lock:
+            parser = self.parsers.setdefault(run_id, ComponentStreamParser())
+            completed = []
+            for root, component in parser.feed(text):
+                if (root, component["name"]) not in self.emitted:
+                    self.emitted.add((root, component["name"]))
+                    completed.append((root, component))
+
+        for root, component in completed:
+            self.on_component(root, TerraformComponent.model_validate(component))
+
+
+class StreamingGenerationNode:
+    """
+        Structured generation that writes every environment and module to the workspace
+        as soon as it is streamed, and checks the syntax of each module with terraform fmt
+        while the later ones are still being generated. Syntax errors are handed to the
+        next validation, which then skips terraform init.
+    """
+
+    def __init__(self, code_generation_node, process_code_node, code_validator_node, max_workers: int = 4):
+        self.code_generation_node = code_generation_node
+        self.process_code_node = process_code_node
+        self.code_validator_node = code_validator_node
+        self.max_workers = max_workers
+
+
+    def generate_terraform_code(self, state: InfraGenieState, config: RunnableConfig):
+        if not state.user_input:
+            raise ValueError("User input is required to generate Terraform code")
+
+        print("Trying streaming structured code approach...")
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="streaming")
+        futures = {}
+        try:
+            handler = self.get_stream_handler(executor, futures, config)
+            result = self.invoke_streaming(state, merge_configs(config, {"callbacks": [handler]}))
+            wait(list(futures.values()))
+            self.apply_result(state, result, futures)
+        except Exception as e:
+            print(f"Streaming structured output approach failed: {e}")
+            state.code_generated = False
+            state.next_node = const.FALLBACK_GENERATION
+        finally:
+            executor.shutdown(wait=True)
+
+        return state
+
+
+    async def agenerate_terraform_code(self, state: InfraGenieState, config: RunnableConfig):
+        """Async version, the files are written and checked on worker threads"""
+        if not state.user_input:
+            raise ValueError("User input is required to generate Terraform code")
+
+        print("Trying streaming structured code approach...")
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="streaming")
+        futures = {}
+        try:
+            handler = self.get_stream_handler(executor, futures, config)
+            result = await self.ainvoke_streaming(state, merge_configs(config, {"callbacks": [handler]}))
+            await asyncio.to_thread(wait, list(futures.values()))
+            self.apply_result(state, result, futures)
+        except Exception as e:
+            print(f"Streaming structured output approach failed: {e}")
+            state.code_generated = False
+            state.next_node = const.FALLBACK_GENERATION
+        finally:
+            executor.shutdown(wait=False)
+
+        return state
+
+
+    ## ------- Generation ------- ##
+    @staticmethod
+    def stream_chain(structured_chain, input_dict: dict, config: RunnableConfig) -> TerraformOutput:
+        """Streams the chain, its last chunk is the complete structured output"""
+        result = None
+        for chunk in structured_chain.stream(input_dict, config):
+            result = chunk
+        if not isinstance(result, TerraformOutput):
+            raise ValueError("The streamed generation did not end with a complete TerraformOutput")
+        return result
+
+
+    @staticmethod
+    async def astream_chain(structured_chain, input_dict: dict, config: RunnableConfig) -> TerraformOutput:
+        result = None
+        async for chunk in structured_chain.astream(input_dict, config):
+            result = chunk
+        if not isinstance(result, TerraformOutput):
+            raise ValueError("The streamed generation did not end with a complete TerraformOutput")
+        return result
+
+
+    def invoke_streaming(self, state: InfraGenieState, config: RunnableConfig) -> TerraformOutput:
+        structured_chain, input_dict = self.code_generation_node.get_structured_chain(state)
+
+        cache_key = self.code_generation_node.get_cache_key(state)
+        if not cache_key:
+            return self.stream_chain(structured_chain, input_dict, config)
+        response_cache = self.code_generation_node.response_cache
+        return response_cache.get_or_invoke(cache_key, lambda: self.stream_chain(structured_chain, input_dict, config), TerraformOutput, has_components)
+
+
+    async def ainvoke_streaming(self, state: InfraGenieState, config: RunnableConfig) -> TerraformOutput:
+        structured_chain, input_dict = self.code_generation_node.get_structured_chain(state)
+
+        cache_key = self.code_generation_node.get_cache_key(state)
+        if not cache_key:
+            return await self.astream_chain(structured_chain, input_dict, config)
+        response_cache = self.code_generation_node.response_cache
+        return await response_cache.aget_or_invoke(cache_key, lambda: self.astream_chain(structured_chain, input_dict, config), TerraformOutput, has_components)
+
+
+    def get_stream_handler(self, executor: ThreadPoolExecutor, futures: dict, config: RunnableConfig) -> ComponentStreamHandler:
+        """Every completed component is written, and checked if it is a module, on the executor"""
+        base_dir = str(get_workspace(get_task_id(config)))
+
+        def on_component(root: str, component: TerraformComponent):
+            logger.info(f"Streamed {root}/{component.name}, writing it while the generation goes on")
+            futures[f"{root}/{component.name}"] = executor.submit(self.save_and_check, base_dir, root, component, config)
+
+        return ComponentStreamHandler(on_component)
+
+
+    def save_and_check(self, base_dir: str, root: str, component: TerraformComponent, config: RunnableConfig):
+        """
+            Writes the component, returns (component, syntax errors). Environments are only
+            checked by terraform validate since they reference the modules.
+        """
+        component_dir = self.process_code_node.write_component(base_dir, root, component)
+        if root != "modules":
+            return component, None
+        return component, self.code_validator_node.check_syntax(component_dir, config)
+
+
+    def apply_result(self, state: InfraGenieState, result: TerraformOutput, futures: dict):
+        """
+            The final result is authoritative. Syntax errors are kept for the components
+            that were streamed exactly as they ended up in the result.
+        """
+        self.code_generation_node.apply_result(state, result)
+
+        final = {f"environments/{env.name}": env for env in result.environments}
+        final.update({f"modules/{module.name}": module for module in result.modules})
+
+        state.syntax_errors = {}
+        for key, future in futures.items():
+            if future.exception():
+                logger.warning(f"Streamed {key} could not be written: {future.exception()}")
+                continue
+            component, errors = future.result()
+            if errors and final.get(key) == component:
+                state.syntax_errors[key] = errors
+
+        logger.info(f"Streamed {len(futures)} of {len(final)} components before the generation finished")
+        if state.syntax_errors:
+            logger.warning(f"Syntax errors in {list(state.syntax_errors)}")
@@ -3,7 +3,7 @@ from typing import Any, Dict, Literal, Optional
 import json
 import src.infra_genie.utils.constants as const
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Union, Literal
+from typing import Annotated, List, Dict, Optional, Union, Literal
 from pydantic import BaseModel, Field, field_validator
 
     
@@ -17,6 +17,36 @@ class TerraformComponent(BaseModel):
     output_tf: str = Field(..., description="The output.tf file content.")
     variables_tf: str = Field(..., description="The variables.tf file content.")
     
+def merge_components(existing: Optional[List[TerraformComponent]], new: Optional[List[TerraformComponent]]):
+    """
+        Reducer for components generated in parallel branches.
+        Components are replaced by name and an explicit None resets the list.
+    """
+    if new is None:
+        return []
+    
+    merged = {}
+    for component in (existing or []) + new:
+        component = TerraformComponent.model_validate(component)
+        merged[component.name] = component
+    return list(merged.values())
+
+
+def merge_usage_metrics(existing: Optional[Dict[str, Dict[str, Dict[str, float]]]], new: Optional[Dict[str, Dict[str, Dict[str, float]]]]):
+    """
+        Reducer for the usage metrics {handler id: {node: {metric: value}}}. Handlers report
+        cumulative figures, so the largest value wins: merging the same report twice, or
+        reports of parallel branches in any order, gives the same result.
+    """
+    merged = {handler: {node: dict(metrics) for node, metrics in nodes.items()} for handler, nodes in (existing or {}).items()}
+    for handler, nodes in (new or {}).items():
+        for node, metrics in nodes.items():
+            saved = merged.setdefault(handler, {}).setdefault(node, {})
+            for metric, value in metrics.items():
+                saved[metric] = max(saved.get(metric, 0), value)
+    return merged
+
+    
 class EnvironmentList(BaseModel):
     environments: List[TerraformComponent] = []
 
@@ -29,6 +59,17 @@ class TerraformOutput(BaseModel):
     modules: List[TerraformComponent]
 
 
+class FixCandidate(BaseModel):
+    """Code of one fix-loop iteration with its validation result"""
+    iteration: int
+    error_count: int
+    environments: EnvironmentList
+    modules: ModuleList
+    code_validation_feedback: Optional[str] = None
+    failed_components: Dict[str, str] = Field(default_factory=dict)
+    failed_component_error_counts: Dict[str, int] = Field(default_factory=dict)
+
+
 class UserInput(BaseModel):
     """User input for the Terraform code generation"""
     
@@ -134,6 +175,21 @@ class InfraGenieState(BaseModel):
     
     code_validation_json: Optional[str] = None
     code_validation_feedback: Optional[str] = None
+    # Number of terraform validations run in this session
+    validation_iterations: int = 0
+    
+    # Validation errors per owning component, e.g. {"modules/ec2": "..."}
+    failed_components: Dict[str, str] = Field(default_factory=dict)
+    # Number of diagnostics behind each failed component, a syntax error counts as one
+    failed_component_error_counts: Dict[str, int] = Field(default_factory=dict)
+    # terraform fmt errors per component found while streaming, consumed by the next validation
+    syntax_errors: Dict[str, str] = Field(default_factory=dict)
+    
+    # Fix loop of automatic runs: error set per validation, the least broken code so far
+    fix_loop_started_at: Optional[float] = None
+    error_history: List[List[str]] = Field(default_factory=list)
+    best_candidate: Optional[FixCandidate] = None
+    fix_loop_stop_reason: Optional[str] = None
     
     code_validation_user_feedback: Optional[str] = None
     code_review_status: Optional[str] = None
@@ -143,6 +199,15 @@ class InfraGenieState(BaseModel):
     is_plan_success: bool = False
     plan_error: Optional[str] = None
     
+    # Parallel (per-module) generation
+    module_plan: List[str] = Field(default_factory=list)
+    current_module: Optional[str] = None
+    generated_modules: Annotated[List[TerraformComponent], merge_components] = Field(default_factory=list)
+    
+    # Tokens, latency and cost per node as of each node's exit, by the TokenUsageHandler of each executor
+    # that ran the task (every job gets its own); sum_usage_metrics() totals them
+    usage_metrics: Annotated[Dict[str, Dict[str, Dict[str, float]]], merge_usage_metrics] = Field(default_factory=dict)
+    
     
    
     
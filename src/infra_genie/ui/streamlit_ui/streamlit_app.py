@@ -1,10 +1,7 @@
 import streamlit as st
-from src.infra_genie.LLMS.groqllm import GroqLLM
-from src.infra_genie.LLMS.geminillm import GeminiLLM
-from src.infra_genie.LLMS.openai_llm import OpenAILLM
-from src.infra_genie.LLMS.mistral_llm import MistralLLM
-from src.infra_genie.LLMS.qwen_llm import QwenLLM
-from src.infra_genie.graph.graph_builder import GraphBuilder
+from src.infra_genie.graph.graph_factory import get_graph
+from src.infra_genie.graph.graph_renderer import GraphRenderer
+from src.infra_genie.jobs.job_runner import get_job_queue
 from src.infra_genie.ui.uiconfigfile import Config
 import src.infra_genie.utils.constants as const
 from src.infra_genie.graph.graph_executor import GraphExecutor
@@ -13,11 +10,12 @@ from loguru import logger
 import json
 from pathlib import Path
 from src.infra_genie.state.infra_genie_state import UserInput
+from src.infra_genie.utils.code_stream import split_streamed_code
+from src.infra_genie.utils.artifact_utils import create_zip_from_output_folder, is_artifact
+from src.infra_genie.utils.workspace import get_workspace
 import uuid
+import time
 from pathlib import Path
-import tempfile
-from datetime import datetime
-import zipfile
 
 def initialize_session():
     st.session_state.stage = const.PROJECT_INITILIZATION
@@ -26,6 +24,7 @@ def initialize_session():
     st.session_state.task_id = f"ig-session-{uuid.uuid4().hex[:8]}"
     st.session_state.state = {}
     st.session_state.form_data = {}
+    st.session_state.active_job = None
     # Add current tab index tracking
     if "current_tab_index" not in st.session_state:
         st.session_state.current_tab_index = 0
@@ -41,68 +40,25 @@ def load_sidebar_ui(config: Config):
         # LLM selection
         user_controls["selected_llm"] = st.selectbox("Select LLM", llm_options)
 
-        if user_controls["selected_llm"] == 'Groq':
-            # Model selection
-            model_options = config.get_groq_model_options()
-            user_controls["selected_groq_model"] = st.selectbox("Select Model", model_options)
-            # API key input
-            os.environ["GROQ_API_KEY"] = user_controls["GROQ_API_KEY"] = st.session_state["GROQ_API_KEY"] = st.text_input("API Key",
-                                                                                                    type="password",
-                                                                                                    value=os.getenv("GROQ_API_KEY", ""))
-            # Validate API key
-            if not user_controls["GROQ_API_KEY"]:
-                st.warning("⚠️ Please enter your GROQ API key to proceed. Don't have? refer : https://console.groq.com/keys ")
-                
-        
-        if user_controls["selected_llm"] == 'Mistral':
-            # Model selection
-            model_options = config.get_mistral_model_options()
-            user_controls["selected_mistral_model"] = st.selectbox("Select Model", model_options)
-            # API key input
-            os.environ["MISTRAL_API_KEY"] = user_controls["MISTRAL_API_KEY"] = st.session_state["MISTRAL_API_KEY"] = st.text_input("API Key",
-                                                                                                    type="password",
-                                                                                                    value=os.getenv("MISTRAL_API_KEY", ""))
-            # Validate API key
-            if not user_controls["MISTRAL_API_KEY"]:
-                st.warning("⚠️ Please enter your MISTRAL API key to proceed. Don't have? refer : https://console.mistral.ai/api-keys ")
-                
-        if user_controls["selected_llm"] == 'Gemini':
-            # Model selection
-            model_options = config.get_gemini_model_options()
-            user_controls["selected_gemini_model"] = st.selectbox("Select Model", model_options)
-            # API key input
-            os.environ["GEMINI_API_KEY"] = user_controls["GEMINI_API_KEY"] = st.session_state["GEMINI_API_KEY"] = st.text_input("API Key",
-                                                                                                    type="password",
-                                                                                                    value=os.getenv("GEMINI_API_KEY", "")) 
-            # Validate API key
-            if not user_controls["GEMINI_API_KEY"]:
-                st.warning("⚠️ Please enter your GEMINI API key to proceed. Don't have? refer : https://ai.google.dev/gemini-api/docs/api-key ")
-                
+        provider = user_controls["selected_llm"]
+        provider_settings = config.get_llm_providers()[provider]
+        api_key_name = f"{provider.upper()}_API_KEY"
         
-        if user_controls["selected_llm"] == 'OpenAI':
-            # Model selection
-            model_options = config.get_openai_model_options()
-            user_controls["selected_openai_model"] = st.selectbox("Select Model", model_options)
-            # API key input
-            os.environ["OPENAI_API_KEY"] = user_controls["OPENAI_API_KEY"] = st.session_state["OPENAI_API_KEY"] = st.text_input("API Key",
-                                                                                                    type="password",
-                                                                                                    value=os.getenv("OPENAI_API_KEY", "")) 
-            # Validate API key
-            if not user_controls["OPENAI_API_KEY"]:
-                st.warning("⚠️ Please enter your OPENAI API key to proceed. Don't have? refer : https://platform.openai.com/api-keys ")
-        
-                
-        if user_controls["selected_llm"] == 'Qwen':
-            # Model selection
-            model_options = config.get_qwen_model_options()
-            user_controls["selected_qwen_model"] = st.selectbox("Select Model", model_options)
-            # API key input
-            os.environ["QWEN_API_KEY"] = user_controls["QWEN_API_KEY"] = st.session_state["QWEN_API_KEY"] = st.text_input("API Key",
-                                                                                                    type="password",
-                                                                                                    value=os.getenv("QWEN_API_KEY", ""))
-            # Validate API key
-            if not user_controls["QWEN_API_KEY"]:
-                st.warning("⚠️ Please enter your QWEN API key to proceed. Don't have? refer : https://bailian.console.alibabacloud.com/?tab=playground#/api-key ")
+        # Model selection
+        user_controls[f"selected_{provider.lower()}_model"] = st.selectbox("Select Model", provider_settings["model_options"])
+        # API key input
+        if not provider_settings["api_key_required"]:
+            user_controls[api_key_name] = None
+        else:
+            # Kept in this session only, the jobs of the session get it through the job queue
+            user_controls[api_key_name] = st.session_state[api_key_name] = st.text_input("API Key",
+                                                                                         type="password",
+                                                                                         value=st.session_state.get(api_key_name, ""),
+                                                                                         help=f"Leave empty to use the {provider_settings['api_key_env']} of the server")
+        # Validate API key
+        if provider_settings["api_key_required"] and not user_controls[api_key_name] and not os.getenv(provider_settings["api_key_env"]):
+            help_link = f" Don't have? refer : {provider_settings['api_key_url']} " if provider_settings["api_key_url"] else ""
+            st.warning(f"⚠️ Please enter your {provider.upper()} API key to proceed.{help_link}")
     
         if st.button("Reset Session"):
             for key in list(st.session_state.keys()):
@@ -112,7 +68,11 @@ def load_sidebar_ui(config: Config):
             st.rerun()
             
         st.subheader("Workflow Overview")
-        st.image("workflow_graph.png")
+        renderer = GraphRenderer()
+        if renderer.is_image_current():
+            st.image(renderer.image_path)
+        elif renderer.get_mermaid():
+            st.markdown(f"```mermaid\n{renderer.get_mermaid()}\n```")
             
     return user_controls
 
@@ -290,7 +250,7 @@ def load_user_input_ui():
 
 
 def read_all_generated_code():
-    base_path = Path("output/src")
+    base_path = get_workspace(st.session_state.task_id)
     code_output = {}
 
     for root in ["environments", "modules"]:
@@ -384,41 +344,86 @@ def display_generated_code():
             for filename, content in files.items():
                 with st.expander(f"📄 {filename}"):
                     st.code(content, language="hcl")
-                            
-def create_zip_from_output_folder():
+
+
+def display_streamed_code(runs):
     """
-    Creates a zip file from the output/src folder maintaining the directory structure
-    Returns the path to the created zip file
+    Renders the LLM tokens streamed by a running job as per-file code blocks
     """
-    output_folder = Path("output/src")
-    
-    if not output_folder.exists():
-        return None
-    
-    # Create a temporary file for the zip
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    zip_filename = f"terraform_artifacts_{timestamp}.zip"
-    
-    # Create zip in a temporary directory
-    temp_dir = tempfile.mkdtemp()
-    zip_path = os.path.join(temp_dir, zip_filename)
-    
-    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        # Walk through the output/src directory
-        for root, dirs, files in os.walk(output_folder):
-            for file in files:
-                file_path = os.path.join(root, file)
-                # Create archive path relative to output/src
-                arcname = os.path.relpath(file_path, output_folder)
-                zipf.write(file_path, arcname)
-    
-    return zip_path
+    for (node_name, _), text in runs.items():
+        sections = split_streamed_code(text)
+        if not sections:
+            st.caption(f"⏳ {node_name}: waiting for code...")
+            continue
+        for section, files in sections.items():
+            st.markdown(f"**🗂️ {section}** ({node_name})")
+            for filename, content in files.items():
+                st.caption(f"📄 {filename}")
+                st.code(content, language="hcl")
+
+
+def submit_job(config: Config, user_controls, operation, label, next_stage, next_tab, **params):
+    """
+    Queues a workflow operation; the UI polls it and moves to next_stage/next_tab once it succeeds
+    """
+    provider, model, api_key = get_llm_selection(user_controls)
+    # The API key never goes into the payload, the queue keeps it apart and deletes it once the job finished
+    payload = {
+        "task_id": st.session_state.task_id,
+        "provider": provider,
+        "model": model,
+        "generation_mode": config.get_generation_mode(),
+        **params,
+    }
+    job_id = get_job_queue(config).submit(operation, payload, api_key)
+
+    st.session_state.active_job = {
+        "id": job_id,
+        "label": label,
+        "next_stage": next_stage,
+        "next_tab": next_tab,
+        "from_tab": st.session_state.current_tab_index,
+    }
+    st.session_state.current_tab_index = next_tab
+    st.rerun()
+
+
+def track_active_job(config: Config, graph_executor: GraphExecutor):
+    """
+    Polls the active job, returns True while it is still queued or running
+    """
+    active_job = st.session_state.get("active_job")
+    if not active_job:
+        return False
+
+    job_queue = get_job_queue(config)
+    job = job_queue.get_job(active_job["id"])
+
+    if job and job["status"] in (const.JOB_QUEUED, const.JOB_RUNNING):
+        st.info(f"⏳ {active_job['label']} ({job['status']})...")
+        display_streamed_code(job_queue.get_stream(active_job["id"]))
+        time.sleep(config.get_job_poll_seconds())
+        st.rerun()
+
+    st.session_state.active_job = None
 
+    if not job or job["status"] == const.JOB_FAILED:
+        error = job["error"] if job else "job not found"
+        st.error(f"Error: {active_job['label']} failed - {error}")
+        st.session_state.current_tab_index = active_job["from_tab"]
+        return False
+
+    st.session_state.state = graph_executor.get_state_values(st.session_state.task_id)
+    st.session_state.stage = active_job["next_stage"]
+    st.session_state.current_tab_index = active_job["next_tab"]
+    st.rerun()
+
+                            
 def get_folder_structure_display():
     """
     Returns a string representation of the output folder structure for display
     """
-    output_folder = Path("output/src")
+    output_folder = get_workspace(st.session_state.task_id)
     
     if not output_folder.exists():
         return "No artifacts found"
@@ -426,7 +431,7 @@ def get_folder_structure_display():
     structure = []
     
     def add_to_structure(path, prefix=""):
-        items = sorted(path.iterdir(), key=lambda x: (x.is_file(), x.name))
+        items = sorted((item for item in path.iterdir() if is_artifact(item.name)), key=lambda x: (x.is_file(), x.name))
         for i, item in enumerate(items):
             is_last = i == len(items) - 1
             current_prefix = "└── " if is_last else "├── "
@@ -445,7 +450,7 @@ def get_artifact_summary():
     """
     Returns summary information about the generated artifacts
     """
-    output_folder = Path("output/src")
+    output_folder = get_workspace(st.session_state.task_id)
     
     if not output_folder.exists():
         return {}
@@ -481,18 +486,34 @@ def get_artifact_summary():
     
     # Count total files and size
     for file_path in output_folder.rglob("*"):
-        if file_path.is_file():
+        if file_path.is_file() and is_artifact(file_path.relative_to(output_folder)):
             summary["total_files"] += 1
             summary["total_size"] += file_path.stat().st_size
     
     return summary
     
+@st.cache_resource
+def get_config():
+    return Config()
+
+
+def get_llm_selection(user_controls):
+    """
+        Returns the (provider, model, api_key) selected in the sidebar
+    """
+    provider = user_controls.get("selected_llm")
+    model = user_controls.get(f"selected_{provider.lower()}_model")
+    # An empty key falls back to the server's environment, like no key
+    api_key = user_controls.get(f"{provider.upper()}_API_KEY") or None
+    return provider, model, api_key
+
+
 ## Main Entry Point    
 def load_app():
     """
     Main entry point for the Streamlit app using tab-based UI.
     """
-    config = Config()
+    config = get_config()
     if 'stage' not in st.session_state:
         initialize_session()
 
@@ -502,31 +523,9 @@ def load_app():
         return
 
     try:
-        # Configure LLM 
-        selectedLLM = user_input.get("selected_llm")
-        model = None
-        
-        if selectedLLM == "Gemini":
-            obj_llm_config = GeminiLLM(user_controls_input=user_input)
-        elif selectedLLM == "Mistral":
-            obj_llm_config = MistralLLM(user_controls_input=user_input)
-        elif selectedLLM == "Groq":
-            obj_llm_config = GroqLLM(user_controls_input=user_input)
-        elif selectedLLM == "OpenAI":
-            obj_llm_config = OpenAILLM(user_controls_input=user_input)
-        elif selectedLLM == "Qwen":
-            obj_llm_config = QwenLLM(user_controls_input=user_input)
-            
-        model = obj_llm_config.get_llm_model()
-        
-        if not model:
-            st.error("Error: LLM model could not be initialized.")
-            return
-
-        ## Graph Builder
-        graph_builder = GraphBuilder(model)
+        ## Compiled graphs are reused across reruns and sessions
         try:
-            graph = graph_builder.setup_graph()
+            graph = get_graph(config, *get_llm_selection(user_input))
             graph_executor = GraphExecutor(graph, st.session_state.task_id)
         except Exception as e:
             st.error(f"Error: Graph setup failed - {e}")
@@ -541,6 +540,10 @@ def load_app():
         tab_index = tab_options.index(selected_tab)
         st.session_state.current_tab_index = tab_index
         
+        # Workflow operations run as background jobs, the page polls until they finish
+        if track_active_job(config, graph_executor):
+            return
+        
         # Based on the selected tab/radio button, show the appropriate content
         if tab_index == 0:  # Infra Requirement
             st.header("Infra Requirement")
@@ -555,12 +558,11 @@ def load_app():
                     if not project_name:
                         st.error("Please enter a project name.")
                         st.stop()
-                    graph_response = graph_executor.start_workflow(project_name)
-                    st.session_state.task_id = graph_response["task_id"]
-                    st.session_state.state = graph_response["state"]
                     st.session_state.project_name = project_name
-                    st.session_state.stage = const.REQUIREMENT_COLLECTION
-                    st.rerun()
+                    submit_job(
+                        config, user_input, const.JOB_START_WORKFLOW, "Starting the workflow",
+                        next_stage=const.REQUIREMENT_COLLECTION, next_tab=0, project_name=project_name
+                    )
 
             # If stage has progressed beyond initialization, show requirements input and go to next stage
             if st.session_state.stage in [const.REQUIREMENT_COLLECTION]:
@@ -570,18 +572,16 @@ def load_app():
                 if st.button("Submit Requirements"):
                     logger.info("Submit button clicked")
                     
-                    user_input = UserInput(**st.session_state.form_data)
-                    st.session_state.state["user_input"] = user_input
-                    st.json(user_input)
+                    requirements = UserInput(**st.session_state.form_data)
+                    st.session_state.state["user_input"] = requirements
+                    st.json(requirements)
                     st.success("User requirements submitted successfully!")
                     
-                    graph_response = graph_executor.generate_code(st.session_state.task_id, user_input)
-                    st.session_state.state = graph_response["state"]
-                    
-                    st.session_state.stage = const.GENERATE_CODE
-                    # Change tab to Code Generation (index 1)
-                    st.session_state.current_tab_index = 1
-                    st.rerun()
+                    # Change tab to Code Generation (index 1), the code is streamed there
+                    submit_job(
+                        config, user_input, const.JOB_GENERATE_CODE, "Generating Terraform code",
+                        next_stage=const.GENERATE_CODE, next_tab=1, user_input=requirements.model_dump()
+                    )
         
         # ---------------- Tab 2: Code Generation ----------------
         elif tab_index == 1:  # Code Generation
@@ -604,15 +604,11 @@ def load_app():
                 st.subheader("Actions")
                 if st.button("Proceed to Validation"):
                     st.success("Code Validataion Started.")
-                    graph_response = graph_executor.graph_review_flow(
-                        st.session_state.task_id, status=None, feedback=None, review_type=const.SAVE_CODE
-                    )
-                    st.session_state.state = graph_response["state"]
-                    st.session_state.stage = const.CODE_VALIDATION
-                    
                     # Change tab to Code Validation (index 2)
-                    st.session_state.current_tab_index = 2
-                    st.rerun()
+                    submit_job(
+                        config, user_input, const.JOB_REVIEW, "Validating Terraform code",
+                        next_stage=const.CODE_VALIDATION, next_tab=2, status=None, feedback=None, review_type=const.SAVE_CODE
+                    )
             
             else:
                 st.info("Code generation pending or not reached yet.")
@@ -642,15 +638,11 @@ def load_app():
                 with col1:
                     if st.button("✅ Approve Code"):
                         st.info("Generating Terraform Plan for approved code...")
-                        graph_response = graph_executor.graph_review_flow(
-                            st.session_state.task_id, status="approved", feedback=None,  review_type=const.CODE_VALIDATION
-                        )
-                        st.session_state.state = graph_response["state"]
-                        st.session_state.stage = const.DOWNLOAD_ARTIFACTS
-                       
                         # Change tab to Downaload Artifacts (index 3)
-                        st.session_state.current_tab_index = 3
-                        st.rerun()
+                        submit_job(
+                            config, user_input, const.JOB_REVIEW, "Preparing the artifacts",
+                            next_stage=const.DOWNLOAD_ARTIFACTS, next_tab=3, status="approved", feedback=None, review_type=const.CODE_VALIDATION
+                        )
                         
                         
                 with col2:
@@ -659,14 +651,11 @@ def load_app():
                             st.warning("✍️ Give Feedback. Please enter feedback before submitting.")
                         else:
                             st.info("🔄 Sending feedback to revise code.")
-                            graph_response = graph_executor.graph_review_flow(
-                                st.session_state.task_id, status="feedback", feedback=feedback_text.strip(),review_type=const.CODE_VALIDATION
-                            )
-                            st.session_state.state = graph_response["state"]
-                            st.session_state.stage = const.GENERATE_CODE
                             # Change tab to Code Generation (index 1)
-                            st.session_state.current_tab_index = 1
-                            st.rerun()
+                            submit_job(
+                                config, user_input, const.JOB_REVIEW, "Revising Terraform code",
+                                next_stage=const.GENERATE_CODE, next_tab=1, status="feedback", feedback=feedback_text.strip(), review_type=const.CODE_VALIDATION
+                            )
                 
             else:
                 st.info("Code validation pending or not reached yet.")
@@ -730,7 +719,7 @@ def load_app():
                 logger.info("Download artifacts stage reached.")
                 
                 # Check if artifacts exist
-                output_folder = Path("output/src")
+                output_folder = get_workspace(st.session_state.task_id)
                 if not output_folder.exists() or not any(output_folder.iterdir()):
                     st.warning("⚠️ No artifacts found to download.")
                     st.info("Please generate code first by going through the previous steps.")
@@ -800,7 +789,7 @@ def load_app():
                         # Create download button
                         if st.button("🗜️ Create Download Package", type="primary"):
                             with st.spinner("Creating download package..."):
-                                zip_path = create_zip_from_output_folder()
+                                zip_path = create_zip_from_output_folder(get_workspace(st.session_state.task_id))
                                 
                                 if zip_path:
                                     # Store zip path in session state for download
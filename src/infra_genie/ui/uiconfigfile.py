@@ -5,23 +5,210 @@ class Config:
         self.config=ConfigParser()
         self.config.read(config_file)
 
+    def get_llm_providers(self):
+        """Returns the settings of every [LLM:<name>] section by provider name, in file order"""
+        providers = {}
+        for section_name in self.config.sections():
+            if not section_name.startswith("LLM:"):
+                continue
+            name = section_name.split(":", 1)[1].strip()
+            section = self.config[section_name]
+            providers[name] = {
+                "chat_model_class": section.get("CHAT_MODEL_CLASS"),
+                "model_options": [model.strip() for model in section.get("MODEL_OPTIONS", "").split(",") if model.strip()],
+                "api_key_env": section.get("API_KEY_ENV", f"{name.upper()}_API_KEY"),
+                "shared_http_client": section.getboolean("SHARED_HTTP_CLIENT", fallback=False),
+                "base_url": section.get("BASE_URL"),
+                "api_key_url": section.get("API_KEY_URL"),
+                "requests_per_minute": section.getint("REQUESTS_PER_MINUTE", fallback=0),
+                "tokens_per_minute": section.getint("TOKENS_PER_MINUTE", fallback=0),
+                "max_concurrency": section.getint("MAX_CONCURRENCY", fallback=16),
+                "prompt_cache_key": section.get("PROMPT_CACHE_KEY"),
+                "pricing": self.parse_pricing(section.get("PRICING", "")),
+                "model_kwargs": self.parse_model_kwargs(section.get("MODEL_KWARGS", "")),
+                "api_key_required": section.getboolean("API_KEY_REQUIRED", fallback=True),
+                "record_replay": section.getboolean("RECORD_REPLAY", fallback=True),
+                "model_routes": self.parse_model_routes(section.get("MODEL_ROUTES", "")),
+            }
+        return providers
+
+    def parse_pricing(self, pricing):
+        """Parses "model: input/output, ..." in USD per million tokens into {model: (input, output)}"""
+        prices = {}
+        for item in pricing.split(","):
+            if ":" not in item:
+                continue
+            model, price = item.rsplit(":", 1)
+            input_price, output_price = price.split("/")
+            prices[model.strip()] = (float(input_price), float(output_price))
+        return prices
+
+    def parse_model_kwargs(self, model_kwargs):
+        """Parses "name=value, ..." into the extra keyword arguments of the chat model class"""
+        return dict(item.split("=", 1) for item in (item.strip() for item in model_kwargs.split(",")) if "=" in item)
+
+    def parse_model_routes(self, model_routes):
+        """Parses "task: model, ..." into {task: model}, tasks are generation, fallback, large_fix and trivial_fix"""
+        routes = {}
+        for item in model_routes.split(","):
+            if ":" in item:
+                task, model = item.split(":", 1)
+                routes[task.strip()] = model.strip()
+        return routes
+
+    def get_model_pricing(self):
+        """Returns the pricing of every configured model"""
+        pricing = {}
+        for settings in self.get_llm_providers().values():
+            pricing.update(settings["pricing"])
+        return pricing
+
     def get_llm_options(self):
-        return self.config["DEFAULT"].get("LLM_OPTIONS").split(", ")
+        return list(self.get_llm_providers())
+
+    def get_model_options(self, provider):
+        return self.get_llm_providers().get(provider, {}).get("model_options", [])
 
     def get_groq_model_options(self):
-        return self.config["DEFAULT"].get("GROQ_MODEL_OPTIONS").split(", ")
-    
+        return self.get_model_options("Groq")
+
     def get_mistral_model_options(self):
-        return self.config["DEFAULT"].get("MISTRAL_MODEL_OPTIONS").split(", ")
-    
+        return self.get_model_options("Mistral")
+
     def get_gemini_model_options(self):
-        return self.config["DEFAULT"].get("GEMINI_MODEL_OPTIONS").split(", ")
+        return self.get_model_options("Gemini")
 
     def get_openai_model_options(self):
-        return self.config["DEFAULT"].get("OPENAI_MODEL_OPTIONS").split(", ")
-    
+        return self.get_model_options("OpenAI")
+
     def get_qwen_model_options(self):
-        return self.config["DEFAULT"].get("QWEN_MODEL_OPTIONS").split(", ")
+        return self.get_model_options("Qwen")
+
+    def get_llm_client_settings(self):
+        section = self.config["DEFAULT"]
+        return {
+            "cache_size": section.getint("LLM_CLIENT_CACHE_SIZE", fallback=32),
+            "max_connections": section.getint("HTTP_MAX_CONNECTIONS", fallback=100),
+            "max_keepalive_connections": section.getint("HTTP_KEEPALIVE_CONNECTIONS", fallback=20),
+            "keepalive_expiry": section.getfloat("HTTP_KEEPALIVE_SECONDS", fallback=60),
+        }
 
     def get_page_title(self):
-        return self.config["DEFAULT"].get("PAGE_TITLE")
\ No newline at end of file
+        return self.config["DEFAULT"].get("PAGE_TITLE")
+    
+    def get_generation_mode(self):
+        return self.config["DEFAULT"].get("GENERATION_MODE", "standard")
+    
+    def is_hedge_enabled(self):
+        return self.config["DEFAULT"].getboolean("HEDGE_ENABLED", fallback=False)
+    
+    def get_hedge_alternates(self):
+        """Returns the hedge alternates as (provider, model) tuples"""
+        alternates = self.config["DEFAULT"].get("HEDGE_ALTERNATES", "")
+        return [tuple(item.strip().split(":", 1)) for item in alternates.split(",") if ":" in item]
+    
+    def get_hedge_settings(self):
+        section = self.config["DEFAULT"]
+        return {
+            "hedge_percentile": section.getfloat("HEDGE_PERCENTILE", fallback=95),
+            "default_hedge_delay": section.getfloat("HEDGE_DEFAULT_DELAY_SECONDS", fallback=20),
+            "failure_threshold": section.getint("CIRCUIT_BREAKER_FAILURES", fallback=3),
+            "reset_timeout": section.getfloat("CIRCUIT_BREAKER_RESET_SECONDS", fallback=60),
+        }
+    
+    def get_job_queue_backend(self):
+        return self.config["DEFAULT"].get("JOB_QUEUE", "inprocess")
+    
+    def get_job_workers(self):
+        return self.config["DEFAULT"].getint("JOB_WORKERS", fallback=2)
+    
+    def get_job_poll_seconds(self):
+        return self.config["DEFAULT"].getfloat("JOB_POLL_SECONDS", fallback=1)
+    
+    def get_job_queue_settings(self):
+        section = self.config["DEFAULT"]
+        return {
+            "heartbeat_seconds": section.getfloat("JOB_HEARTBEAT_SECONDS", fallback=10),
+            "stale_seconds": section.getfloat("JOB_STALE_SECONDS", fallback=60),
+            "max_attempts": section.getint("JOB_MAX_ATTEMPTS", fallback=2),
+            "secret_ttl_seconds": section.getint("JOB_SECRET_TTL_SECONDS", fallback=3600),
+        }
+    
+    def get_api_host(self):
+        return self.config["DEFAULT"].get("API_HOST", "0.0.0.0")
+    
+    def get_api_port(self):
+        return self.config["DEFAULT"].getint("API_PORT", fallback=8000)
+    
+    def get_api_workers(self):
+        return self.config["DEFAULT"].getint("API_WORKERS", fallback=4)
+    
+    def get_batch_concurrency(self):
+        return self.config["DEFAULT"].getint("BATCH_CONCURRENCY", fallback=4)
+    
+    def is_rate_limit_enabled(self):
+        return self.config["DEFAULT"].getboolean("RATE_LIMIT_ENABLED", fallback=True)
+
+    def get_rate_limit_settings(self):
+        section = self.config["DEFAULT"]
+        return {
+            "max_retries": section.getint("RATE_LIMIT_MAX_RETRIES", fallback=4),
+            "base_delay": section.getfloat("RATE_LIMIT_BASE_DELAY_SECONDS", fallback=2),
+            "max_delay": section.getfloat("RATE_LIMIT_MAX_DELAY_SECONDS", fallback=60),
+            "estimated_output_tokens": section.getint("ESTIMATED_OUTPUT_TOKENS", fallback=4000),
+        }
+
+    def is_response_cache_enabled(self):
+        return self.config["DEFAULT"].getboolean("RESPONSE_CACHE_ENABLED", fallback=True)
+
+    def get_response_cache_settings(self):
+        section = self.config["DEFAULT"]
+        return {
+            "ttl_seconds": section.getint("RESPONSE_CACHE_TTL_SECONDS", fallback=86400),
+            "max_entries": section.getint("RESPONSE_CACHE_MAX_ENTRIES", fallback=1000),
+            "l1_size": section.getint("RESPONSE_CACHE_L1_SIZE", fallback=128),
+            "l1_ttl_seconds": section.getint("RESPONSE_CACHE_L1_TTL_SECONDS", fallback=300),
+        }
+
+    def get_cassette_settings(self):
+        section = self.config["DEFAULT"]
+        return {
+            "mode": section.get("CASSETTE_MODE", "off"),
+            "directory": section.get("CASSETTE_DIR", "cassettes"),
+            "latency": section.get("CASSETTE_LATENCY", "recorded"),
+            "latency_scale": section.getfloat("CASSETTE_LATENCY_SCALE", fallback=1.0),
+        }
+
+    def is_usage_metrics_enabled(self):
+        return self.config["DEFAULT"].getboolean("USAGE_METRICS_ENABLED", fallback=True)
+
+    def get_usage_metrics_settings(self):
+        return {"ttl_seconds": self.config["DEFAULT"].getint("USAGE_METRICS_TTL_SECONDS", fallback=86400)}
+
+    def is_model_routing_enabled(self):
+        return self.config["DEFAULT"].getboolean("MODEL_ROUTING_ENABLED", fallback=True)
+
+    def get_model_routing_settings(self):
+        section = self.config["DEFAULT"]
+        return {
+            "trivial_fix_max_errors": section.getint("TRIVIAL_FIX_MAX_ERRORS", fallback=2),
+            "trivial_fix_max_lines": section.getint("TRIVIAL_FIX_MAX_LINES", fallback=150),
+        }
+
+    def get_terraform_init_settings(self):
+        section = self.config["DEFAULT"]
+        return {
+            "plugin_cache_dir": section.get("TERRAFORM_PLUGIN_CACHE_DIR") or None,
+            "provider_mirror_dir": section.get("TERRAFORM_PROVIDER_MIRROR_DIR") or None,
+            "cli_config_file": section.get("TERRAFORM_CLI_CONFIG_FILE") or None,
+            "reuse": section.getboolean("TERRAFORM_INIT_REUSE", fallback=True),
+        }
+
+    def get_fix_loop_settings(self):
+        section = self.config["DEFAULT"]
+        return {
+            "max_iterations": section.getint("AUTOMATIC_MAX_ITERATIONS", fallback=3),
+            "max_seconds": section.getfloat("FIX_LOOP_MAX_SECONDS", fallback=0),
+            "max_tokens": section.getint("FIX_LOOP_MAX_TOKENS", fallback=0),
+            "patience": section.getint("FIX_LOOP_PATIENCE", fallback=2),
+        }
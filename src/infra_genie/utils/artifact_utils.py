@@ -0,0 +1,48 @@
+import os
+import tempfile
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+
+# Terraform's working data (provider plugins, installed modules) and plans are not artifacts,
+# the dependency lock file is
+EXCLUDED_ARTIFACTS = {".terraform", "tfplan"}
+
+
+def is_artifact(path) -> bool:
+    """Whether a path relative to the output folder belongs in the artifacts"""
+    return not any(part in EXCLUDED_ARTIFACTS for part in Path(path).parts)
+
+
+def create_zip_from_output_folder(output_folder):
+    """
+    Creates a zip file from the output folder maintaining the directory structure
+    Returns the path to the created zip file
+    """
+    output_folder = Path(output_folder)
+    
+    if not output_folder.exists():
+        return None
+    
+    # Create a temporary file for the zip
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    zip_filename = f"terraform_artifacts_{timestamp}.zip"
+    
+    # Create zip in a temporary directory
+    temp_dir = tempfile.mkdtemp()
+    zip_path = os.path.join(temp_dir, zip_filename)
+    
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        # Walk through the output directory
+        for root, dirs, files in os.walk(output_folder):
+            dirs[:] = [directory for directory in dirs if directory not in EXCLUDED_ARTIFACTS]
+            for file in files:
+                if file in EXCLUDED_ARTIFACTS:
+                    continue
+                file_path = os.path.join(root, file)
+                # Create archive path relative to the output folder
+                arcname = os.path.relpath(file_path, output_folder)
+                zipf.write(file_path, arcname)
+    
+    return zip_path
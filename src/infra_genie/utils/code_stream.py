@@ -0,0 +1,230 @@
+import json
+import re
+from typing import Dict, List, Tuple
+from langchain_core.utils.json import parse_partial_json
+
+FILE_FIELDS = {"main_tf": "main.tf", "variables_tf": "variables.tf", "output_tf": "output.tf"}
+# '# ENV: dev - main.tf', also '## MODULE: api-gateway - outputs.tf' or '# Environment: dev: main.tf'
+HEADER_PATTERN = re.compile(
+    r"^[ \t]*#+[ \t]*(ENV|ENVIRONMENT|MODULE)[ \t]*:[ \t]*([\w-]+?)[ \t]*[-:][ \t]*([\w.-]+\.tf)[ \t]*$",
+    re.MULTILINE | re.IGNORECASE,
+)
+# File name variants of the headers -> TerraformComponent field
+FILE_ALIASES = {
+    "main.tf": "main_tf",
+    "variables.tf": "variables_tf", "variable.tf": "variables_tf", "vars.tf": "variables_tf",
+    "output.tf": "output_tf", "outputs.tf": "output_tf",
+}
+
+
+def get_chunk_text(chunk) -> str:
+    """
+        Returns the streamed text of a message chunk: plain content plus any tool call argument
+        fragments (structured output streams its JSON through tool calls on most providers).
+    """
+    text = ""
+    content = getattr(chunk, "content", "")
+    if isinstance(content, str):
+        text += content
+    elif isinstance(content, list):
+        text += "".join(part.get("text", "") for part in content if isinstance(part, dict))
+
+    for tool_call_chunk in getattr(chunk, "tool_call_chunks", None) or []:
+        text += tool_call_chunk.get("args") or ""
+
+    return text
+
+
+def split_streamed_code(text: str) -> Dict[str, Dict[str, str]]:
+    """
+        Splits partially streamed generation output into {section: {filename: content}}.
+        Understands the structured JSON output (partial JSON is closed before parsing)
+        and the '# ENV: dev - main.tf' headers of the fallback output.
+    """
+    stripped = text.lstrip()
+
+    if stripped.startswith("{") or stripped.startswith("```json"):
+        parsed = parse_partial_json(stripped.removeprefix("```json"))
+        if not isinstance(parsed, dict):
+            return {}
+
+        if "name" in parsed and "environments" not in parsed and "modules" not in parsed:
+            return _component_files("component", parsed)
+
+        sections = {}
+        for root in ("environments", "modules"):
+            for component in parsed.get(root) or []:
+                if isinstance(component, dict):
+                    sections.update(_component_files(root, component))
+        return sections
+
+    sections = {}
+    headers = list(HEADER_PATTERN.finditer(text))
+    for index, header in enumerate(headers):
+        end = headers[index + 1].start() if index + 1 < len(headers) else len(text)
+        root = "modules" if header.group(1).upper() == "MODULE" else "environments"
+        sections.setdefault(f"{root}/{header.group(2)}", {})[header.group(3).lower()] = text[header.end():end].strip()
+    return sections
+
+
+def _component_files(root: str, component: dict) -> Dict[str, Dict[str, str]]:
+    files = {
+        filename: component[field]
+        for field, filename in FILE_FIELDS.items()
+        if isinstance(component.get(field), str)
+    }
+    return {f"{root}/{component.get('name') or '...'}": files} if files else {}
+
+
+class ComponentStreamParser:
+    """
+        Incremental parser of a streamed TerraformOutput JSON: feed() it the text as it
+        arrives, it returns the (root, component) pairs of the environments and modules
+        whose object closed since the last call. Every character is scanned once.
+    """
+
+    ROOTS = ("environments", "modules")
+
+    def __init__(self):
+        self.text = ""
+        self.position = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.string_start = 0
+        # Last string seen, the key when an array opens in the top-level object
+        self.last_string = None
+        self.root = None
+        self.component_start = None
+
+
+    def feed(self, text: str) -> List[Tuple[str, dict]]:
+        self.text += text
+        completed = []
+
+        for index in range(self.position, len(self.text)):
+            char = self.text[index]
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    self.last_string = self.text[self.string_start + 1:index]
+                continue
+
+            if char == '"':
+                self.in_string = True
+                self.string_start = index
+            elif char in "{[":
+                if char == "[" and self.depth == 1:
+                    self.root = self.last_string if self.last_string in self.ROOTS else None
+                elif char == "{" and self.depth == 2 and self.root:
+                    self.component_start = index
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+                if char == "}" and self.depth == 2 and self.component_start is not None:
+                    component = self.load_component(self.text[self.component_start:index + 1])
+                    if component:
+                        completed.append((self.root, component))
+                    self.component_start = None
+                elif char == "]" and self.depth == 1:
+                    self.root = None
+
+        self.position = len(self.text)
+        return completed
+
+
+    def load_component(self, text: str):
+        try:
+            component = json.loads(text)
+        except json.JSONDecodeError:
+            return None
+        return component if isinstance(component, dict) and component.get("name") else None
+
+
+class FallbackOutputParser:
+    """
+        Incremental parser of the headered text of the fallback generation: feed() it the
+        text as it arrives, close() returns the environments and modules as TerraformOutput
+        fields. The text is split into lines once and only lines starting with '#' are
+        matched against the header pattern, so the parse is linear in the response size.
+
+        Files other than main.tf, variables.tf and output.tf (providers.tf, versions.tf)
+        are appended to main.tf, terraform reads every .tf file of a directory anyway.
+        Text before the first header and markdown fences are dropped.
+    """
+
+    def __init__(self):
+        self.components = {"environments": {}, "modules": {}}
+        # Pieces of the last line until its newline arrives
+        self.partial = []
+        self.component = None
+        self.key = None
+        self.field = None
+        self.lines = []
+        # Contents of the other files, appended to main.tf when the parse closes
+        self.extra_files = {}
+
+
+    def feed(self, text: str):
+        self.partial.append(text)
+        if "\n" not in text:
+            return
+
+        lines = "".join(self.partial).split("\n")
+        self.partial = [lines.pop()]
+        for line in lines:
+            self.feed_line(line)
+
+
+    def feed_line(self, line: str):
+        stripped = line.lstrip()
+        if stripped.startswith("#"):
+            header = HEADER_PATTERN.match(line)
+            if header:
+                self.start_file(header.group(1), header.group(2), header.group(3))
+                return
+        elif stripped.startswith("```"):
+            return
+
+        if self.component is not None:
+            self.lines.append(line)
+
+
+    def start_file(self, kind: str, name: str, filename: str):
+        self.end_file()
+        root = "modules" if kind.upper() == "MODULE" else "environments"
+        self.component = self.components[root].setdefault(
+            name, {"name": name, "main_tf": "", "variables_tf": "", "output_tf": ""}
+        )
+        self.key = (root, name)
+        self.field = FILE_ALIASES.get(filename.lower())
+
+
+    def end_file(self):
+        if self.component is None:
+            return
+
+        content = "\n".join(self.lines).strip()
+        if self.field:
+            self.component[self.field] = content
+        elif content:
+            self.extra_files.setdefault(self.key, []).append(content)
+        self.lines = []
+
+
+    def close(self) -> Dict[str, List[dict]]:
+        self.feed_line("".join(self.partial))
+        self.partial = []
+        self.end_file()
+        self.component = None
+
+        for (root, name), contents in self.extra_files.items():
+            component = self.components[root][name]
+            component["main_tf"] = "\n\n".join([component["main_tf"], *contents]).strip()
+        self.extra_files = {}
+        return {root: list(components.values()) for root, components in self.components.items()}
@@ -9,3 +9,33 @@ CODE_VALIDATION = "code_validation"
 GENERATE_PLAN = "generate_plan"
 DOWNLOAD_ARTIFACTS = "download_artifacts"
 ERROR="error"
+
+## Code Generation Modes
+GENERATION_MODE_STANDARD = "standard"
+GENERATION_MODE_PARALLEL = "parallel"
+GENERATION_MODE_SPECULATIVE = "speculative"
+GENERATION_MODE_STREAMING = "streaming"
+GENERATION_MODES = (GENERATION_MODE_STANDARD, GENERATION_MODE_PARALLEL, GENERATION_MODE_SPECULATIVE, GENERATION_MODE_STREAMING)
+
+## Model Routing Tasks
+ROUTE_GENERATION = "generation"
+ROUTE_FALLBACK = "fallback"
+ROUTE_LARGE_FIX = "large_fix"
+ROUTE_TRIVIAL_FIX = "trivial_fix"
+ROUTE_TASKS = (ROUTE_GENERATION, ROUTE_FALLBACK, ROUTE_LARGE_FIX, ROUTE_TRIVIAL_FIX)
+
+## Module that every other module depends on
+NETWORKING_MODULE = "networking"
+
+## Job Queue
+JOB_QUEUE_INPROCESS = "inprocess"
+JOB_QUEUE_REDIS = "redis"
+
+JOB_START_WORKFLOW = "start_workflow"
+JOB_GENERATE_CODE = "generate_code"
+JOB_REVIEW = "graph_review_flow"
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
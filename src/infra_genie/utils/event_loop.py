@@ -0,0 +1,32 @@
+import asyncio
+import threading
+
+## One event loop per process runs the coroutines of sync callers, so the async
+## LLM clients are never shared between loops that come and go
+_loop = None
+_loop_thread = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Returns the background event loop, starting its thread on first use"""
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(target=_loop.run_forever, name="infragenie-event-loop", daemon=True)
+            _loop_thread.start()
+        return _loop
+
+
+def run_sync(coro):
+    """
+        Runs a coroutine on the background event loop and blocks until it returns.
+        The coroutine sees the caller's context variables, so its LLM calls reach
+        the callbacks of the node running it.
+    """
+    loop = get_event_loop()
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("run_sync cannot be called from a coroutine of the background event loop")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import re
+import subprocess
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Tuple
+from loguru import logger
+from src.infra_genie.utils.token_usage import track_subprocess
+
+try:
+    import fcntl
+except ImportError:
+    # Windows, the plugin cache is then only guarded within the process
+    fcntl = None
+
+
+# What terraform init installs: providers (explicit or implied by resource types), modules and the backend
+DEPENDENCY_PATTERN = re.compile(
+    r'^[ \t]*(?:resource|data)[ \t]+"([A-Za-z0-9]+)_'
+    r'|^[ \t]*((?:module|provider|backend)[ \t]+"[^"]*")'
+    r'|\b((?:source|version|required_version)[ \t]*=[ \t]*"[^"]*")',
+    re.MULTILINE,
+)
+LOCAL_SOURCE_PATTERN = re.compile(r'\bsource[ \t]*=[ \t]*"(\.{1,2}/[^"]*)"')
+
+## Per user, outside the project, so the cache is shared by every checkout and never committed
+DEFAULT_CACHE_DIR = os.path.join("~", ".cache", "infragenie", "terraform")
+
+## terraform init is not safe to run concurrently against one plugin cache
+_init_lock = threading.Lock()
+
+
+class TerraformInit:
+    """
+        Runs terraform init for the validations.
+
+        - Provider plugins are installed once into plugin_cache_dir, shared by every
+          workspace, and taken from provider_mirror_dir when configured (a directory
+          filled by "terraform providers mirror"), so validations work without network.
+        - init is skipped when the providers, modules and backend of the configuration
+          and of its local modules are unchanged since the last successful init of the
+          directory: fixes that only change resource bodies go straight to validate.
+          The fingerprint is kept in .terraform, which save_code leaves in place along
+          with .terraform.lock.hcl.
+    """
+
+    MARKER_FILE = "infra-genie-init.sha256"
+
+    def __init__(self, plugin_cache_dir: Optional[str] = None, provider_mirror_dir: Optional[str] = None,
+                 cli_config_file: Optional[str] = None, reuse: bool = True):
+        self.plugin_cache_dir = self.resolve(plugin_cache_dir)
+        self.provider_mirror_dir = self.resolve(provider_mirror_dir)
+        self.cli_config_file = self.resolve(cli_config_file or os.path.join(DEFAULT_CACHE_DIR, "terraform.tfrc"))
+        self.reuse = reuse
+        self.env = None
+
+
+    @staticmethod
+    def resolve(path: Optional[str]) -> Optional[str]:
+        return os.path.abspath(os.path.expanduser(path)) if path else None
+
+
+    ## ------- Environment ------- ##
+    def get_env(self) -> dict:
+        """Environment of the terraform subprocesses, prepared on first use"""
+        if self.env is not None:
+            return self.env
+
+        env = dict(os.environ, TF_IN_AUTOMATION="1", TF_INPUT="0")
+        if self.plugin_cache_dir:
+            os.makedirs(self.plugin_cache_dir, exist_ok=True)
+            env["TF_PLUGIN_CACHE_DIR"] = self.plugin_cache_dir
+            # Lock files written by other platforms must not force a download
+            env["TF_PLUGIN_CACHE_MAY_BREAK_DEPENDENCY_LOCK_FILE"] = "true"
+        if self.provider_mirror_dir:
+            env["TF_CLI_CONFIG_FILE"] = self.write_cli_config()
+        self.env = env
+        return env
+
+
+    def write_cli_config(self) -> str:
+        """Providers found in the mirror are installed from it, the others from their registry"""
+        os.makedirs(os.path.dirname(self.cli_config_file), exist_ok=True)
+        with open(self.cli_config_file, "w") as f:
+            f.write(
+                "provider_installation {\n"
+                f"  filesystem_mirror {{\n    path = {json.dumps(self.provider_mirror_dir)}\n  }}\n"
+                "  direct {}\n"
+                "}\n"
+            )
+        return self.cli_config_file
+
+
+    ## ------- Reuse ------- ##
+    def get_fingerprint(self, directory: str) -> str:
+        """Hashes the dependency declarations of the directory and of the local modules it sources"""
+        root = Path(directory).resolve()
+        pending, seen, tokens = [root], set(), set()
+
+        while pending:
+            current = pending.pop()
+            if current in seen or not current.is_dir():
+                continue
+            seen.add(current)
+
+            relative = os.path.relpath(current, root)
+            for tf_file in sorted(current.glob("*.tf")):
+                text = tf_file.read_text(errors="replace")
+                for match in DEPENDENCY_PATTERN.finditer(text):
+                    provider, block, argument = match.groups()
+                    tokens.add(f"{relative}: {f'provider {provider}' if provider else block or argument}")
+                for source in LOCAL_SOURCE_PATTERN.findall(text):
+                    pending.append((current / source).resolve())
+
+        tokens.add(f"mirror: {self.provider_mirror_dir}")
+        return hashlib.sha256("\n".join(sorted(tokens)).encode("utf-8")).hexdigest()
+
+
+    def get_marker_path(self, directory: str) -> str:
+        return os.path.join(directory, ".terraform", self.MARKER_FILE)
+
+
+    def is_initialized(self, directory: str, fingerprint: str) -> bool:
+        try:
+            with open(self.get_marker_path(directory)) as f:
+                return f.read().strip() == fingerprint
+        except OSError:
+            return False
+
+
+    def save_fingerprint(self, directory: str, fingerprint: Optional[str]):
+        marker_path = self.get_marker_path(directory)
+        if fingerprint is None:
+            if os.path.exists(marker_path):
+                os.remove(marker_path)
+            return
+        os.makedirs(os.path.dirname(marker_path), exist_ok=True)
+        with open(marker_path, "w") as f:
+            f.write(fingerprint)
+
+
+    ## ------- Init ------- ##
+    @contextmanager
+    def plugin_cache_lock(self):
+        if not self.plugin_cache_dir:
+            yield
+            return
+
+        with _init_lock:
+            with open(os.path.join(self.plugin_cache_dir, ".lock"), "w") as lock_file:
+                # Also excludes the inits of the other processes sharing the cache
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                yield
+
+
+    def run(self, directory: str, config=None) -> Tuple[int, str]:
+        """Runs terraform init in the directory unless its last init still applies. Returns (returncode, stderr)"""
+        env = self.get_env()
+        fingerprint = self.get_fingerprint(directory) if self.reuse else None
+        if fingerprint and self.is_initialized(directory, fingerprint):
+            logger.info(f"Providers and modules unchanged, reusing the terraform init of {directory}")
+            return 0, ""
+
+        command = ["terraform", "init", "-no-color", "-input=false"]
+        with self.plugin_cache_lock():
+            with track_subprocess(config, command):
+                result = subprocess.run(command, cwd=directory, capture_output=True, text=True, env=env)
+
+        logger.debug(f"Terraform Init Response: {result}")
+        self.save_fingerprint(directory, fingerprint if result.returncode == 0 else None)
+        return result.returncode, result.stderr
@@ -0,0 +1,245 @@
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from loguru import logger
+
+
+# Accounted per node, summed over the nodes for the task
+NODE_METRICS = (
+    "node_runs", "node_seconds",
+    "llm_calls", "llm_errors", "llm_seconds", "input_tokens", "output_tokens", "cache_read_tokens", "cost_usd",
+    "subprocess_calls", "subprocess_seconds",
+)
+
+
+class TokenUsageHandler(BaseCallbackHandler):
+    """
+        Accounts the LLM calls, terraform subprocesses and wall time of every node of a
+        graph run: tokens, latency and the estimated cost from the configured pricing.
+        Nodes find the handler in config["configurable"]["token_usage"] to enforce token
+        budgets and record their subprocesses. cache_read_tokens are the prompt tokens
+        the provider served from its prompt cache.
+
+        With a metrics store, each node's figures are exported when the node finishes.
+        The graph nodes also copy the figures into the usage_metrics of the state on exit
+        (see with_usage_metrics), under handler_id; a node's own wall time is added right
+        after its exit and so reaches the state with the next node.
+    """
+
+    def __init__(self, task_id: Optional[str] = None, pricing: Optional[Dict[str, Tuple[float, float]]] = None, store=None):
+        super().__init__()
+        self.task_id = task_id
+        # model -> (USD per million input tokens, USD per million output tokens)
+        self.pricing = pricing or {}
+        self.store = store
+        # Tells apart the handlers of the executors (jobs, API requests) that ran one task
+        self.handler_id = uuid.uuid4().hex[:12]
+        self._lock = threading.Lock()
+        self.usage = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0, "cache_read_tokens": 0}
+        self.nodes = defaultdict(lambda: dict.fromkeys(NODE_METRICS, 0))
+        # Not yet exported to the store, by node
+        self._pending = defaultdict(lambda: defaultdict(float))
+        # run_id -> (node, model, start time) of the LLM calls and nodes in flight
+        self._llm_runs = {}
+        self._node_runs = {}
+
+
+    ## ------- Accounting ------- ##
+    def add(self, node: str, **values):
+        with self._lock:
+            for metric, value in values.items():
+                self.nodes[node][metric] += value
+                self._pending[node][metric] += value
+
+
+    def get_cost(self, model: Optional[str], input_tokens: int, output_tokens: int) -> float:
+        """Estimated USD cost of a call, 0 for models without pricing"""
+        input_price, output_price = self.pricing.get(model or "", (0.0, 0.0))
+        return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+    def record_subprocess(self, node: str, command: str, seconds: float):
+        self.add(node, subprocess_calls=1, subprocess_seconds=seconds)
+        logger.debug(f"{node}: {command} took {seconds:.2f}s")
+
+
+    def get_node_metrics(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {node: dict(metrics) for node, metrics in self.nodes.items()}
+
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Returns the metrics per node and their total"""
+        return sum_usage_metrics({self.handler_id: self.get_node_metrics()})
+
+
+    def flush(self, node: str):
+        """Exports the figures of the node recorded since the last flush"""
+        with self._lock:
+            pending = self._pending.pop(node, None)
+        if self.store is not None and self.task_id and pending:
+            self.store.increment(self.task_id, node, pending)
+
+
+    ## ------- Nodes ------- ##
+    def on_chain_start(self, serialized: Dict[str, Any], inputs: Any, *, run_id: UUID, parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        # Only the node's own run, not the runnables inside it
+        if node and kwargs.get("name") == node and parent_run_id not in self._node_runs:
+            self._node_runs[run_id] = (node, time.monotonic())
+
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self.end_node(run_id)
+
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self.end_node(run_id)
+
+
+    def end_node(self, run_id: UUID):
+        run = self._node_runs.pop(run_id, None)
+        if run is None:
+            return
+
+        node, started = run
+        self.add(node, node_runs=1, node_seconds=time.monotonic() - started)
+        metrics = self.nodes[node]
+        if metrics["llm_calls"] or metrics["subprocess_calls"]:
+            logger.info(
+                f"Node {node}: {metrics['node_seconds']:.2f}s in {metrics['node_runs']} runs, "
+                f"{metrics['llm_calls']} LLM calls ({metrics['llm_seconds']:.2f}s, "
+                f"{metrics['input_tokens']}+{metrics['output_tokens']} tokens, ${metrics['cost_usd']:.4f}), "
+                f"{metrics['subprocess_calls']} subprocesses ({metrics['subprocess_seconds']:.2f}s)"
+            )
+        self.flush(node)
+
+
+    ## ------- LLM calls ------- ##
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self.start_llm(run_id, metadata, kwargs)
+
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: Any, *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self.start_llm(run_id, metadata, kwargs)
+
+
+    def start_llm(self, run_id: UUID, metadata: Optional[Dict[str, Any]], kwargs: Dict[str, Any]):
+        metadata = metadata or {}
+        invocation_params = kwargs.get("invocation_params") or {}
+        model = metadata.get("ls_model_name") or invocation_params.get("model") or invocation_params.get("model_name")
+        if model:
+            model = str(model).removeprefix("models/")
+        self._llm_runs[run_id] = (metadata.get("langgraph_node", "unknown"), model, time.monotonic())
+
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        usage = self.get_response_usage(response)
+        with self._lock:
+            for key in self.usage:
+                self.usage[key] += usage.get(key, 0)
+            input_tokens, cache_read_tokens = self.usage["input_tokens"], self.usage["cache_read_tokens"]
+
+        if usage.get("input_tokens"):
+            logger.info(
+                f"Prompt cache: {usage.get('cache_read_tokens', 0)}/{usage['input_tokens']} prompt tokens cached, "
+                f"run hit ratio {cache_read_tokens / max(input_tokens, 1):.0%}"
+            )
+
+        node, model, started = self._llm_runs.pop(run_id, ("unknown", None, time.monotonic()))
+        self.add(
+            node,
+            llm_calls=1,
+            llm_seconds=time.monotonic() - started,
+            input_tokens=usage.get("input_tokens", 0),
+            output_tokens=usage.get("output_tokens", 0),
+            cache_read_tokens=usage.get("cache_read_tokens", 0),
+            cost_usd=self.get_cost(model, usage.get("input_tokens", 0), usage.get("output_tokens", 0)),
+        )
+
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        node, _, started = self._llm_runs.pop(run_id, ("unknown", None, time.monotonic()))
+        self.add(node, llm_calls=1, llm_errors=1, llm_seconds=time.monotonic() - started)
+
+
+    def get_response_usage(self, response: LLMResult) -> Dict[str, int]:
+        """Sums the usage metadata of the generated messages, falls back to the provider's llm_output"""
+        usage = {}
+        for generations in response.generations:
+            for generation in generations:
+                usage_metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                for key in ("input_tokens", "output_tokens", "total_tokens"):
+                    usage[key] = usage.get(key, 0) + usage_metadata.get(key, 0)
+                cache_read = (usage_metadata.get("input_token_details") or {}).get("cache_read", 0)
+                usage["cache_read_tokens"] = usage.get("cache_read_tokens", 0) + cache_read
+
+        if not usage.get("total_tokens"):
+            token_usage = (response.llm_output or {}).get("token_usage") or {}
+            usage = {
+                "input_tokens": token_usage.get("prompt_tokens", 0),
+                "output_tokens": token_usage.get("completion_tokens", 0),
+                "total_tokens": token_usage.get("total_tokens", 0),
+                "cache_read_tokens": (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0),
+            }
+        return usage
+
+    @property
+    def total_tokens(self) -> int:
+        return self.usage["total_tokens"]
+
+
+def get_token_usage(config) -> Optional[TokenUsageHandler]:
+    """Returns the token usage handler of a graph run, if the caller attached one"""
+    return (config or {}).get("configurable", {}).get("token_usage")
+
+
+def sum_usage_metrics(usage_metrics: Dict[str, Dict[str, Dict[str, float]]]) -> Dict[str, Any]:
+    """Returns the metrics per node and their total from {handler id: {node: {metric: value}}}"""
+    nodes = defaultdict(lambda: dict.fromkeys(NODE_METRICS, 0))
+    for handler_nodes in usage_metrics.values():
+        for node, metrics in handler_nodes.items():
+            for metric, value in metrics.items():
+                nodes[node][metric] += value
+
+    total = dict.fromkeys(NODE_METRICS, 0)
+    for metrics in nodes.values():
+        for metric, value in metrics.items():
+            total[metric] += value
+    return {"nodes": dict(nodes), "total": total}
+
+
+def with_usage_metrics(result, config):
+    """
+        Adds the figures of the run's handler to what a node returns, the usage_metrics
+        reducer of the state merges them with those of the previous nodes and executors
+    """
+    token_usage = get_token_usage(config)
+    if token_usage is None or result is None:
+        return result
+
+    report = {token_usage.handler_id: token_usage.get_node_metrics()}
+    if isinstance(result, dict):
+        return {**result, "usage_metrics": report}
+    if hasattr(result, "usage_metrics"):
+        result.usage_metrics = report
+    return result
+
+
+@contextmanager
+def track_subprocess(config, command):
+    """Records the wall time of a subprocess against the node running it"""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        token_usage = get_token_usage(config)
+        if token_usage is not None:
+            node = (config.get("metadata") or {}).get("langgraph_node", "unknown")
+            token_usage.record_subprocess(node, " ".join(command[:2]), time.monotonic() - started)
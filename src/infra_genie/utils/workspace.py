@@ -0,0 +1,22 @@
+import os
+import re
+from pathlib import Path
+
+## Generated code of every task lives in its own workspace: <WORKSPACE_ROOT>/<task_id>/src
+WORKSPACE_ROOT = os.getenv("INFRAGENIE_WORKSPACE_ROOT", "output")
+
+
+def get_task_id(config) -> str:
+    """Returns the task id of a graph run, the thread id of its config"""
+    return config["configurable"]["thread_id"]
+
+
+def get_workspace(task_id: str) -> Path:
+    """Returns the directory holding the generated Terraform code of a task"""
+    safe_task_id = re.sub(r"[^A-Za-z0-9_.-]", "_", task_id)
+    return Path(WORKSPACE_ROOT) / safe_task_id / "src"
+
+
+def get_environment_dir(task_id: str, environment: str = "dev") -> Path:
+    """Returns the directory terraform runs in for an environment of a task"""
+    return get_workspace(task_id) / "environments" / environment
@@ -0,0 +1,65 @@
+from langchain_core.runnables import Runnable, RunnableLambda
+from src.infra_genie.graph.graph_executor import GraphExecutor
+from src.infra_genie.nodes.code_generator_node import CodeGeneratorNode
+from src.infra_genie.state.infra_genie_state import InfraGenieState, TerraformComponent
+from src.infra_genie.utils import constants as const
+
+
+def make_component(name: str) -> TerraformComponent:
+    return TerraformComponent(name=name, main_tf=f'resource "null_resource" "{name}" {{}}', variables_tf="", output_tf="")
+
+
+class RecordingLLM(Runnable):
+    """Answers every structured call with a fixed component and keeps the prompts"""
+
+    def __init__(self):
+        self.prompts = []
+
+    def invoke(self, input, config=None, **kwargs):
+        raise AssertionError("Only structured calls are expected")
+
+    def with_structured_output(self, schema, **kwargs):
+        def run(prompt):
+            self.prompts.append(prompt.to_string())
+            return make_component("fixed")
+        return RunnableLambda(run)
+
+
+def make_validated_state() -> InfraGenieState:
+    state = InfraGenieState(project_name="demo")
+    state.environments.environments = [make_component("dev")]
+    state.modules.modules = [make_component("ec2"), make_component("networking")]
+    state.failed_components = {"modules/ec2": "Unsupported argument: ami_id (File: ../../modules/ec2/main.tf, Line: 3)"}
+    state.failed_component_error_counts = {"modules/ec2": 1}
+    return state
+
+
+def test_interactive_feedback_fixes_only_the_failing_component():
+    llm = RecordingLLM()
+    state = make_validated_state()
+
+    # The review of the interactive graph: feedback text is mandatory there
+    executor = GraphExecutor.__new__(GraphExecutor)
+    executor.apply_review(state, "feedback", "Tag every instance with the project name", const.CODE_VALIDATION)
+
+    state = CodeGeneratorNode(llm).fix_code(state)
+
+    assert state.code_generated
+    assert len(llm.prompts) == 1
+    assert "Unsupported argument: ami_id" in llm.prompts[0]
+    assert "Tag every instance with the project name" in llm.prompts[0]
+    assert [module.name for module in state.modules.modules] == ["ec2", "networking"]
+    assert state.modules.modules[0].main_tf == 'resource "null_resource" "fixed" {}'
+    assert state.modules.modules[1] == make_component("networking")
+    assert state.environments.environments == [make_component("dev")]
+
+
+def test_unattributed_errors_regenerate_everything():
+    llm = RecordingLLM()
+    state = make_validated_state()
+    state.failed_components = {}
+
+    state = CodeGeneratorNode(llm).fix_code(state)
+
+    assert not state.code_generated
+    assert llm.prompts == []
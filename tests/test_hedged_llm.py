@@ -0,0 +1,48 @@
+import asyncio
+import pytest
+from langchain_core.runnables import Runnable
+from src.infra_genie.LLMS.hedged_llm import HedgedLLM
+
+
+class FakeCandidate(Runnable):
+    """Answers after a delay, or fails, and notes whether its request was cancelled"""
+
+    def __init__(self, answer: str, delay: float = 0.0, error: Exception = None):
+        self.answer = answer
+        self.delay = delay
+        self.error = error
+        self.cancelled = False
+
+    def invoke(self, input, config=None, **kwargs):
+        raise AssertionError("Candidates are expected to be called through ainvoke")
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return self.answer
+
+
+def test_sync_hedge_cancels_the_slow_request():
+    slow, fast = FakeCandidate("slow", delay=30), FakeCandidate("fast")
+    llm = HedgedLLM([("test:slow-primary", slow), ("test:fast-hedge", fast)], default_hedge_delay=0.05, min_hedge_delay=0.05)
+
+    assert llm.invoke("prompt") == "fast"
+    assert slow.cancelled
+    assert list(llm.trackers["test:fast-hedge"].samples)
+    assert not llm.trackers["test:slow-primary"].samples
+
+
+def test_failed_calls_are_not_recorded_as_latency():
+    failing = FakeCandidate("", error=RuntimeError("boom"))
+    llm = HedgedLLM([("test:failing", failing)])
+
+    with pytest.raises(RuntimeError):
+        llm.invoke("prompt")
+
+    assert not llm.trackers["test:failing"].samples
+    assert llm.breakers["test:failing"].failures == 1
@@ -0,0 +1,45 @@
+import asyncio
+from src.infra_genie.nodes.speculative_generation_node import SpeculativeGenerationNode
+from src.infra_genie.state.infra_genie_state import InfraGenieState, TerraformComponent, TerraformOutput, UserInput
+
+
+def make_output(name: str) -> TerraformOutput:
+    return TerraformOutput(environments=[], modules=[TerraformComponent(name=name, main_tf="", variables_tf="", output_tf="")])
+
+
+class FastStructured:
+    async def ainvoke_structured(self, state):
+        await asyncio.sleep(0.01)
+        return make_output("structured")
+
+    def apply_result(self, state, result):
+        state.modules.modules = result.modules
+        state.code_generated = True
+
+
+class SlowFallback:
+    def __init__(self):
+        self.cancelled = False
+
+    async def ainvoke_fallback(self, state):
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return make_output("fallback")
+
+
+def test_sync_race_cancels_the_losing_request():
+    fallback = SlowFallback()
+    node = SpeculativeGenerationNode(FastStructured(), fallback)
+
+    user_input = UserInput(
+        services=["ec2"], region="us-east-1", vpc_cidr="10.0.0.0/16", availability_zones=["us-east-1a"], compute_type="ec2",
+        database_type="none", is_multi_az=False, is_serverless=False, load_balancer_type="ALB", requirements="web app"
+    )
+    state = node.generate_terraform_code(InfraGenieState(project_name="demo", user_input=user_input))
+
+    assert state.code_generated
+    assert [module.name for module in state.modules.modules] == ["structured"]
+    assert fallback.cancelled